@@ -0,0 +1,53 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from urbanopt_des.aggregations import AggregationGraph
+
+
+class AggregationGraphTest(unittest.TestCase):
+    def setUp(self):
+        index = pd.date_range("2017-01-01", periods=48, freq="h")
+        rng = np.random.default_rng(42)
+        self.df = pd.DataFrame(rng.random((48, 4)), index=index, columns=["Elec 1", "Elec 2", "Gas 1", "Gas 2"])
+        self.df.iloc[3, 0] = np.nan
+
+        # declared out of dependency order on purpose
+        self.totals = {
+            "Total Energy": ["Total Electricity", "Total Natural Gas"],
+            "Total Electricity": ["Elec 1", "Elec 2"],
+            "Total Natural Gas": ["Gas 1", "Gas 2"],
+            "Total Zeros": [],
+            "Total Double Gas": ["Gas 1", "Gas 1"],
+        }
+
+    def test_compute_matches_column_sums(self):
+        graph = AggregationGraph(self.totals)
+        self.assertLess(graph.order.index("Total Electricity"), graph.order.index("Total Energy"))
+
+        graph.apply(self.df)
+        self.assertEqual(list(self.df.columns[-5:]), list(self.totals.keys()))
+
+        np.testing.assert_allclose(self.df["Total Electricity"], self.df[["Elec 1", "Elec 2"]].sum(axis=1))
+        np.testing.assert_allclose(self.df["Total Natural Gas"], self.df[["Gas 1", "Gas 2"]].sum(axis=1))
+        np.testing.assert_allclose(self.df["Total Energy"], self.df[["Elec 1", "Elec 2", "Gas 1", "Gas 2"]].sum(axis=1))
+        np.testing.assert_allclose(self.df["Total Double Gas"], 2 * self.df["Gas 1"])
+        self.assertTrue((self.df["Total Zeros"] == 0).all())
+
+    def test_compiled_layout_is_reused(self):
+        graph = AggregationGraph(self.totals)
+        df_15min = self.df.resample("15min").ffill()
+        graph.apply(self.df)
+        graph.apply(df_15min)
+        # both data frames had the same columns before the totals were added
+        self.assertEqual(len(graph._compiled), 1)
+        np.testing.assert_allclose(df_15min["Total Energy"].resample("h").first(), self.df["Total Energy"])
+
+    def test_missing_columns_and_cycles(self):
+        with pytest.raises(Exception, match="Missing"):
+            AggregationGraph({"Total": ["Missing"]}).compute(self.df)
+
+        with pytest.raises(Exception, match="Circular dependency"):
+            AggregationGraph({"A": ["B"], "B": ["A"]})
@@ -0,0 +1,226 @@
+import os
+import shutil
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from urbanopt_des.emission_factor_store import EMISSIONS_PATH, EmissionFactorStore
+from urbanopt_des.emissions import HistoricalEmissionsData, HourlyEmissionsData
+from urbanopt_des.emissions_cube import CarbonEmissionsCube
+from urbanopt_des.modelica_results import ModelicaResults
+from urbanopt_des.urbanopt_results import URBANoptResults
+
+
+class EmissionsTest(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = Path(__file__).parent / "test_output" / "emissions"
+        if self.output_dir.exists():
+            shutil.rmtree(self.output_dir)
+        self.output_dir.mkdir(parents=True)
+
+    def test_store_matches_csv(self):
+        store = EmissionFactorStore(self.output_dir / "store")
+        self.assertIn(2024, store.years)
+        self.assertEqual(store.hourly("marginal").shape, (len(store.years), 8760, 20))
+        self.assertIsInstance(store.hourly("marginal"), np.memmap)
+
+        for emissions_type, with_td_losses, losses in [("marginal", True, "with"), ("average", False, "without")]:
+            csv = pd.read_csv(
+                EMISSIONS_PATH / f"{losses}_distribution_losses" / "future" / "hourly" / f"future_hourly_{emissions_type}_co2e_2030.csv"
+            )
+            np.testing.assert_array_equal(store.factors(2030, emissions_type, with_td_losses), csv[store.regions].to_numpy())
+        self.assertEqual(store.other_fuels["natural_gas"], 181.7)
+
+        with pytest.raises(Exception, match="Future emissions data file does not exist"):
+            store.factors(2031)
+
+    def test_store_rebuilds_on_change(self):
+        source_path = self.output_dir / "source"
+        shutil.copytree(EMISSIONS_PATH, source_path, ignore=shutil.ignore_patterns("*.docx", "*.json", "historical"))
+        store = EmissionFactorStore(self.output_dir / "store", source_path)
+        self.assertEqual(store.other_fuels["propane"], 219.2)
+
+        # the store is reused until a source file changes
+        manifest_mtime = (self.output_dir / "store" / "manifest.json").stat().st_mtime_ns
+        EmissionFactorStore(self.output_dir / "store", source_path)
+        self.assertEqual((self.output_dir / "store" / "manifest.json").stat().st_mtime_ns, manifest_mtime)
+
+        other_fuels = source_path / "other_fuels.csv"
+        other_fuels.write_text(other_fuels.read_text().replace("propane,64.25,219.2", "propane,64.25,220.0"))
+        store = EmissionFactorStore(self.output_dir / "store", source_path)
+        self.assertEqual(store.other_fuels["propane"], 220.0)
+
+    def test_default_store_path(self):
+        # the store is in the cache directory of the user
+        with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": str(self.output_dir / "cache")}):
+            self.assertEqual(EmissionFactorStore.default_store_path(), self.output_dir / "cache" / "urbanopt_des" / "emission_factors")
+        with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": ""}):
+            self.assertEqual(EmissionFactorStore.default_store_path(), Path.home() / ".cache" / "urbanopt_des" / "emission_factors")
+
+        emissions = HistoricalEmissionsData("RFCE", 2020, store_path=self.output_dir / "store")
+        self.assertEqual(emissions.store.path, self.output_dir / "store")
+        self.assertEqual((self.output_dir / "store").stat().st_mode & 0o777, 0o700)
+
+    def test_hourly_emissions_data(self):
+        emissions = HourlyEmissionsData("RFCE", 2024, analysis_year=2017)
+        self.assertEqual(len(emissions.data), 8760)
+        self.assertEqual(emissions.data.index[0], pd.Timestamp("2017-01-01 00:00"))
+        self.assertEqual(emissions.data["datetime"].iloc[0], pd.Timestamp("2024-01-01 01:00"))
+        self.assertEqual(list(emissions.data.columns[:2]), ["analysis_datetime_end", "hour"])
+        self.assertEqual(emissions.data["RFCEc"].iloc[0], 574)
+        self.assertEqual(emissions.other_fuels["natural_gas"], 181.7)
+
+        with pytest.raises(Exception, match="Invalid eGRID subregion"):
+            HourlyEmissionsData("ABCD", 2024)
+
+    def test_emissions_cube(self):
+        index = pd.date_range("2017-01-01 01:00", periods=8760, freq="h", name="Datetime")
+        rng = np.random.default_rng(5)
+        dataframes = {}
+        for analysis in ["Non-Connected", "5G"]:
+            dataframes[analysis] = pd.DataFrame(
+                {"Total Electricity": rng.random(len(index)) * 1e6, "Total Building Natural Gas": rng.random(len(index)) * 1e5},
+                index=index,
+            )
+
+        cube = CarbonEmissionsCube.from_dataframes(
+            dataframes, ["RFCE", "CAMX"], [2024, 2045], emissions_types=["marginal", "average"], with_td_losses=[True, False]
+        )
+        annual = cube.annual()
+        self.assertEqual(len(annual), 2 * 2 * 2 * 2 * 2)
+        self.assertEqual(cube.hourly().shape, (16, 2, 8760))
+
+        # compare against calculating the emissions one scenario at a time
+        results = URBANoptResults.__new__(URBANoptResults)
+        for region, future_year, emissions_type, with_td_losses in [("RFCE", 2024, "marginal", True), ("CAMX", 2045, "average", False)]:
+            results.data = dataframes["5G"].copy()
+            emissions = HourlyEmissionsData(
+                region, future_year, analysis_year=2017, emissions_type=emissions_type, with_td_losses=with_td_losses
+            )
+            results.calculate_carbon_emissions(emissions, egrid_subregion=region, future_year=future_year)
+            expected = results.data[f"Total Carbon Emissions {future_year}"]
+
+            row = annual.loc[(region, future_year, emissions_type, with_td_losses, "5G")]
+            self.assertAlmostEqual(row["Total Carbon Emissions"], expected.sum())
+            # the last row (2018-01-01 00:00) is not in the hours of the analysis year
+            self.assertAlmostEqual(row["Natural Gas Carbon Emissions"], results.data["Total Natural Gas Carbon Emissions"].iloc[:-1].sum())
+
+            hourly = cube.time_series("5G")[(region, future_year, emissions_type, with_td_losses)]
+            np.testing.assert_allclose(hourly.reindex(expected.index).to_numpy(), expected.to_numpy())
+
+        with pytest.raises(Exception, match="Invalid eGRID subregion"):
+            CarbonEmissionsCube.from_dataframes(dataframes, ["ABCD"], [2024])
+
+    def test_building_carbon_emissions(self):
+        index = pd.date_range("2017-01-01 01:00", periods=8760, freq="h", name="Datetime")
+        rng = np.random.default_rng(7)
+        results = URBANoptResults.__new__(URBANoptResults)
+        results.data = pd.DataFrame(index=index)
+        results.data_15min = None
+        for building_id in ["1", "2"]:
+            results.data[f"Electricity:Facility Building {building_id}"] = rng.random(len(index)) * 1e6
+            results.data[f"NaturalGas:Facility Building {building_id}"] = rng.random(len(index)) * 1e5
+        results.data["Total Electricity"] = results.data.filter(like="Electricity:Facility").sum(axis=1)
+        results.data["Total Building Natural Gas"] = results.data.filter(like="NaturalGas:Facility").sum(axis=1)
+
+        emissions = HourlyEmissionsData("RFCE", 2045, analysis_year=2017)
+        carbon = results.calculate_building_carbon_emissions(emissions, ["1", "2"], egrid_subregion="RFCE")
+        self.assertIs(results.building_carbon_emissions, carbon)
+
+        # the buildings add up to the district emissions
+        results.calculate_carbon_emissions(emissions, egrid_subregion="RFCE", future_year=2045)
+        total = carbon[["Total Carbon Emissions Building 1", "Total Carbon Emissions Building 2"]].sum(axis=1, min_count=1)
+        np.testing.assert_allclose(total.to_numpy(), results.data["Total Carbon Emissions 2045"].to_numpy())
+
+        # each 15 minute row uses the factor of the hour that it is in, with a quarter of the energy of the hour
+        carbon_15min = results.calculate_building_carbon_emissions(emissions, ["1", "2"], egrid_subregion="RFCE", resolution="15min")
+        self.assertEqual(len(carbon_15min), len(results.data_15min))
+        self.assertAlmostEqual(carbon_15min.loc["2017-03-01 10:45"].iloc[0], carbon.loc["2017-03-01 10:00"].iloc[0] / 4)
+        # the 15 minute emissions add up to the hourly emissions, the last hour only has its first 15 minute row
+        pd.testing.assert_series_equal(carbon_15min.iloc[:-1].sum(), carbon.iloc[:-1].sum())
+
+        # other fuels are costed with the scalar factor of each fuel
+        results.data["Propane:Facility Building 2"] = 1e6
+        results.calculate_carbon_emissions(emissions, egrid_subregion="RFCE", future_year=2045)
+        self.assertAlmostEqual(results.data["Total Other Fuels Carbon Emissions"].iloc[0], 219.2 / 1000)
+        self.assertAlmostEqual(
+            results.data["Total Carbon Emissions 2045"].iloc[0],
+            results.data["Total Natural Gas Carbon Emissions"].iloc[0]
+            + results.data["Total Electricity Carbon Emissions 2045"].iloc[0]
+            + 219.2 / 1000,
+        )
+
+    def test_other_fuel_emissions(self):
+        # the other fuels are in the total emissions of the URBANopt results, the Modelica results, and the cube
+        index = pd.date_range("2017-01-01 01:00", periods=8760, freq="h", name="Datetime")
+        data = pd.DataFrame(
+            {
+                "Total Electricity": 1e6,
+                "Total Building Natural Gas": 1e5,
+                "Propane:Facility Building 1": 1e6,
+                "FuelOilNo2:Facility Building 2": 2e6,
+            },
+            index=index,
+        )
+        emissions = HourlyEmissionsData("RFCE", 2045, analysis_year=2017)
+        other_fuels = (219.2 + 2 * emissions.other_fuels["fuel_oil_no_2"]) / 1000
+
+        urbanopt = URBANoptResults.__new__(URBANoptResults)
+        urbanopt.data = data.copy()
+        urbanopt.calculate_carbon_emissions(emissions, egrid_subregion="RFCE", future_year=2045)
+        modelica = ModelicaResults.__new__(ModelicaResults)
+        modelica.min_60_with_buildings = data.copy()
+        modelica.calculate_carbon_emissions(emissions, egrid_subregion="RFCE", future_year=2045)
+        for df in [urbanopt.data, modelica.min_60_with_buildings]:
+            self.assertAlmostEqual(df["Total Other Fuels Carbon Emissions"].iloc[0], other_fuels)
+        pd.testing.assert_series_equal(
+            urbanopt.data["Total Carbon Emissions 2045"], modelica.min_60_with_buildings["Total Carbon Emissions 2045"]
+        )
+
+        cube = CarbonEmissionsCube.from_dataframes(
+            {"Non-Connected": data, "5G": data[["Total Electricity", "Total Building Natural Gas"]]}, ["RFCE"], [2045]
+        )
+        annual = cube.annual()
+        # the last row (2018-01-01 00:00) is not in the hours of the analysis year
+        self.assertAlmostEqual(
+            annual.loc[("RFCE", 2045, "marginal", True, "Non-Connected"), "Other Fuels Carbon Emissions"], 8759 * other_fuels
+        )
+        self.assertEqual(annual.loc[("RFCE", 2045, "marginal", True, "5G"), "Other Fuels Carbon Emissions"], 0)
+        self.assertAlmostEqual(
+            annual.loc[("RFCE", 2045, "marginal", True, "Non-Connected"), "Total Carbon Emissions"],
+            urbanopt.data["Total Carbon Emissions 2045"].iloc[:-1].sum(),
+        )
+        hourly = cube.time_series("Non-Connected").iloc[:, 0].reindex(index[:-1])
+        np.testing.assert_allclose(hourly.to_numpy(), urbanopt.data["Total Carbon Emissions 2045"].iloc[:-1].to_numpy())
+
+    def test_historical_emissions(self):
+        store = EmissionFactorStore(self.output_dir / "store")
+        rates = store.historical_rates(2019)
+        self.assertEqual(rates["RFCE"], 734)
+        self.assertIn("AKGD", rates)
+        self.assertEqual(store.historical(with_td_losses=False)[0][-1], 2021)
+        with pytest.raises(Exception, match="Historical emissions data does not exist for 2008"):
+            store.historical_rates(2008)
+
+        emissions = HistoricalEmissionsData("RFCE", 2019, analysis_year=2017)
+        self.assertEqual(len(emissions.index), 8760)
+        self.assertEqual(emissions.data["RFCE"].iloc[100], 734)
+        with pytest.raises(Exception, match="Invalid eGRID subregion"):
+            HistoricalEmissionsData("ABCD", 2019)
+
+        # the historical data work with the same carbon calculation as the future data
+        index = pd.date_range("2017-01-01 00:00", periods=8760, freq="h", name="Datetime")
+        results = URBANoptResults.__new__(URBANoptResults)
+        results.data = pd.DataFrame({"Total Electricity": 1e6, "Total Building Natural Gas": 0.0}, index=index)
+        results.calculate_carbon_emissions(emissions, egrid_subregion="RFCE", future_year=2019)
+        self.assertAlmostEqual(results.data["Total Carbon Emissions 2019"].sum(), 8760 * 0.734)
+
+        # historical and future scenarios in one batch
+        cube = CarbonEmissionsCube.from_dataframes({"Non-Connected": results.data}, ["RFCE"], [2045], historical_years=[2019, 2021])
+        annual = cube.annual()
+        self.assertEqual(list(annual.index.get_level_values("Emissions Type")), ["marginal", "historical", "historical"])
+        self.assertAlmostEqual(annual.loc[("RFCE", 2019, "historical", True, "Non-Connected"), "Total Carbon Emissions"], 8760 * 0.734)
@@ -0,0 +1,83 @@
+import os
+import shutil
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+from urbanopt_des.feature_report_cache import FeatureReportCache
+from urbanopt_des.urbanopt_results import URBANoptResults
+
+
+class FeatureReportCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = Path(__file__).parent / "data" / "three_building_5G"
+        self.output_dir = Path(__file__).parent / "test_output" / "feature_report_cache"
+        if self.output_dir.exists():
+            shutil.rmtree(self.output_dir)
+        self.output_dir.mkdir(parents=True)
+
+        if (self.data_dir / "three_building_test" / "output").exists():
+            shutil.rmtree(self.data_dir / "three_building_test" / "output")
+
+    def test_cache_key_invalidation(self):
+        """The key should change when the file is modified or the parse options change"""
+        source_file = self.output_dir / "report.csv"
+        source_file.write_text("Datetime,value\n2017/01/01 01:00:00,1\n")
+        stat = source_file.stat()
+
+        key = FeatureReportCache.cache_key(source_file, year_of_data=2017)
+        self.assertEqual(key, FeatureReportCache.cache_key(source_file, year_of_data=2017))
+        self.assertNotEqual(key, FeatureReportCache.cache_key(source_file, year_of_data=2018))
+
+        # same size, new modification time
+        source_file.write_text("Datetime,value\n2017/01/01 01:00:00,2\n")
+        os.utime(source_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        self.assertNotEqual(key, FeatureReportCache.cache_key(source_file, year_of_data=2017))
+
+    def test_save_and_load(self):
+        cache = FeatureReportCache(self.output_dir / "cache")
+        index = pd.date_range("2017-01-01 01:00", periods=24, freq="h", name="Datetime")
+        report = pd.DataFrame({"Electricity:Facility Building 1": range(24), "NaturalGas:Facility Building 1": 0.5}, index=index)
+
+        self.assertIsNone(cache.load("feature_report_1", "abc"))
+        cache.save("feature_report_1", "abc", report)
+        pd.testing.assert_frame_equal(cache.load("feature_report_1", "abc"), report, check_freq=False)
+        # stale key is not returned
+        self.assertIsNone(cache.load("feature_report_1", "def"))
+
+    def test_building_loads_from_cache(self):
+        uo_results = URBANoptResults(self.data_dir / "three_building_test", "baseline")
+        uo_results.process_load_results(["11", "14", "26"])
+        data_loads = uo_results.data_loads.copy()
+
+        for building_id in ["11", "14", "26"]:
+            self.assertTrue((uo_results.feature_report_cache.path / f"building_loads_{building_id}.npz").exists())
+
+        # reprocess, which will now read from the cache
+        uo_results.process_load_results(["11", "14", "26"])
+        pd.testing.assert_frame_equal(uo_results.data_loads, data_loads)
+
+    def test_building_loads_totals(self):
+        uo_results = URBANoptResults(self.data_dir / "three_building_test", "baseline")
+        uo_results.process_load_results(["11", "14", "26"], use_cache=False, max_workers=1)
+        data_loads = uo_results.data_loads.copy()
+
+        self.assertEqual(len(data_loads), 8760)
+        self.assertEqual(data_loads.index[1], pd.Timestamp("2017-01-01 02:00"))
+        self.assertIn("TotalWaterHeating (W) Building 26", data_loads.columns)
+        self.assertTrue((data_loads.dtypes == "float64").all())
+        pd.testing.assert_series_equal(
+            data_loads["TotalCoolingSensibleLoad"],
+            data_loads.filter(like="TotalCoolingSensibleLoad (W)").sum(axis=1),
+            check_names=False,
+        )
+        pd.testing.assert_series_equal(
+            data_loads["TotalSensibleLoadWithWaterHeating"],
+            data_loads[["TotalCoolingSensibleLoad", "TotalHeatingSensibleLoad", "TotalWaterHeating"]].sum(axis=1),
+            check_names=False,
+        )
+
+        # reading the buildings in parallel results in the same data frame
+        uo_results.process_load_results(["11", "14", "26"], use_cache=False)
+        pd.testing.assert_frame_equal(uo_results.data_loads, data_loads)
@@ -0,0 +1,141 @@
+import shutil
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from urbanopt_des.frame_store import FrameStore
+from urbanopt_des.modelica_results import ModelicaResults
+from urbanopt_des.urbanopt_analysis import URBANoptAnalysis
+from urbanopt_des.urbanopt_results import URBANoptResults
+
+
+class FrameStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = Path(__file__).parent / "test_output" / "frame_store"
+        if self.output_dir.exists():
+            shutil.rmtree(self.output_dir)
+        self.output_dir.mkdir(parents=True)
+
+        index = pd.date_range("2017-01-01", periods=24 * 10, freq="h", name="Datetime")
+        rng = np.random.default_rng(7)
+        self.frames = {
+            name: pd.DataFrame({"Total Electricity": rng.random(len(index)), "Total Natural Gas": rng.random(len(index))}, index=index)
+            for name in ["min_15", "min_60", "min_60_with_buildings"]
+        }
+        # strings are kept in the spilled state
+        self.frames["grid_metrics_daily"] = pd.DataFrame({"Peak": rng.random(len(index)), "Peak Date Time": index.astype(str)}, index=index)
+        self.frame_size = FrameStore.frame_size(self.frames["min_15"])
+
+    def test_least_recently_used_frames_are_spilled(self):
+        store = FrameStore(self.output_dir / "store", 2 * self.frame_size)
+        owner = ModelicaResults.__new__(ModelicaResults)
+        store.put(owner, "min_15", self.frames["min_15"])
+        store.put(owner, "min_60", self.frames["min_60"])
+        self.assertIs(store.get(owner, "min_15"), self.frames["min_15"])
+        self.assertEqual(store.spill_count, 0)
+
+        # min_60 is the least recently used frame
+        store.put(owner, "min_60_with_buildings", self.frames["min_60_with_buildings"])
+        self.assertEqual(list(store.spilled), [(id(owner), "min_60")])
+        self.assertEqual(store.memory_usage, 2 * self.frame_size)
+        self.assertEqual(sorted(store.names(owner)), ["min_15", "min_60", "min_60_with_buildings"])
+
+        # reloading min_60 spills min_15
+        pd.testing.assert_frame_equal(store.get(owner, "min_60"), self.frames["min_60"])
+        self.assertEqual(list(store.spilled), [(id(owner), "min_15")])
+        self.assertEqual((store.spill_count, store.reload_count), (2, 1))
+        self.assertEqual(len(list((self.output_dir / "store").iterdir())), 1)
+
+        store.discard(owner, "min_15")
+        self.assertFalse(store.contains(owner, "min_15"))
+        self.assertEqual(list((self.output_dir / "store").iterdir()), [])
+
+        # the frames of an owner are removed when it is garbage collected
+        del owner
+        self.assertEqual((store.frames, store.spilled, store.memory_usage), ({}, {}, 0))
+
+    def test_concurrent_attributes(self):
+        # the frames are spilled and reloaded by the threads while the other threads use the attributes
+        store = FrameStore(self.output_dir / "store", self.frame_size)
+        modelica = ModelicaResults.__new__(ModelicaResults)
+        modelica.use_frame_store(store)
+        for name, frame in self.frames.items():
+            setattr(modelica, name, frame)
+
+        def read(name):
+            for _ in range(20):
+                pd.testing.assert_frame_equal(getattr(modelica, name), self.frames[name])
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(read, self.frames))
+        self.assertIsNone(store.get_if_present(modelica, "min_5"))
+
+        # deleting an attribute removes its frame from the store
+        del modelica.min_15
+        self.assertFalse(store.contains(modelica, "min_15"))
+        with pytest.raises(AttributeError):
+            del modelica.min_15
+
+    def test_results_attributes(self):
+        store = FrameStore(self.output_dir / "store", self.frame_size)
+        modelica = ModelicaResults.__new__(ModelicaResults)
+        modelica.display_name = "5G"
+        modelica.min_15 = self.frames["min_15"]
+        modelica.use_frame_store(store)
+        self.assertNotIn("min_15", vars(modelica))
+
+        for name, frame in self.frames.items():
+            setattr(modelica, name, frame)
+        self.assertEqual(store.spill_count, 3)
+        for name, frame in self.frames.items():
+            pd.testing.assert_frame_equal(getattr(modelica, name), frame)
+        self.assertEqual(modelica.display_name, "5G")
+        with pytest.raises(AttributeError):
+            modelica.min_5
+
+        # assigning a value that is not a data frame removes the frame from the store
+        modelica.min_15 = None
+        self.assertIsNone(modelica.min_15)
+        self.assertFalse(store.contains(modelica, "min_15"))
+
+        # the frames are moved back to the attributes
+        modelica.use_frame_store(None)
+        self.assertEqual(store.names(modelica), [])
+        pd.testing.assert_frame_equal(vars(modelica)["min_60"], self.frames["min_60"])
+
+    def test_analysis_memory_budget(self):
+        # the frame that is used is never spilled, so the budget is at least the size of the largest frame
+        memory_budget = FrameStore.frame_size(self.frames["grid_metrics_daily"]) + self.frame_size
+        analysis = URBANoptAnalysis(Path(__file__).parent / "data" / "nrel_campus.json", self.output_dir, 2017, memory_budget=memory_budget)
+        urbanopt = URBANoptResults.__new__(URBANoptResults)
+        urbanopt.display_name = "baseline"
+        urbanopt.data = self.frames["min_60"]
+        urbanopt.data_15min = None
+        analysis.urbanopt = analysis._use_frame_store(urbanopt)
+        for analysis_name in ["5G", "4G"]:
+            modelica = ModelicaResults.__new__(ModelicaResults)
+            modelica.modelica_data = None
+            modelica.display_name = analysis_name
+            analysis.modelica[analysis_name] = analysis._use_frame_store(modelica)
+            for name, frame in self.frames.items():
+                setattr(modelica, name, frame)
+        self.assertLessEqual(analysis.frame_store.memory_usage, memory_budget)
+        self.assertTrue((self.output_dir / "_results_summary" / "frame_store").exists())
+        # the 15 minute data are still a view of the (reloaded) hourly data
+        pd.testing.assert_frame_equal(urbanopt.data_15min.to_frame().iloc[::4], self.frames["min_60"], check_freq=False)
+
+        # the spilled frames are saved in the snapshot
+        loaded = URBANoptAnalysis.load_snapshot(analysis.save_snapshot())
+        self.assertIsNone(loaded.frame_store)
+        for analysis_name in ["5G", "4G"]:
+            for name, frame in self.frames.items():
+                pd.testing.assert_frame_equal(getattr(loaded[analysis_name], name), frame)
+
+        analysis.set_memory_budget(None)
+        self.assertIsNone(analysis.frame_store)
+        self.assertFalse((self.output_dir / "_results_summary" / "frame_store").exists())
+        pd.testing.assert_frame_equal(vars(analysis["4G"])["min_15"], self.frames["min_15"])
@@ -1,7 +1,9 @@
 import unittest
 from pathlib import Path
 
-from urbanopt_des.urbanopt_geojson import DESGeoJSON
+import pandas as pd
+
+from urbanopt_des.urbanopt_geojson import DESGeoJSON, to_local_datetime
 
 
 class GeoJsonTest(unittest.TestCase):
@@ -16,3 +18,43 @@ class GeoJsonTest(unittest.TestCase):
 
         assert "Outdoor Test Facility" in geojson.get_building_names()
         assert "Research Support Facility" in geojson.get_building_names()
+
+    def test_meter_readings(self):
+        geojson = DESGeoJSON(self.data_dir / "nrel_campus.json")
+        self.assertIsNone(geojson.get_meter_readings())
+
+        building_ids = geojson.get_building_ids()
+        for building_id, feature in zip(
+            building_ids[:2], [f for f in geojson.data["features"] if f["properties"].get("type") == "Building"]
+        ):
+            feature["properties"]["meters"] = [
+                {
+                    "type": meter_type,
+                    "readings": [
+                        # the offset changes with daylight saving time
+                        {"start_time": "2019-01-01T00:00:00-07:00", "end_time": "2019-01-31T00:00:00-07:00", "converted_value": 1.0},
+                        {"start_time": "2019-07-01T00:00:00-06:00", "end_time": "2019-07-31T00:00:00-06:00", "converted_value": 2.0},
+                    ],
+                }
+                for meter_type in ["Natural Gas", "Electric - Grid"]
+            ]
+
+        readings = geojson.get_meter_readings()
+        self.assertEqual(len(readings), 8)
+        self.assertEqual(list(readings["meter_type"].cat.categories), ["Electric - Grid", "Natural Gas"])
+        self.assertEqual(list(readings["meter_type"][:4]), ["Natural Gas", "Natural Gas", "Electric - Grid", "Electric - Grid"])
+        self.assertEqual(list(readings["building_id"].unique()), building_ids[:2])
+        # the times are in the local time of the reading
+        self.assertEqual(list(readings["start_time"][:2]), [pd.Timestamp("2019-01-01"), pd.Timestamp("2019-07-01")])
+        # the readings in the GeoJSON are not changed
+        self.assertNotIn("meter_type", geojson.data["features"][0]["properties"].get("meters", [{}])[0].get("readings", [{}])[0])
+
+    def test_to_local_datetime(self):
+        values = pd.Series(["2019-03-01T10:00:00-07:00", "2019-07-01T10:00:00.5Z", "2019-07-01", None, "2019-03-01T10:00:00-07:00"])
+        expected = pd.Series(
+            pd.to_datetime(["2019-03-01 10:00", "2019-07-01 10:00:00.5", "2019-07-01", None, "2019-03-01 10:00"], format="ISO8601")
+        )
+        pd.testing.assert_series_equal(to_local_datetime(values), expected)
+
+        aware = pd.Series(pd.date_range("2019-01-01", periods=3, freq="D", tz="America/Denver"))
+        pd.testing.assert_series_equal(to_local_datetime(aware), pd.Series(pd.date_range("2019-01-01", periods=3, freq="D")))
@@ -0,0 +1,176 @@
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from urbanopt_des.grid_metrics import peak_diversity
+from urbanopt_des.peaks import top_k_peaks
+from urbanopt_des.results_base import ResultsBase
+from urbanopt_des.urbanopt_analysis import URBANoptAnalysis
+from urbanopt_des.urbanopt_results import URBANoptResults
+
+
+class GridMetricsTest(unittest.TestCase):
+    def setUp(self):
+        index = pd.date_range("2017-01-01 01:00", "2017-01-10 23:45", freq="15min", name="Datetime")
+        rng = np.random.default_rng(11)
+        self.meters = ["Total Electricity", "Total Thermal Cooling Energy"]
+        self.df = pd.DataFrame(
+            {"Total Electricity": rng.random(len(index)) * 1e5, "Total Thermal Cooling Energy": -rng.random(len(index)) * 1e5}, index=index
+        )
+        self.df.iloc[10:20, 0] = np.nan
+        # remove a full day of data and a few intervals
+        self.df = self.df.drop(self.df.loc["2017-01-05"].index).drop(self.df.index[300:305])
+
+    def test_daily_grid_metrics_match_groupby(self):
+        daily = ResultsBase().calculate_daily_grid_metrics(self.df, self.meters)
+        self.assertEqual(len(daily), 10)
+
+        for meter in self.meters:
+            expected = self.df.groupby([pd.Grouper(freq="1d")])[meter].agg(["max", "idxmax", "min", "idxmin", "mean", "sum"])
+            expected.columns = [
+                f"{meter} Max",
+                f"{meter} Max Datetime",
+                f"{meter} Min",
+                f"{meter} Min Datetime",
+                f"{meter} Mean",
+                f"{meter} Sum",
+            ]
+            expected[f"{meter} PVR"] = expected[f"{meter} Max"] / expected[f"{meter} Min"]
+            expected[f"{meter} Load Factor"] = expected[f"{meter} Mean"] / expected[f"{meter} Max"]
+            ramping = self.df[meter].diff().abs().fillna(0).groupby([pd.Grouper(freq="1d")]).sum() / 1e6
+            expected[f"{meter} System Ramping"] = ramping
+
+            # pandas returns the first timestamp of the data as the idxmax/idxmin of an empty day
+            with_data = expected.index != "2017-01-05"
+            pd.testing.assert_frame_equal(daily.loc[with_data, expected.columns], expected[with_data], check_freq=False)
+
+        # the day without data
+        self.assertTrue(np.isnan(daily.loc["2017-01-05", "Total Electricity Max"]))
+        self.assertTrue(pd.isna(daily.loc["2017-01-05", "Total Electricity Max Datetime"]))
+        self.assertEqual(daily.loc["2017-01-05", "Total Electricity Sum"], 0)
+
+    def test_top_k_peaks(self):
+        index = pd.date_range("2017-01-01", periods=96 * 4, freq="15min")
+        heating = np.zeros(len(index))
+        heating[[10, 11, 50, 200, 300]] = [9, 9, 8, 7, 6]
+        cooling = -heating
+        cooling[[12, 13]] = np.nan
+        loads = pd.DataFrame({"Heating": heating, "Cooling": cooling}, index=index)
+
+        values, positions = top_k_peaks(loads, ["Heating", "Cooling"], k=3, signs=[1, -1], n_candidates=3)
+        # duplicate values are only used once, and the earliest occurrence is the peak
+        np.testing.assert_array_equal(values, [[9, 8, 7], [-9, -8, -7]])
+        np.testing.assert_array_equal(positions, [[10, 50, 200], [10, 50, 200]])
+
+        # peaks must be at least a day apart, the candidates are expanded until enough peaks are found
+        values, positions = top_k_peaks(loads, ["Heating"], k=3, min_separation=pd.Timedelta(days=1), n_candidates=3)
+        np.testing.assert_array_equal(positions, [[10, 200, 300]])
+
+        # not enough data for all of the peaks
+        values, positions = top_k_peaks(loads.iloc[:3], ["Cooling"], k=5, signs=[-1], unique_values=False)
+        self.assertEqual(positions[0, -1], -1)
+        self.assertTrue(np.isnan(values[0, -1]))
+
+    def test_streaming_multi_year(self):
+        index = pd.date_range("2017-12-20", "2019-01-10 23:45", freq="15min")
+        rng = np.random.default_rng(5)
+        meters = ["Total Electricity", "Total Natural Gas", "Total Thermal Cooling Energy", "Total Thermal Heating Energy"]
+        data_15min = pd.DataFrame({meter: rng.random(len(index)) * 1e5 for meter in meters}, index=index)
+        data_15min["Total Thermal Cooling Energy"] *= -1
+        data_60min = data_15min.resample("h").mean()
+
+        results = ResultsBase()
+        annual = results.calculate_annual_grid_metrics(data_15min, data_60min, meters).copy()
+        daily = results.grid_metrics_daily.copy()
+        self.assertEqual(len(annual.columns), 3)
+
+        # chunks split in the middle of days and years
+        splits = [0, 1000, 1001, 1200, 20000, 35000, len(index)]
+        chunks_15min = [data_15min.iloc[start:end] for start, end in zip(splits[:-1], splits[1:])]
+        chunks_60min = [data_60min.iloc[:5000], data_60min.iloc[5000:]]
+        streamed = results.calculate_grid_metrics_from_chunks(chunks_15min, chunks_60min, meters)
+
+        pd.testing.assert_frame_equal(results.grid_metrics_daily, daily, check_freq=False)
+        pd.testing.assert_frame_equal(streamed, annual)
+
+        # the peaks are found per year
+        year_2018 = data_15min.loc["2018"]
+        self.assertEqual(annual.loc["Total Electricity Peak 1", pd.Timestamp("2018-12-31")], year_2018["Total Electricity"].max() / 1e6)
+        self.assertEqual(
+            annual.loc["Total Thermal Cooling Energy Peak Date Time 1", pd.Timestamp("2018-12-31")],
+            year_2018["Total Thermal Cooling Energy"].idxmin(),
+        )
+        self.assertEqual(annual.loc["Total Electricity Max Datetime", pd.Timestamp("2018-12-31")], year_2018["Total Electricity"].idxmax())
+
+        with pytest.raises(Exception, match="Chunks must be in order"):
+            results.calculate_grid_metrics_from_chunks([data_15min.iloc[100:], data_15min.iloc[:100]], [data_60min], meters)
+
+    def test_bulk_grid_metrics(self):
+        columns = {"1": "Total Electricity", "2": "Total Thermal Cooling Energy"}
+        results = ResultsBase()
+        bulk = results.calculate_bulk_grid_metrics(self.df, columns)
+        daily = results.calculate_daily_grid_metrics(self.df, list(columns.values()))
+
+        self.assertEqual(list(bulk.index), ["1", "2"])
+        for building_id, meter in columns.items():
+            self.assertEqual(bulk.loc[building_id, "Peak"], self.df[meter].max())
+            self.assertEqual(bulk.loc[building_id, "Peak Datetime"], self.df[meter].idxmax())
+            self.assertEqual(bulk.loc[building_id, "Min Datetime"], self.df[meter].idxmin())
+            self.assertAlmostEqual(bulk.loc[building_id, "Load Factor Mean"], daily[f"{meter} Load Factor"].mean())
+            self.assertAlmostEqual(bulk.loc[building_id, "PVR Max"], daily[f"{meter} PVR"].max())
+            self.assertAlmostEqual(bulk.loc[building_id, "System Ramping Sum"], daily[f"{meter} System Ramping"].sum())
+            self.assertAlmostEqual(bulk.loc[building_id, "Sum"], self.df[meter].sum())
+
+    def test_peak_diversity(self):
+        index = pd.date_range("2017-01-01", "2017-02-28 23:00", freq="h")
+        block = np.zeros((len(index), 3))
+        block[5, 0] = 10  # January peaks at different times
+        block[6, 1] = 20
+        block[7, 2] = np.nan
+        block[800, :] = [5, 5, 5]  # February peaks at the same time
+
+        annual = peak_diversity(block, index, freq="Y")
+        self.assertEqual(list(annual.index), ["2017"])
+        self.assertEqual(annual.loc["2017", "Coincident Peak"], 20)
+        self.assertEqual(annual.loc["2017", "Coincident Peak Datetime"], index[6])
+        self.assertEqual(annual.loc["2017", "Sum of Non-Coincident Peaks"], 35)
+        self.assertEqual(annual.loc["2017", "Diversity Factor"], 35 / 20)
+
+        monthly = peak_diversity(block, index, freq="M")
+        self.assertEqual(list(monthly.index), ["2017-01", "2017-02"])
+        self.assertEqual(monthly.loc["2017-01", "Sum of Non-Coincident Peaks"], 30)
+        self.assertEqual(monthly.loc["2017-02", "Coincident Peak"], 15)
+        self.assertEqual(monthly.loc["2017-02", "Diversity Factor"], 1)
+
+        # the rows do not need to be sorted
+        order = np.roll(np.arange(len(index)), -1)
+        pd.testing.assert_frame_equal(peak_diversity(block[order], index[order], freq="M"), monthly)
+
+    def test_analysis_diversity_factors(self):
+        data_dir = Path(__file__).parent / "data" / "three_building_5G"
+        output_dir = Path(__file__).parent / "test_output" / "diversity_factors"
+        uo_analysis = URBANoptAnalysis(data_dir / "three_building_test" / "FLXenabler.json", output_dir, 2017)
+        uo_analysis.urbanopt = URBANoptResults(data_dir / "three_building_test", "baseline")
+
+        # the last hour of the URBANopt data wraps back to the start of the year
+        index = pd.date_range("2017-01-01 01:00", "2017-12-31 23:00", freq="h").append(pd.DatetimeIndex(["2017-01-01 00:00"]))
+        rng = np.random.default_rng(2)
+        uo_analysis.urbanopt.data = pd.DataFrame(
+            {f"Electricity:Facility Building {b}": rng.random(len(index)) for b in ["11", "14", "26"]}, index=index
+        )
+        uo_analysis.urbanopt.data_15min = uo_analysis.urbanopt.data.resample("15min").ffill()
+
+        diversity = uo_analysis.calculate_diversity_factors()
+        self.assertEqual(len(diversity), 2 * 13)
+        annual = diversity.loc[("Non-Connected", "60min", "2017")]
+        building_data = uo_analysis.urbanopt.data
+        self.assertAlmostEqual(annual["Coincident Peak"], building_data.sum(axis=1).max())
+        self.assertAlmostEqual(annual["Sum of Non-Coincident Peaks"], building_data.max().sum())
+        monthly = diversity.loc[("Non-Connected", "60min", "2017-01")]
+        january = building_data.loc["2017-01"]
+        self.assertAlmostEqual(monthly["Coincident Peak"], january.sum(axis=1).max())
+        self.assertAlmostEqual(monthly["Sum of Non-Coincident Peaks"], january.max().sum())
+        self.assertGreater(annual["Diversity Factor"], 1)
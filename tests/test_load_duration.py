@@ -0,0 +1,80 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from urbanopt_des.load_duration import QuantileSketch, load_duration_curves
+from urbanopt_des.results_base import ResultsBase
+
+
+class LoadDurationTest(unittest.TestCase):
+    def setUp(self):
+        index = pd.date_range("2017-01-01", "2017-12-31 23:45", freq="15min")
+        rng = np.random.default_rng(9)
+        self.data = pd.DataFrame(
+            {
+                "Total Electricity": rng.gamma(2, 1e5, len(index)),
+                "Total Thermal Cooling Energy": -rng.random(len(index)) * 1e6,
+            },
+            index=index,
+        )
+        self.data.iloc[:10, 0] = np.nan
+        self.meters = list(self.data.columns)
+
+    def test_load_duration_curves(self):
+        curves = load_duration_curves(self.data, self.meters)
+        self.assertEqual(curves.index[0], 0.25)
+        self.assertEqual(curves.index[-1], 8760)
+        for meter in self.meters:
+            expected = self.data[meter].dropna().sort_values(ascending=False).to_numpy()
+            np.testing.assert_array_equal(curves[meter].to_numpy()[: len(expected)], expected)
+        # the missing values are at the end
+        self.assertTrue(curves["Total Electricity"].iloc[-10:].isna().all())
+
+    def test_quantile_sketch(self):
+        sketch = QuantileSketch.from_dataframe(self.data, self.meters)
+        self.assertEqual(sketch.grid.shape, (1001, 2))
+
+        p99 = sketch.quantile(0.99)
+        for meter in self.meters:
+            self.assertAlmostEqual(p99[meter], self.data[meter].quantile(0.99))
+        quantiles = sketch.quantile([0.5, 0.99])
+        self.assertEqual(list(quantiles.index), [0.5, 0.99])
+        self.assertAlmostEqual(quantiles.loc[0.5, "Total Electricity"], self.data["Total Electricity"].median())
+
+        threshold = self.data["Total Electricity"].quantile(0.9)
+        hours = sketch.hours_above({"Total Electricity": threshold, "Total Thermal Cooling Energy": -5e5})
+        expected = (self.data["Total Electricity"] > threshold).sum() / 4
+        self.assertLess(abs(hours["Total Electricity"] - expected), 0.001 * 8760)
+        expected = (self.data["Total Thermal Cooling Energy"] > -5e5).sum() / 4
+        self.assertLess(abs(hours["Total Thermal Cooling Energy"] - expected), 0.001 * 8760)
+        self.assertEqual(sketch.hours_above(1e12)["Total Electricity"], 0)
+
+    def test_results_load_duration(self):
+        results = ResultsBase()
+        curves = results.calculate_load_duration(self.data, self.meters)
+        self.assertEqual(curves["Total Electricity"].iloc[0], self.data["Total Electricity"].max())
+        self.assertEqual(results.load_duration_sketch.quantile(1.0)["Total Electricity"], self.data["Total Electricity"].max())
+
+    def test_negative_cooling_meter(self):
+        cooling = self.data["Total Thermal Cooling Energy"]
+        curves = load_duration_curves(self.data, self.meters, signs=[1, -1])
+        # the largest cooling load is the most negative value, at the first hour
+        np.testing.assert_array_equal(curves["Total Thermal Cooling Energy"].to_numpy(), cooling.sort_values().to_numpy())
+        np.testing.assert_array_equal(
+            curves["Total Electricity"].to_numpy(), load_duration_curves(self.data, self.meters)["Total Electricity"]
+        )
+
+        sketch = QuantileSketch.from_dataframe(self.data, self.meters, signs=[1, -1])
+        self.assertAlmostEqual(sketch.quantile(0.99)["Total Thermal Cooling Energy"], cooling.quantile(0.01))
+        self.assertEqual(sketch.quantile(1.0)["Total Thermal Cooling Energy"], cooling.min())
+        hours = sketch.hours_above({"Total Electricity": 0, "Total Thermal Cooling Energy": -5e5})
+        expected = (cooling < -5e5).sum() / 4
+        self.assertLess(abs(hours["Total Thermal Cooling Energy"] - expected), 0.001 * 8760)
+        self.assertEqual(sketch.to_dataframe()["Total Thermal Cooling Energy"].iloc[-1], cooling.min())
+
+        # the results infer the sign of the cooling meters, the same as the peaks
+        results = ResultsBase()
+        curves = results.calculate_load_duration(self.data, self.meters)
+        self.assertEqual(curves["Total Thermal Cooling Energy"].iloc[0], cooling.min())
+        self.assertAlmostEqual(results.load_duration_sketch.quantile(0.99)["Total Thermal Cooling Energy"], cooling.quantile(0.01))
@@ -1,7 +1,11 @@
 import unittest
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
+
 from urbanopt_des.modelica_results import ModelicaResults
+from urbanopt_des.resolution_view import UpsampledView
 
 
 class ModelicaResultsTest(unittest.TestCase):
@@ -60,3 +64,70 @@ class ModelicaResultsTest(unittest.TestCase):
         self.assertTrue("ETS Pump Electricity Total" in data.min_60.columns)
         print(data.min_60["ETS Pump Electricity Total"].sum())
         self.assertGreater(data.min_60["ETS Pump Electricity Total"].sum(), 0)
+
+    def test_align_indexes(self):
+        index = pd.date_range("2017-01-01", periods=8761, freq="h")
+        for other_index in [
+            index,
+            # the OpenStudio data start at the end of the first hour
+            pd.date_range("2017-01-01 01:00", periods=8760, freq="h"),
+            pd.date_range("2016-12-31 20:00", periods=100, freq="h"),
+            pd.date_range("2017-01-01 00:30", periods=8760, freq="h"),
+            # not a regular time step
+            index.delete([5, 100]),
+        ]:
+            rows, other_rows, joined = ModelicaResults.align_indexes(index, other_index)
+            expected = index.intersection(other_index, sort=False)
+            pd.testing.assert_index_equal(joined, expected)
+            pd.testing.assert_index_equal(index if rows is None else index[rows], expected)
+            pd.testing.assert_index_equal(other_index if other_rows is None else other_index[other_rows], expected)
+
+    def test_combine_with_openstudio_results(self):
+        building_ids = ["1", "2"]
+        meter_names = ModelicaResults.openstudio_meter_names(building_ids)
+        self.assertEqual(len(meter_names), 2 * 5 + 6)
+
+        rng = np.random.default_rng(2)
+        index = pd.date_range("2017-01-01 01:00", periods=8760, freq="h")
+        # the other fuels of the buildings are combined too, only for the buildings of the analysis
+        other_columns = ["Total Electricity", "Propane:Facility Building 2", "Propane:Facility Building 3"]
+        openstudio_df = pd.DataFrame(rng.random((len(index), len(meter_names) + 3)), index=index, columns=[*meter_names, *other_columns])
+        meter_names = [*meter_names, "Propane:Facility Building 2"]
+        openstudio_df_15 = openstudio_df.resample("15min").ffill()
+
+        alignment_cache = {}
+        analyses = []
+        for _ in range(2):
+            modelica = ModelicaResults.__new__(ModelicaResults)
+            modelica_index = pd.date_range("2017-01-01", periods=8761, freq="h")
+            modelica.min_60 = pd.DataFrame({"Total Boilers": rng.random(len(modelica_index))}, index=modelica_index)
+            modelica_index = pd.date_range("2017-01-01", periods=8761 * 4 - 3, freq="15min")
+            modelica.min_15 = pd.DataFrame({"Total Boilers": rng.random(len(modelica_index))}, index=modelica_index)
+            modelica.combine_with_openstudio_results(building_ids, openstudio_df, openstudio_df_15, alignment_cache)
+            analyses.append(modelica)
+
+            # the same as an inner join of the data frames
+            expected = pd.concat([modelica.min_60, openstudio_df[meter_names]], axis=1, join="inner")
+            expected.index.name = "datetime"
+            pd.testing.assert_frame_equal(modelica.min_60_with_buildings, expected)
+            expected = pd.concat([modelica.min_15, openstudio_df_15[meter_names]], axis=1, join="inner")
+            expected.index.name = "datetime"
+            pd.testing.assert_frame_equal(modelica.min_15_with_buildings, expected)
+            self.assertIsNone(modelica.min_60.index.name)
+
+        # the alignment of each resolution is reused by the second analysis
+        self.assertEqual(sorted(alignment_cache), ["15min", "60min"])
+        self.assertEqual(len(alignment_cache["60min"]["alignments"]), 1)
+        self.assertEqual(len(alignment_cache["15min"]["alignments"]), 1)
+
+        # a new data frame (or 15 minute view) with the same index reuses the alignment, and a new view of the
+        # same data reuses the selected columns
+        modelica.combine_with_openstudio_results(building_ids, openstudio_df.copy(), UpsampledView(openstudio_df), alignment_cache)
+        block = alignment_cache["15min"]["block"]
+        modelica.combine_with_openstudio_results(building_ids, openstudio_df, UpsampledView(openstudio_df), alignment_cache)
+        self.assertIs(alignment_cache["15min"]["block"], block)
+        self.assertEqual(len(alignment_cache["60min"]["alignments"]), 1)
+        self.assertEqual(len(alignment_cache["15min"]["alignments"]), 1)
+        expected = pd.concat([modelica.min_15, openstudio_df_15[meter_names]], axis=1, join="inner")
+        expected.index.name = "datetime"
+        pd.testing.assert_frame_equal(modelica.min_15_with_buildings, expected, check_freq=False)
@@ -0,0 +1,63 @@
+import shutil
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from modelica_builder.modelica_mos_file import ModelicaMOS
+
+from urbanopt_des.mos_writer import write_mos_file
+from urbanopt_des.urbanopt_results import URBANoptResults
+
+
+class MOSWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = Path(__file__).parent / "data" / "three_building_5G"
+        self.output_dir = Path(__file__).parent / "test_output" / "mos_writer"
+        if self.output_dir.exists():
+            shutil.rmtree(self.output_dir)
+        self.output_dir.mkdir(parents=True)
+
+    def test_matches_modelica_mos(self):
+        rng = np.random.default_rng(7)
+        values = np.column_stack([-rng.random(100) * 1e6, rng.random(100), np.zeros(100)])
+        values[5, 1] = 1e-7
+        time = np.arange(100) * 3600
+        header = "#1\n#Test header\n\n"
+
+        write_mos_file(self.output_dir / "fast.mos", time, values, header)
+        list_data = [[int(row[0]), *row[1:]] for row in np.column_stack([time, values]).tolist()]
+        ModelicaMOS.from_list(list_data, header_data=header).save_as(self.output_dir / "expected.mos")
+
+        self.assertEqual((self.output_dir / "fast.mos").read_text(), (self.output_dir / "expected.mos").read_text())
+
+        # the file can be read back by ModelicaMOS
+        mos = ModelicaMOS(self.output_dir / "fast.mos")
+        self.assertEqual(len(mos.data), 100)
+        self.assertEqual(mos.data[1][0], 3600)
+
+    def test_create_abstract_runs(self):
+        uo_results = URBANoptResults(self.data_dir / "three_building_test", "baseline")
+        uo_results.path = self.output_dir / "uo"
+        index = pd.date_range("2017-01-01 01:00", periods=8760, freq="h")
+        loads = pd.DataFrame(
+            {
+                "TotalCoolingSensibleLoad": -np.linspace(0, 5000, 8760),
+                "TotalHeatingSensibleLoad": np.linspace(100, 0, 8760),
+                "TotalWaterHeating": 50.0,
+            },
+            index=index,
+        )
+        uo_results.create_abstract_runs({"group_1": loads, "group_2": loads * 2}, max_workers=2)
+
+        for run_id, scale in [("group_1", 1), ("group_2", 2)]:
+            export_path = uo_results.path / "run" / "baseline" / run_id / "01_export_modelica_loads"
+            mos = ModelicaMOS(export_path / "modelica.mos")
+            self.assertEqual(len(mos.data), 8760)
+            self.assertEqual(mos.data[0], [0, 0.0, 100.0 * scale, 0.0])
+            self.assertEqual(mos.data[-1][0], 8760 * 3600 - 3600)
+            self.assertEqual(mos.retrieve_header_variable_value("Peak space cooling load", float), -5000.0 * scale)
+
+            building_loads = pd.read_csv(export_path / "building_loads.csv", index_col="time", parse_dates=True)
+            self.assertEqual(building_loads["TotalWaterHeating"].iloc[0], 0)
+            self.assertEqual(building_loads["TotalWaterHeating"].iloc[1], 50.0 * scale)
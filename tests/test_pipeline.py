@@ -0,0 +1,97 @@
+import shutil
+import threading
+import unittest
+from pathlib import Path
+
+import pytest
+
+from urbanopt_des.pipeline import Pipeline, hash_inputs
+
+
+class PipelineTest(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = Path(__file__).parent / "test_output" / "pipeline"
+        if self.output_dir.exists():
+            shutil.rmtree(self.output_dir)
+        self.output_dir.mkdir(parents=True)
+
+        self.input_file = self.output_dir / "input.json"
+        self.input_file.write_text('{"a": 1}')
+        self.config = {"future_year": 2024}
+        self.calls = []
+
+        self.pipeline = Pipeline(max_workers=4)
+        self.pipeline.add_stage("load", lambda: self.calls.append("load"), inputs=lambda: [self.input_file])
+        self.pipeline.add_stage("other", lambda: self.calls.append("other"))
+        self.pipeline.add_stage("combine", lambda: self.calls.append("combine"), depends_on=["load", "other"])
+        self.pipeline.add_stage(
+            "carbon", lambda: self.calls.append("carbon"), depends_on=["combine"], inputs=lambda: self.config["future_year"]
+        )
+        self.pipeline.add_stage("summary", lambda: self.calls.append("summary"), depends_on=["carbon"])
+
+    def test_incremental_runs(self):
+        ran = self.pipeline.run()
+        self.assertEqual(set(ran), {"load", "other", "combine", "carbon", "summary"})
+        self.assertLess(self.calls.index("combine"), self.calls.index("carbon"))
+
+        # nothing changed
+        self.assertEqual(self.pipeline.run(), [])
+
+        # a new config value only runs the stage and the stages after it
+        self.config["future_year"] = 2045
+        self.assertEqual(self.pipeline.run(), ["carbon", "summary"])
+
+        # the contents of the file are hashed, not the modification time
+        self.input_file.write_text('{"a": 1}')
+        self.assertEqual(self.pipeline.run(), [])
+        self.input_file.write_text('{"a": 2}')
+        self.assertEqual(self.pipeline.run(), ["load", "combine", "carbon", "summary"])
+
+        self.pipeline.invalidate("other")
+        self.assertEqual(self.pipeline.run(), ["other", "combine", "carbon", "summary"])
+
+    def test_independent_stages_run_concurrently(self):
+        # both stages must be running at the same time to pass the barrier
+        barrier = threading.Barrier(2, timeout=10)
+        pipeline = Pipeline(max_workers=2)
+        pipeline.add_stage("urbanopt", barrier.wait)
+        pipeline.add_stage("modelica", barrier.wait)
+        pipeline.add_stage("combine", lambda: None, depends_on=["urbanopt", "modelica"])
+        self.assertEqual(pipeline.run()[-1], "combine")
+
+    def test_results_are_applied_on_the_calling_thread(self):
+        results, threads = {}, []
+
+        def apply(name, result):
+            threads.append(threading.current_thread())
+            results[name] = result
+
+        pipeline = Pipeline(max_workers=2)
+        for name in ["5G", "4G"]:
+            pipeline.add_stage(f"modelica:{name}", lambda name=name: f"{name} results", apply=lambda result, name=name: apply(name, result))
+        pipeline.add_stage("combine", lambda: self.calls.append(dict(results)), depends_on=["modelica:5G", "modelica:4G"])
+        pipeline.run()
+        self.assertEqual(threads, [threading.current_thread()] * 2)
+        # the results are applied before the stages that depend on them start
+        self.assertEqual(self.calls, [{"5G": "5G results", "4G": "4G results"}])
+
+    def test_failed_stage(self):
+        def fail():
+            raise ValueError("bad data")
+
+        self.pipeline.add_stage("other", fail)
+        with pytest.raises(Exception, match="Pipeline stage other failed: bad data"):
+            self.pipeline.run()
+        self.assertNotIn("combine", self.calls)
+
+        # the stage that failed and the stages after it run again
+        self.pipeline.add_stage("other", lambda: self.calls.append("other"))
+        self.assertEqual(self.pipeline.run(), ["other", "combine", "carbon", "summary"])
+
+        self.pipeline.add_stage("load", lambda: None, depends_on=["summary"])
+        with pytest.raises(Exception, match="Circular dependency"):
+            self.pipeline.run()
+
+    def test_hash_inputs(self):
+        self.assertEqual(hash_inputs({"b": [1, 2], "a": "x"}), hash_inputs({"a": "x", "b": [1, 2]}))
+        self.assertNotEqual(hash_inputs([self.input_file]), hash_inputs([self.output_dir / "missing.json"]))
@@ -0,0 +1,116 @@
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from urbanopt_des.resolution_view import UpsampledView
+from urbanopt_des.urbanopt_results import URBANoptResults
+
+
+class ResolutionViewTest(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = Path(__file__).parent / "test_output" / "resolution_view"
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        index = pd.date_range("2017-01-01 01:00", periods=24 * 10, freq="h", name="Datetime")
+        rng = np.random.default_rng(3)
+        self.data = pd.DataFrame(
+            {"Electricity:Facility": rng.random(len(index)) * 1e6, "NaturalGas:Facility": rng.random(len(index)) * 1e5},
+            index=index,
+        )
+
+    def test_view_matches_ffill(self):
+        expected = self.data.resample("15min").ffill()
+        view = UpsampledView(self.data, "15min")
+        self.assertEqual(view.shape, expected.shape)
+        pd.testing.assert_frame_equal(view.to_frame(), expected, check_freq=False)
+        pd.testing.assert_series_equal(view["NaturalGas:Facility"], expected["NaturalGas:Facility"], check_freq=False)
+        pd.testing.assert_frame_equal(view[["Electricity:Facility"]], expected[["Electricity:Facility"]], check_freq=False)
+
+        # rows by position
+        pd.testing.assert_frame_equal(view.iloc[192:].to_frame(), expected.iloc[192:], check_freq=False)
+        pd.testing.assert_series_equal(view.iloc[5], expected.iloc[5])
+
+    def test_unsorted_source(self):
+        # the building loads end with the first hour of the year
+        unsorted = pd.concat([self.data.iloc[1:], self.data.iloc[:1]])
+        view = UpsampledView(unsorted, "15min")
+        pd.testing.assert_frame_equal(view.to_frame(), self.data.resample("15min").ffill(), check_freq=False)
+
+    def test_view_reflects_source(self):
+        view = UpsampledView(self.data, "15min")
+        self.data["Total Electricity"] = self.data["Electricity:Facility"] * 2
+        self.assertIn("Total Electricity", view)
+        np.testing.assert_array_equal(view["Total Electricity"].to_numpy(), view["Electricity:Facility"].to_numpy() * 2)
+
+    def test_to_csv(self):
+        view = UpsampledView(self.data, "15min")
+        view.to_csv(self.output_dir / "view.csv", chunk_rows=100)
+        self.data.resample("15min").ffill().to_csv(self.output_dir / "expected.csv")
+        self.assertEqual((self.output_dir / "view.csv").read_text(), (self.output_dir / "expected.csv").read_text())
+
+    def test_results_data_15min(self):
+        results = URBANoptResults.__new__(URBANoptResults)
+        results.data = None
+        results.data_15min = None
+        self.assertIsNone(results.data_15min)
+
+        results.data = self.data
+        self.assertIsInstance(results.data_15min, UpsampledView)
+
+        # an assigned data frame is returned as is
+        results.data_15min = self.data.resample("15min").ffill()
+        self.assertIsInstance(results.data_15min, pd.DataFrame)
+
+    def test_dataframe_fallback(self):
+        view = UpsampledView(self.data, "15min")
+        expected = self.data.resample("15min").ffill()
+        pd.testing.assert_series_equal(view.sum(), expected.sum())
+        pd.testing.assert_frame_equal(view.loc["2017-01-02"], expected.loc["2017-01-02"], check_freq=False)
+        pd.testing.assert_frame_equal(view.resample("D").mean(), expected.resample("D").mean())
+        with pytest.raises(AttributeError):
+            view.not_a_dataframe_attribute
+
+    def test_view_is_read_only(self):
+        view = UpsampledView(self.data, "15min")
+        expected = self.data.resample("15min").ffill()
+        pd.testing.assert_series_equal(view.loc["2017-01-02", "Electricity:Facility"], expected.loc["2017-01-02", "Electricity:Facility"])
+        with pytest.raises(Exception, match="read only"):
+            view.loc["2017-01-02", "Electricity:Facility"] = 0
+        with pytest.raises(Exception, match="read only"):
+            view.iloc[0:4] = 0
+        with pytest.raises(Exception, match="read only"):
+            view["Total Electricity"] = 0
+        with pytest.raises(Exception, match="read only"):
+            view.insert(0, "Total Electricity", 0)
+        with pytest.raises(Exception, match="read only"):
+            view.fillna(0, inplace=True)  # noqa: PD002
+        pd.testing.assert_frame_equal(view.to_frame(), expected, check_freq=False)
+
+        # the materialized data frame is reused until the columns of the source change
+        view.sum()
+        frame = view._frame
+        view.mean()
+        self.assertIs(view._frame, frame)
+        self.data["Total Electricity"] = self.data["Electricity:Facility"]
+        self.assertIn("Total Electricity", view.sum())
+        self.assertIsNot(view._frame, frame)
+
+        # the data frame of to_frame can be changed
+        frame = view.to_frame()
+        frame.loc["2017-01-02", "Electricity:Facility"] = 0
+        self.assertNotEqual(view.loc["2017-01-02", "Electricity:Facility"].sum(), 0)
+
+    def test_results_positions_are_reused(self):
+        results = URBANoptResults.__new__(URBANoptResults)
+        results.data = self.data
+        results.data_15min = None
+        first = results.data_15min
+        self.assertIs(results.data_15min.positions, first.positions)
+
+        # new hourly data have new positions
+        results.data = self.data.iloc[24:].copy()
+        self.assertIsNot(results.data_15min.positions, first.positions)
+        pd.testing.assert_frame_equal(results.data_15min.to_frame(), results.data.resample("15min").ffill(), check_freq=False)
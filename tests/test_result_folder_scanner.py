@@ -0,0 +1,105 @@
+import shutil
+import unittest
+from pathlib import Path
+
+from urbanopt_des.result_folder_scanner import ResultFolderScanner
+from urbanopt_des.urbanopt_analysis import URBANoptAnalysis
+
+
+class ResultFolderScannerTest(unittest.TestCase):
+    def setUp(self):
+        self.root = Path(__file__).parent / "test_output" / "result_folder_scanner"
+        if self.root.exists():
+            shutil.rmtree(self.root)
+
+        # dymola simulation with a long log that finished
+        self._folder(
+            "dymola_ok",
+            {"dslog.txt": "Log-file of program ./dymosim\n" * 10000, "district.mat": "data", "analysis_name.txt": "Dymola OK\n"},
+        )
+        # dymola simulation with the error at the end of the log
+        self._folder(
+            "dymola_error", {"dslog.txt": "Log-file of program ./dymosim\n" * 10000 + "Error: simulation failed\n", "district.mat": "data"}
+        )
+        self._folder(
+            "dymola_stop_time",
+            {"dslog.txt": 'Integration terminated before reaching "StopTime"\n', "district.mat": "data"},
+        )
+        self._folder("dymola_no_mat", {"dslog.txt": "ok\n"})
+        # openmodelica simulations
+        self._folder("om_ok", {"district_results/district_res.mat": "data", "analysis_name.txt": "OM OK"})
+        self._folder("om_empty", {"district_results/district_res.mat": ""})
+        self._folder("om_no_mat", {"district_results/district.log": "log"})
+        self._folder("unknown", {})
+        # not a simulation folder
+        (self.root / "other").mkdir()
+
+    def _folder(self, name: str, files: dict[str, str]) -> None:
+        folder = self.root / name
+        folder.mkdir(parents=True)
+        (folder / "package.mo").write_text("within ;")
+        for filename, content in files.items():
+            (folder / filename).parent.mkdir(parents=True, exist_ok=True)
+            (folder / filename).write_text(content)
+
+    def test_scan(self):
+        results, bad_or_empty_results = URBANoptAnalysis.get_list_of_valid_result_folders(self.root)
+        self.assertEqual(list(results), ["Dymola OK", "OM OK"])
+        self.assertEqual(results["Dymola OK"]["mat_path"], self.root / "dymola_ok" / "district.mat")
+        self.assertEqual(results["OM OK"]["mat_path"], self.root / "om_ok" / "district_results" / "district_res.mat")
+        self.assertEqual(results["OM OK"]["path_to_analysis"], self.root / "om_ok")
+
+        errors = {path.name: result["error"] for path, result in bad_or_empty_results.items()}
+        self.assertEqual(
+            errors,
+            {
+                "dymola_error": "Error in dslog.txt",
+                "dymola_no_mat": "No result .mat file in root directory",
+                "dymola_stop_time": "Error did not reach the stop time",
+                "om_empty": "Empty .mat file in _results directory",
+                "om_no_mat": "No result .mat file in _results directory",
+                "unknown": "No valid results found",
+            },
+        )
+
+    def test_index(self):
+        # without an index, every folder is checked and no files are written
+        scanner = ResultFolderScanner(self.root)
+        first = scanner.scan()
+        self.assertEqual(len(scanner.checked), 8)
+        self.assertEqual(scanner.scan(), first)
+        self.assertEqual(len(scanner.checked), 8)
+        self.assertFalse(any(path.is_file() for path in self.root.iterdir()))
+
+        index_path = self.root.parent / "result_folder_scanner_summary" / "result_folder_index.json"
+        index_path.unlink(missing_ok=True)
+        scanner = ResultFolderScanner(self.root, index_path=index_path, max_workers=4)
+        self.assertEqual(scanner.scan(), first)
+        self.assertEqual(len(scanner.checked), 8)
+        self.assertTrue(index_path.exists())
+
+        # nothing changed, so no folders are checked
+        self.assertEqual(scanner.scan(), first)
+        self.assertEqual(scanner.checked, [])
+
+        # fixing a simulation only checks that folder
+        (self.root / "om_empty" / "district_results" / "district_res.mat").write_text("data")
+        results, bad_or_empty_results = scanner.scan()
+        self.assertEqual(scanner.checked, ["om_empty"])
+        # without an analysis_name.txt, the name is the folder of the .mat file
+        self.assertEqual(results["district_results"]["path_to_analysis"], self.root / "om_empty")
+        self.assertEqual(len(bad_or_empty_results), 5)
+
+        scanner.scan(use_index=False)
+        self.assertEqual(len(scanner.checked), 8)
+
+    def test_read_tail(self):
+        path = self.root / "dymola_error" / "dslog.txt"
+        lines = ResultFolderScanner.read_tail(path, 100)
+        self.assertEqual(lines[-1], "Error: simulation failed")
+        # the partial first line is dropped
+        self.assertEqual(lines[0], "Log-file of program ./dymosim")
+        self.assertEqual(
+            ResultFolderScanner.read_tail(self.root / "dymola_stop_time" / "dslog.txt"),
+            ['Integration terminated before reaching "StopTime"'],
+        )
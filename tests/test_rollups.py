@@ -0,0 +1,51 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from urbanopt_des.rollups import RollupEngine
+
+
+class RollupsTest(unittest.TestCase):
+    def setUp(self):
+        # hour ending data, so the last row is in the next year
+        index = pd.date_range("2017-01-01 01:00", periods=8760, freq="h", name="Datetime")
+        rng = np.random.default_rng(4)
+        self.data = pd.DataFrame(
+            {
+                "Total Electricity": rng.random(len(index)) * 1e6,
+                "Total Natural Gas": rng.random(len(index)) * 1e5,
+                "Number of Hours": np.ones(len(index), dtype=np.int64),
+            },
+            index=index,
+        )
+        self.data.iloc[10, 0] = np.nan
+
+    def test_monthly_and_annual(self):
+        engine = RollupEngine()
+        rollups = engine.rollup(self.data)
+        self.assertEqual(sorted(rollups), ["annual", "monthly"])
+        pd.testing.assert_frame_equal(rollups["monthly"], self.data.resample("ME").sum())
+        pd.testing.assert_frame_equal(rollups["annual"], self.data.resample("YE").sum())
+
+        # the calendar is shared by the data with the same index
+        engine.rollup(self.data * 2)
+        engine.rollup(self.data.iloc[:-1])
+        self.assertEqual(len(engine.calendars), 2)
+
+    def test_daily_and_tou(self):
+        engine = RollupEngine(daily=True, tou_periods={"On-Peak": range(12, 18), "Mid-Peak": [8, 9, 10, 11]})
+        rollups = engine.rollup(self.data)
+        pd.testing.assert_frame_equal(rollups["monthly"], self.data.resample("ME").sum())
+        pd.testing.assert_frame_equal(rollups["annual"], self.data.resample("YE").sum())
+        pd.testing.assert_frame_equal(rollups["daily"], self.data.resample("D").sum())
+
+        tou = rollups["tou"]
+        self.assertEqual(tou.index.names, ["Datetime", "Period"])
+        self.assertEqual(list(tou.index.levels[1]), ["Mid-Peak", "On-Peak", "Other"])
+        on_peak = self.data[self.data.index.hour.isin(range(12, 18))].resample("ME").sum()
+        # the last month only has the first hour of the next year, which is not on-peak
+        on_peak = on_peak.reindex(rollups["monthly"].index, fill_value=0)
+        pd.testing.assert_frame_equal(tou.xs("On-Peak", level="Period"), on_peak)
+        self.assertEqual(tou.loc[("2017-01-31", "Other"), "Number of Hours"], 31 * 14 - 1)
+        pd.testing.assert_frame_equal(tou.groupby(level="Datetime").sum(), rollups["monthly"], check_freq=False, check_names=False)
@@ -0,0 +1,89 @@
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from urbanopt_des.scaling import interval_scaling_factors
+from urbanopt_des.urbanopt_results import URBANoptResults
+
+
+class ScalingTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = Path(__file__).parent / "data" / "three_building_5G"
+        self.index = pd.date_range("2017-01-01 00:00", "2017-03-31 23:00", freq="h")
+
+    def test_interval_scaling_factors(self):
+        start_times = pd.Series(pd.to_datetime(["2017-01-01", "2017-02-01", "2017-01-01", "2017-01-15"]))
+        end_times = pd.Series(pd.to_datetime(["2017-02-01 00:00:00", "2017-02-28 23:59:59", "2017-01-31 23:59:59", "2017-01-20 00:00:00"]))
+        factors = np.array([2.0, 3.0, np.nan, 0.5])
+        groups = np.array([0, 0, 1, 1])
+
+        result = interval_scaling_factors(self.index, start_times, end_times, groups, factors, 3)
+        self.assertEqual(result.shape, (len(self.index), 3))
+
+        # overlapping at 2017-02-01 00:00, both periods are applied
+        self.assertEqual(result[self.index.get_loc(pd.Timestamp("2017-01-31 23:00")), 0], 2.0)
+        self.assertEqual(result[self.index.get_loc(pd.Timestamp("2017-02-01 00:00")), 0], 6.0)
+        self.assertEqual(result[self.index.get_loc(pd.Timestamp("2017-02-01 01:00")), 0], 3.0)
+        self.assertEqual(result[self.index.get_loc(pd.Timestamp("2017-03-01 00:00")), 0], 1.0)
+
+        # NaN factors are skipped and the end time is inclusive
+        self.assertEqual(result[self.index.get_loc(pd.Timestamp("2017-01-14 23:00")), 1], 1.0)
+        self.assertEqual(result[self.index.get_loc(pd.Timestamp("2017-01-20 00:00")), 1], 0.5)
+        self.assertEqual(result[self.index.get_loc(pd.Timestamp("2017-01-20 01:00")), 1], 1.0)
+
+        # group without any scalars
+        self.assertTrue((result[:, 2] == 1.0).all())
+
+    def test_overlapping_intervals(self):
+        # the same as scaling by each interval in turn, including an interval inside another interval
+        start_times = pd.Series(pd.to_datetime(["2017-01-01", "2017-01-10", "2017-01-05", "2017-01-20"]))
+        end_times = pd.Series(pd.to_datetime(["2017-01-31 23:59:59", "2017-01-15 23:59:59", "2017-01-25 23:59:59", "2017-02-10 23:59:59"]))
+        factors = np.array([2.0, 3.0, 5.0, 7.0])
+        groups = np.array([0, 0, 0, 1])
+        result = interval_scaling_factors(self.index, start_times, end_times, groups, factors, 2)
+
+        expected = np.ones((len(self.index), 2))
+        for start_time, end_time, group, factor in zip(start_times, end_times, groups, factors):
+            expected[(self.index >= start_time) & (self.index <= end_time), group] *= factor
+        np.testing.assert_array_equal(result, expected)
+        self.assertEqual(result[self.index.get_loc(pd.Timestamp("2017-01-12 00:00")), 0], 30.0)
+        self.assertEqual(result[self.index.get_loc(pd.Timestamp("2017-01-20 00:00")), 0], 10.0)
+
+    def test_scale_results_all_buildings(self):
+        uo_results = URBANoptResults(self.data_dir / "three_building_test", "baseline")
+        columns = {}
+        for building_id in ["11", "14"]:
+            for column in uo_results.get_urbanopt_default_feature_report_columns()[1:]:
+                columns[f"{column} Building {building_id}"] = 1.0
+            columns[f"Electricity:Facility Building {building_id}"] = 10.0
+            columns[f"InteriorLights:Electricity Building {building_id}"] = 4.0
+            columns[f"NaturalGas:Facility Building {building_id}"] = 20.0
+            columns[f"Heating:NaturalGas Building {building_id}"] = 5.0
+        uo_results.data = pd.DataFrame(columns, index=self.index)
+        uo_results.data_15min = uo_results.data.resample("15min").ffill()
+
+        scalars = pd.DataFrame(
+            {
+                "start_time": pd.to_datetime(["2021-01-01", "2021-01-01", "2020-01-01"]),
+                "end_time": pd.to_datetime(["2021-01-31 23:59:59", "2021-01-31 23:59:59", "2020-01-31 23:59:59"]),
+                "building_id": [11, 14, 14],
+                "scaling_factor_electricity": [2.0, 0.5, 100.0],
+                "scaling_factor_natural_gas": [np.nan, 3.0, 100.0],
+            }
+        )
+        uo_results.scale_results(scalars, year_of_data=2017, year_of_meters=2021)
+
+        for df in [uo_results.data, uo_results.data_15min]:
+            january = df.loc["2017-01"]
+            february = df.loc["2017-02"]
+            # both buildings are scaled, not only the last building in the scalars
+            self.assertTrue((january["Electricity:Facility Building 11"] == 20.0).all())
+            self.assertTrue((january["InteriorLights:Electricity Building 11"] == 8.0).all())
+            self.assertTrue((january["NaturalGas:Facility Building 11"] == 20.0).all())
+            self.assertTrue((january["Electricity:Facility Building 14"] == 5.0).all())
+            self.assertTrue((january["Heating:NaturalGas Building 14"] == 15.0).all())
+            # outside of the billing period and other meter years are not scaled
+            self.assertTrue((february["Electricity:Facility Building 11"] == 10.0).all())
+            self.assertTrue((february["NaturalGas:Facility Building 14"] == 20.0).all())
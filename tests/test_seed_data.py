@@ -0,0 +1,100 @@
+import json
+import shutil
+import unittest
+from pathlib import Path
+
+from urbanopt_des.urbanopt_analysis import URBANoptAnalysis
+
+
+class SeedDataTest(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = Path(__file__).parent / "test_output" / "seed_data"
+        if self.output_dir.exists():
+            shutil.rmtree(self.output_dir)
+        self.output_dir.mkdir(parents=True)
+
+        polygon = {"type": "Polygon", "coordinates": [[[0, 0], [0, 1], [1, 1], [0, 0]]]}
+
+        def meter(meter_type, values):
+            return {
+                "type": meter_type,
+                "readings": [
+                    {
+                        "start_time": f"2022-{month:02d}-01T00:00:00-05:00",
+                        "end_time": f"2022-{month:02d}-28T00:00:00-05:00",
+                        "converted_value": value,
+                    }
+                    for month, value in enumerate(values, start=1)
+                ],
+            }
+
+        def building(floor_area, meters=None, **properties):
+            properties.update({"Property Type": "Office", "Gross Floor Area": floor_area, "Footprint Area": 1000, "Number of Stories": 2})
+            if meters is not None:
+                properties["meters"] = meters
+            return {"type": "Feature", "properties": properties, "geometry": polygon}
+
+        features = [
+            # the peak is across all of the electricity meters, the first reading is used for a repeated peak
+            building(
+                130000,
+                [meter("Electric - Grid", [1, 5, 3]), meter("Electric - Grid", [2, 4, 5]), meter("Natural Gas", [7, 2])],
+                **{"Year Built": 1979},
+            ),
+            building(130000, [meter("Electric - Grid", [1, 2]), meter("Water", [9, 9])], **{"Year Built": 2004}),
+            # no positive gas readings
+            building(80000, [meter("Natural Gas", [0, -1])], **{"Year Built": 2019}),
+            building(75000, []),
+            # taxlots are skipped
+            building(50000, taxlot_view_id=1),
+        ]
+        self.seed_path = self.output_dir / "seed.json"
+        with open(self.seed_path, "w") as f:
+            json.dump({"type": "FeatureCollection", "name": "SEED", "features": features}, f)
+
+        self.analysis = URBANoptAnalysis(Path(__file__).parent / "data" / "nrel_campus.json", self.output_dir)
+        self.analysis.geojson_file = self.seed_path
+
+    def test_update_geojson_from_seed_data(self):
+        geojson = self.analysis.update_geojson_from_seed_data()
+        self.assertEqual(geojson["features"][0]["properties"]["type"], "Site Origin")
+        buildings = [feature["properties"] for feature in geojson["features"][1:]]
+        self.assertEqual([building["id"] for building in buildings], ["1", "2", "3", "4"])
+
+        self.assertEqual(buildings[0]["electricity_peak"], 5)
+        self.assertEqual(buildings[0]["electricity_peak_month"], 2)
+        self.assertEqual(buildings[0]["natural_gas_peak"], 7)
+        self.assertEqual(buildings[0]["natural_gas_peak_month"], 1)
+        self.assertEqual(buildings[2]["electricity_peak"], 0)
+        self.assertIsNone(buildings[2]["natural_gas_peak_month"])
+        self.assertNotIn("electricity_peak", buildings[3])
+
+        self.assertEqual(
+            [building["system_type"] for building in buildings],
+            [
+                "VAV chiller with gas boiler reheat",
+                "VAV chiller with PFP boxes",
+                "PVAV with gas heat with electric reheat",
+                # no meters, so gas is assumed
+                "PSZ-AC with gas coil",
+            ],
+        )
+        self.assertEqual([building.get("template") for building in buildings], ["DOE Ref Pre-1980", "90.1-2004", "DOE Ref Pre-1980", None])
+
+        # the SEED file is not changed
+        with open(self.seed_path) as f:
+            self.assertNotIn("electricity_peak", json.load(f)["features"][0]["properties"])
+
+    def test_infer_system_types_and_templates(self):
+        self.assertEqual(
+            URBANoptAnalysis.infer_system_types([75000, 75001, 125000, 125001], [False, True, False, True]),
+            ["PSZ-HP", "PVAV with gas heat with electric reheat", "PVAV with PFP boxes", "VAV chiller with gas boiler reheat"],
+        )
+        self.assertEqual(
+            URBANoptAnalysis.infer_templates([1979, 1980, 2006, 2007, 2015, 2018, 2019]),
+            ["DOE Ref Pre-1980", "DOE Ref 1980-2004", "90.1-2004", "90.1-2007", "90.1-2013", "90.1-2016", "DOE Ref Pre-1980"],
+        )
+        self.assertEqual(
+            URBANoptAnalysis.seed_meter_peaks([("1", [])]),
+            {"1": {"electricity_peak": 0, "electricity_peak_month": None, "natural_gas_peak": 0, "natural_gas_peak_month": None}},
+        )
@@ -0,0 +1,156 @@
+import json
+import shutil
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from urbanopt_des.emissions_cube import CarbonEmissionsCube
+from urbanopt_des.modelica_results import ModelicaResults
+from urbanopt_des.resolution_view import UpsampledView
+from urbanopt_des.snapshot import read_snapshot, write_snapshot
+from urbanopt_des.urbanopt_analysis import URBANoptAnalysis
+from urbanopt_des.urbanopt_results import URBANoptResults
+
+
+class SnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = Path(__file__).parent / "test_output" / "snapshot"
+        if self.output_dir.exists():
+            shutil.rmtree(self.output_dir)
+        self.output_dir.mkdir(parents=True)
+
+        self.analysis = URBANoptAnalysis(Path(__file__).parent / "data" / "nrel_campus.json", self.output_dir, 2017)
+
+        index = pd.date_range("2017-01-01", periods=24 * 10, freq="h", name="Datetime")
+        rng = np.random.default_rng(5)
+        urbanopt = URBANoptResults.__new__(URBANoptResults)
+        urbanopt.display_name = "baseline"
+        urbanopt.data = pd.DataFrame(
+            {
+                "Total Electricity": rng.random(len(index)) * 1e6,
+                "Total Natural Gas": rng.random(len(index)) * 1e5,
+                "Number of Buildings": np.full(len(index), 3, dtype=np.int64),
+            },
+            index=index,
+        )
+        urbanopt.data_15min = None
+        urbanopt.data_15min_to_process = urbanopt.data_15min.iloc[8:]
+        urbanopt.building_characteristics = {"1": {"floor_area": 1000.0}}
+        self.analysis.urbanopt = urbanopt
+
+        modelica = ModelicaResults.__new__(ModelicaResults)
+        modelica.modelica_data = object()
+        modelica.display_name = "5G"
+        modelica.min_60_with_buildings = urbanopt.data[["Total Electricity", "Total Natural Gas"]] * 1.1
+        modelica.end_use_summary = pd.DataFrame(
+            {"Units": ["kWh", "kWh"], "Value": [1.0, 2.0]},
+            index=pd.Index(["Total Electricity", "Total Natural Gas"], name="End Use"),
+        )
+        self.analysis.modelica = {"5G": modelica}
+
+        self.analysis.grid_summary = pd.DataFrame(
+            [[1.0, 2.0]],
+            index=pd.MultiIndex.from_tuples([("Peak", "kW")], names=["Metric", "Units"]),
+            columns=["Non-Connected", "5G"],
+        )
+        self.analysis.carbon_emissions_cube = CarbonEmissionsCube.from_dataframes(
+            {"Non-Connected": urbanopt.data, "5G": modelica.min_60_with_buildings},
+            ["RFCE"],
+            [2024],
+            natural_gas_column="Total Natural Gas",
+        )
+        self.analysis.carbon_emissions = self.analysis.carbon_emissions_cube.annual()
+
+    def test_save_and_load_snapshot(self):
+        path = self.analysis.save_snapshot()
+        self.assertEqual(path, self.output_dir / "_results_summary" / "snapshot")
+        with open(path / "manifest.json") as f:
+            manifest = json.load(f)
+        self.assertEqual(manifest["metadata"]["modelica"], ["5G"])
+        # the state is JSON, and the column labels are in the manifest
+        self.assertEqual(sorted(file.name for file in path.glob("*") if file.suffix != ".npy"), ["manifest.json", "state.json"])
+        self.assertIn(["Total Electricity", "Total Natural Gas"], [index.get("labels") for index in manifest["indexes"].values()])
+
+        loaded = URBANoptAnalysis.load_snapshot(path)
+        self.assertEqual(loaded.geojson.get_building_names(), self.analysis.geojson.get_building_names())
+        self.assertIsNone(loaded.pipeline)
+        self.assertEqual(loaded.year_of_data, 2017)
+        self.assertEqual(loaded.urbanopt.building_characteristics, {"1": {"floor_area": 1000.0}})
+
+        pd.testing.assert_frame_equal(loaded.urbanopt.data, self.analysis.urbanopt.data)
+        # the 15 minute data are still a view of the hourly data
+        self.assertIsInstance(loaded.urbanopt.data_15min, UpsampledView)
+        self.assertIs(loaded.urbanopt.data_15min_to_process.source, loaded.urbanopt.data)
+        pd.testing.assert_frame_equal(
+            loaded.urbanopt.data_15min_to_process.to_frame(), self.analysis.urbanopt.data_15min_to_process.to_frame()
+        )
+
+        modelica = loaded["5G"]
+        self.assertIsInstance(modelica, ModelicaResults)
+        self.assertIsNone(modelica.modelica_data)
+        pd.testing.assert_frame_equal(modelica.min_60_with_buildings, self.analysis["5G"].min_60_with_buildings)
+        pd.testing.assert_frame_equal(modelica.end_use_summary, self.analysis["5G"].end_use_summary)
+        pd.testing.assert_frame_equal(loaded.grid_summary, self.analysis.grid_summary)
+        pd.testing.assert_frame_equal(loaded.carbon_emissions, self.analysis.carbon_emissions)
+        pd.testing.assert_frame_equal(loaded.carbon_emissions_cube.annual(), self.analysis.carbon_emissions)
+
+    def test_memory_mapped_frames(self):
+        path = self.analysis.save_snapshot(self.output_dir / "memory_mapped")
+        loaded = URBANoptAnalysis.load_snapshot(path)
+
+        # the frame is a view of the memory mapped file, which can be changed without changing the snapshot
+        frame = loaded["5G"].min_60_with_buildings
+        values = frame.to_numpy()
+        while values is not None and not isinstance(values, np.memmap):
+            values = values.base
+        self.assertIsInstance(values, np.memmap)
+        frame.iloc[0, 0] = -1.0
+        reloaded = URBANoptAnalysis.load_snapshot(path, mmap_mode=None)
+        self.assertEqual(reloaded["5G"].min_60_with_buildings.iloc[0, 0], self.analysis["5G"].min_60_with_buildings.iloc[0, 0])
+
+    def test_invalid_snapshot(self):
+        with pytest.raises(Exception, match="Snapshot does not exist"):
+            URBANoptAnalysis.load_snapshot(self.output_dir / "missing")
+
+        path = self.analysis.save_snapshot()
+        next(path.glob("frame_*.npy")).unlink()
+        with pytest.raises(Exception, match="missing files"):
+            URBANoptAnalysis.load_snapshot(path)
+
+    def test_values(self):
+        index = pd.date_range("2017-01-01", periods=2000, freq="15min", tz="America/Denver", name="Datetime")
+        frame = pd.DataFrame(
+            {"Value": np.arange(len(index), dtype=np.float32), "Label": ["on", None] * 1000, ("Total", "kWh"): np.arange(len(index))},
+            index=index,
+        )
+        state = {
+            "frame": frame,
+            "ranged": pd.DataFrame({"Value": [1.0, 2.0]}),
+            "series": pd.Series([1, 2], index=pd.Index(["a", "b"]), name=("Total", "kWh")),
+            "scalars": {1: np.float64(0.5), (2, "b"): np.int32(3), "peak": pd.Timestamp("2017-07-01 15:00"), "step": pd.Timedelta("15min")},
+            "path": Path("analysis") / "_results_summary",
+            "small": np.array([1, 2, 3], dtype=np.int16),
+        }
+        write_snapshot(self.output_dir / "values", state)
+        loaded, _ = read_snapshot(self.output_dir / "values", mmap_mode=None)
+        pd.testing.assert_frame_equal(loaded["frame"], frame)
+        pd.testing.assert_frame_equal(loaded["ranged"], state["ranged"], check_index_type=True)
+        pd.testing.assert_series_equal(loaded["series"], state["series"])
+        self.assertEqual(loaded["scalars"], state["scalars"])
+        self.assertIsInstance(loaded["scalars"][(2, "b")], np.int32)
+        self.assertEqual(loaded["path"], state["path"])
+        np.testing.assert_array_equal(loaded["small"], state["small"])
+        self.assertEqual(loaded["small"].dtype, np.int16)
+
+    def test_only_package_classes_are_loaded(self):
+        path = self.analysis.save_snapshot()
+        with open(path / "state.json") as f:
+            state = json.load(f)
+        state["analysis"]["__object__"] = ["os", "system"]
+        with open(path / "state.json", "w") as f:
+            json.dump(state, f)
+        with pytest.raises(Exception, match="is not a class of urbanopt_des"):
+            URBANoptAnalysis.load_snapshot(path)
@@ -0,0 +1,117 @@
+# Aggregation engine that is shared by the URBANopt and Modelica results to
+# create the totals (e.g., Total Building Electricity) from the source columns.
+
+from collections import Counter
+from graphlib import CycleError, TopologicalSorter
+
+import numpy as np
+import pandas as pd
+
+
+class AggregationGraph:
+    def __init__(self, totals: dict[str, list[str]]) -> None:
+        """Declarative graph of totals. Each total is the sum of its source columns, which
+        can be columns in the data frame or other totals in the graph. The graph is ordered
+        topologically and compiled into an incidence matrix of the base (non-total) columns,
+        so that every total of a data frame is calculated with one matrix product. The matrix
+        is dense, since there are at most a few hundred base columns. The compiled matrix is cached per column layout and can be reused across
+        data frames of different resolutions (e.g., the 15 and 60 minute data).
+
+            graph = AggregationGraph({
+                "Total Building Electricity": ["Electricity:Facility Building 1", "Electricity:Facility Building 2"],
+                "Total Building Natural Gas": ["NaturalGas:Facility Building 1", "NaturalGas:Facility Building 2"],
+                "Total Energy": ["Total Building Electricity", "Total Building Natural Gas"],
+            })
+            graph.apply(df_60min)
+            graph.apply(df_15min)
+
+        A total with an empty list of source columns is a column of zeros. If a source column
+        is listed more than once, then it is summed more than once.
+
+        Args:
+            totals (dict[str, list[str]]): Name of the total and the list of columns to sum, in the
+                order that the totals should be added to the data frame.
+
+        Raises:
+            Exception: The totals have a circular dependency
+        """
+        self.totals = {name: list(sources) for name, sources in totals.items()}
+
+        # order the totals so that the dependencies are expanded first
+        sorter = TopologicalSorter({name: [s for s in sources if s in self.totals] for name, sources in self.totals.items()})
+        try:
+            self.order = list(sorter.static_order())
+        except CycleError as e:
+            raise Exception(f"Circular dependency in the aggregation totals: {e.args[1]}") from e
+
+        # expand each total into the coefficients of the base columns
+        self.coefficients: dict[str, Counter] = {}
+        for name in self.order:
+            coefficients: Counter = Counter()
+            for source in self.totals[name]:
+                if source in self.totals:
+                    coefficients.update(self.coefficients[source])
+                else:
+                    coefficients[source] += 1
+            self.coefficients[name] = coefficients
+
+        self.base_columns = sorted({column for coefficients in self.coefficients.values() for column in coefficients})
+
+        # compiled matrices keyed on the columns of the data frame
+        self._compiled: dict[tuple, tuple[np.ndarray, np.ndarray]] = {}
+
+    @property
+    def names(self) -> list[str]:
+        """Return the names of the totals in the order they were declared"""
+        return list(self.totals.keys())
+
+    def _compile(self, columns: pd.Index) -> tuple[np.ndarray, np.ndarray]:
+        """Return the positions of the base columns in the data frame and the
+        (totals x base columns) incidence matrix."""
+        layout = tuple(columns)
+        if layout in self._compiled:
+            return self._compiled[layout]
+
+        missing = [column for column in self.base_columns if column not in columns]
+        if missing:
+            raise Exception(f"Columns for the aggregations do not exist in the data frame: {missing}")
+
+        # use the first occurrence of each column, in case there are duplicate column names
+        positions = {}
+        for position, column in enumerate(layout):
+            positions.setdefault(column, position)
+        base_positions = np.array([positions[column] for column in self.base_columns], dtype=np.int64)
+
+        base_lookup = {column: i for i, column in enumerate(self.base_columns)}
+        matrix = np.zeros((len(self.names), len(self.base_columns)))
+        for total_index, name in enumerate(self.names):
+            for column, coefficient in self.coefficients[name].items():
+                matrix[total_index, base_lookup[column]] = coefficient
+
+        self._compiled[layout] = (base_positions, matrix)
+        return self._compiled[layout]
+
+    def compute(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Calculate all of the totals for the data frame.
+
+        Args:
+            df (pd.DataFrame): Data frame with the base columns
+
+        Returns:
+            pd.DataFrame: Data frame with one column per total and the same index as df
+        """
+        base_positions, matrix = self._compile(df.columns)
+
+        # missing values are treated as zero, which is consistent with DataFrame.sum
+        values = np.nan_to_num(df.iloc[:, base_positions].to_numpy(dtype=float), copy=False)
+        totals = values @ matrix.T
+
+        return pd.DataFrame(totals, index=df.index, columns=self.names)
+
+    def apply(self, df: pd.DataFrame) -> None:
+        """Calculate all of the totals and add (or overwrite) them in the data frame in place.
+
+        Args:
+            df (pd.DataFrame): Data frame with the base columns
+        """
+        df[self.names] = self.compute(df).to_numpy()
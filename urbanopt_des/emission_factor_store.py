@@ -0,0 +1,276 @@
+# Preprocessed binary store of the emission factor tables in the emissions folder. The
+# hourly CSV files are parsed once into one .npy array per emissions type and T&D loss
+# option (future year x hour x eGRID subregion), which are then memory mapped so that
+# emissions sweeps across regions and years do not parse the CSV files again. The historical
+# annual average rates (historical year x eGRID subregion) are kept in the same store.
+
+import functools
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+EMISSIONS_PATH = Path(__file__).parent / "emissions"
+
+
+class EmissionFactorStore:
+    # bump this if the layout of the store changes
+    STORE_VERSION = 3
+
+    EMISSIONS_TYPES = ["marginal", "average"]
+
+    def __init__(self, store_path: Union[Path, None] = None, source_path: Path = EMISSIONS_PATH) -> None:
+        """Store of all of the emission factor tables. The store is built from the CSV files in the
+        source_path the first time that it is used, and it is rebuilt if any of the CSV files change.
+        Use get_emission_factor_store to share one store across the process.
+
+        Args:
+            store_path (Path, optional): Directory to save the store. Defaults to None, which is the
+                emission_factors folder of the user's cache directory, see default_store_path.
+            source_path (Path, optional): Directory of the emissions CSV files. Defaults to the emissions
+                folder of this package.
+        """
+        self.source_path = Path(source_path)
+        if store_path is None:
+            store_path = self.default_store_path()
+        self.path = Path(store_path)
+
+        manifest = self._load_manifest()
+        if manifest is None:
+            manifest = self.build()
+
+        self.years = manifest["years"]
+        self.regions = manifest["regions"]
+        self.hours = np.asarray(manifest["hours"], dtype=np.int64)
+        self.other_fuels = manifest["other_fuels"]
+        self._historical_tables = manifest["historical"]
+        self._hourly = {}
+        self._historical = {}
+
+    @staticmethod
+    def default_store_path() -> Path:
+        """Return the default directory of the store, which is in the user's cache directory ($XDG_CACHE_HOME or
+        ~/.cache) so that it is not shared with (or replaced by) the other users of the system.
+
+        Returns:
+            Path: Directory of the store
+        """
+        cache_path = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+        return Path(cache_path) / "urbanopt_des" / "emission_factors"
+
+    @staticmethod
+    def _table_name(emissions_type: str, with_td_losses: bool) -> str:
+        return f"hourly_{emissions_type}_{EmissionFactorStore._losses_name(with_td_losses)}"
+
+    def _hourly_csv_path(self, emissions_type: str, future_year: int, with_td_losses: bool) -> Path:
+        filename = f"future_hourly_{emissions_type}_co2e_{future_year}.csv"
+        return self.source_path / self._losses_name(with_td_losses) / "future" / "hourly" / filename
+
+    @staticmethod
+    def _losses_name(with_td_losses: bool) -> str:
+        return "with_distribution_losses" if with_td_losses else "without_distribution_losses"
+
+    def _historical_csv_path(self, with_td_losses: bool) -> Path:
+        return self.source_path / self._losses_name(with_td_losses) / "historical" / "annual" / "historical_annual_co2e.csv"
+
+    def _source_files(self) -> list[Path]:
+        return [
+            *sorted(self.source_path.glob("*/future/hourly/*.csv")),
+            *sorted(self.source_path.glob("*/historical/annual/*.csv")),
+            self.source_path / "other_fuels.csv",
+        ]
+
+    def source_key(self) -> str:
+        """Return the key of the source CSV files, which changes if any of the files are modified.
+
+        Returns:
+            str: sha256 hex digest of the key data
+        """
+        key_data = {"version": self.STORE_VERSION, "files": []}
+        for source_file in self._source_files():
+            stat = source_file.stat()
+            key_data["files"].append([str(source_file.relative_to(self.source_path)), stat.st_size, stat.st_mtime_ns])
+        return hashlib.sha256(json.dumps(key_data, sort_keys=True).encode()).hexdigest()
+
+    def _load_manifest(self) -> Union[dict, None]:
+        manifest_path = self.path / "manifest.json"
+        if not manifest_path.exists():
+            return None
+
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"WARNING: could not read emission factor store manifest {manifest_path}: {e}")
+            return None
+
+        if manifest.get("key") != self.source_key():
+            return None
+        return manifest
+
+    def build(self) -> dict:
+        """Parse all of the emission factor CSV files and save the store.
+
+        Returns:
+            dict: Manifest of the store with the years, regions, hours, the other fuel factors (kg/MWh), and the
+                years and regions of the historical data
+        """
+        print(f"Building emission factor store in {self.path}")
+        # only the user can write to the store, the store is memory mapped and not verified on load
+        self.path.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+        years = sorted({int(path.stem.split("_")[-1]) for path in self.source_path.glob("*/future/hourly/future_hourly_*_co2e_*.csv")})
+        regions, hours = None, None
+        for emissions_type in self.EMISSIONS_TYPES:
+            for with_td_losses in [True, False]:
+                tables = []
+                for year in years:
+                    path = self._hourly_csv_path(emissions_type, year, with_td_losses)
+                    if not path.exists():
+                        raise Exception(f"Future emissions data file does not exist: {path}")
+                    table = pd.read_csv(path, header=0)
+                    if regions is None:
+                        hours = table["hour"].tolist()
+                        regions = [column for column in table.columns if column != "hour"]
+                    elif table["hour"].tolist() != hours or [column for column in table.columns if column != "hour"] != regions:
+                        raise Exception(f"Emissions data file {path} does not have the same hours and regions as the other files")
+                    tables.append(table[regions].to_numpy())
+                self._save_array(self._table_name(emissions_type, with_td_losses), np.stack(tables))
+
+        # the historical data are the annual average rates of each year, the years and the regions
+        # are not the same as the future data (the regions do not have the `c` appended)
+        historical = {}
+        for with_td_losses in [True, False]:
+            path = self._historical_csv_path(with_td_losses)
+            if not path.exists():
+                continue
+            # skip the blank rows at the end of the file
+            table = pd.read_csv(path, header=0, index_col="Year").dropna(how="all")
+            name = f"historical_{self._losses_name(with_td_losses)}"
+            self._save_array(name, table.to_numpy(dtype=float))
+            historical[name] = {"years": table.index.astype(int).tolist(), "regions": table.columns.tolist()}
+
+        # the other fuels are not location or time dependent, keep one factor (kg/MWh) per fuel
+        other_fuels_data = pd.read_csv(self.source_path / "other_fuels.csv", header=0, index_col="fuel")
+        other_fuels = other_fuels_data["emission_kg_per_mwh"].astype(float).to_dict()
+
+        manifest = {
+            "key": self.source_key(),
+            "years": years,
+            "regions": regions,
+            "hours": hours,
+            "other_fuels": other_fuels,
+            "historical": historical,
+        }
+        # write the manifest last, so that a partially built store is never used
+        self._write_atomic(self.path / "manifest.json", lambda f: f.write(json.dumps(manifest).encode()))
+        return manifest
+
+    def _save_array(self, name: str, values: np.ndarray) -> None:
+        self._write_atomic(self.path / f"{name}.npy", lambda f: np.save(f, values, allow_pickle=False))
+
+    @staticmethod
+    def _write_atomic(path: Path, write) -> None:
+        # write to a temporary file and move it in place, so that other processes never read a partial file
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(temp_path, path)
+        except BaseException:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+
+    def hourly(self, emissions_type: str = "marginal", with_td_losses: bool = True) -> np.ndarray:
+        """Return the memory mapped hourly emission factors of all of the future years.
+
+        Args:
+            emissions_type (str, optional): Type of emissions, 'marginal' or 'average'. Defaults to 'marginal'.
+            with_td_losses (bool, optional): Include transmission and distribution losses. Defaults to True.
+
+        Returns:
+            np.ndarray: Read only array of the emission factors in kg/MWh (future year x hour x region)
+        """
+        if emissions_type not in self.EMISSIONS_TYPES:
+            raise Exception(f"Invalid emissions type: {emissions_type}, expected one of {self.EMISSIONS_TYPES}")
+        name = self._table_name(emissions_type, with_td_losses)
+        if name not in self._hourly:
+            self._hourly[name] = np.load(self.path / f"{name}.npy", mmap_mode="r", allow_pickle=False)
+        return self._hourly[name]
+
+    def factors(self, future_year: int, emissions_type: str = "marginal", with_td_losses: bool = True) -> np.ndarray:
+        """Return the hourly emission factors of each region of the future year.
+
+        Args:
+            future_year (int): Future year of the emission data
+            emissions_type (str, optional): Type of emissions, 'marginal' or 'average'. Defaults to 'marginal'.
+            with_td_losses (bool, optional): Include transmission and distribution losses. Defaults to True.
+
+        Raises:
+            Exception: Future year is not in the store
+
+        Returns:
+            np.ndarray: Read only array of the emission factors in kg/MWh (hour x region)
+        """
+        if future_year not in self.years:
+            raise Exception(
+                f"Future emissions data file does not exist: {self._hourly_csv_path(emissions_type, future_year, with_td_losses)}"
+            )
+        return self.hourly(emissions_type, with_td_losses)[self.years.index(future_year)]
+
+    def historical(self, with_td_losses: bool = True) -> tuple[list[int], list[str], np.ndarray]:
+        """Return the historical annual average emission rates, which are loaded on first use.
+
+        Args:
+            with_td_losses (bool, optional): Include transmission and distribution losses. Defaults to True.
+
+        Raises:
+            Exception: Historical emissions data do not exist
+
+        Returns:
+            tuple[list[int], list[str], np.ndarray]: Historical years, regions, and the emission rates in kg/MWh
+                (historical year x region)
+        """
+        name = f"historical_{self._losses_name(with_td_losses)}"
+        if name not in self._historical_tables:
+            raise Exception(f"Historical emissions data file does not exist: {self._historical_csv_path(with_td_losses)}")
+        if name not in self._historical:
+            self._historical[name] = np.load(self.path / f"{name}.npy", mmap_mode="r", allow_pickle=False)
+        return self._historical_tables[name]["years"], self._historical_tables[name]["regions"], self._historical[name]
+
+    def historical_rates(self, historical_year: int, with_td_losses: bool = True) -> dict[str, float]:
+        """Return the historical annual average emission rate of each region of the year.
+
+        Args:
+            historical_year (int): Year of the eGRID data
+            with_td_losses (bool, optional): Include transmission and distribution losses. Defaults to True.
+
+        Raises:
+            Exception: Historical year is not in the store
+
+        Returns:
+            dict[str, float]: Emission rate in kg/MWh of each eGRID subregion
+        """
+        years, regions, rates = self.historical(with_td_losses)
+        if historical_year not in years:
+            raise Exception(f"Historical emissions data does not exist for {historical_year}, expected one of {years}")
+        return dict(zip(regions, rates[years.index(historical_year)].tolist()))
+
+
+@functools.lru_cache(maxsize=4)
+def get_emission_factor_store(store_path: Union[Path, None] = None, source_path: Path = EMISSIONS_PATH) -> EmissionFactorStore:
+    """Return the emission factor store, which is shared across the process.
+
+    Args:
+        store_path (Path, optional): Directory to save the store. Defaults to None, see EmissionFactorStore.
+        source_path (Path, optional): Directory of the emissions CSV files. Defaults to the emissions folder of this package.
+
+    Returns:
+        EmissionFactorStore: Store of the emission factors
+    """
+    return EmissionFactorStore(store_path, source_path)
@@ -5,8 +5,11 @@ import datetime
 from pathlib import Path
 from typing import Union
 
+import numpy as np
 import pandas as pd
 
+from .emission_factor_store import get_emission_factor_store
+
 
 class HourlyEmissionsData:
     def __init__(
@@ -16,6 +19,7 @@ class HourlyEmissionsData:
         analysis_year: Union[int, None] = None,
         emissions_type: str = "marginal",
         with_td_losses: bool = True,
+        store_path: Union[Path, None] = None,
     ):
         """Create an instance of a pandas dataframe that is loaded with correct hourly emissions data.
         Note that the future year of emissions data and the year of analysis do not have to match, that is we can run an
@@ -27,22 +31,17 @@ class HourlyEmissionsData:
             analysis_year (Union[int, None], optional): The year that the analysis data will be in, this will be the year in the analysis_date field. Defaults to None which sets the analysis_year to the future_year.
             emissions_type (str, optional): Type of emissions to load. Options are 'marginal' and 'average'. Defaults to 'marginal'.
             with_td_losses (bool, optional): Include transmission and distribution losses. Defaults to True.
+            store_path (Union[Path, None], optional): Directory of the emission factor store. Defaults to None, which is
+                the user's cache directory, see EmissionFactorStore.
 
         Raises:
             Exception: File not found
             Exception: Invalid eGRID subregion
         """
-        # Get the name of the file to load based on the eGRID subregion and future year.
-        # The file is in the emissions folder which is relative to this class
-        path = Path(__file__).parent / "emissions"
-        if with_td_losses:
-            path = path / "with_distribution_losses"
-        else:
-            path = path / "without_distribution_losses"
-        path = path / "future" / "hourly" / f"future_hourly_{emissions_type}_co2e_{future_year}.csv"
-
-        if not path.exists():
-            raise Exception(f"Future emissions data file does not exist: {path}")
+        # The emission factors are loaded from the preprocessed store (shared across the process),
+        # which is built from the CSV files in the emissions folder relative to this class.
+        store = get_emission_factor_store(store_path)
+        factors = store.factors(future_year, emissions_type, with_td_losses)
 
         # verify that the eGRID subregion is valid
         if egrid_subregion not in self.region_names():
@@ -51,60 +50,46 @@ class HourlyEmissionsData:
         if analysis_year is None:
             analysis_year = future_year
 
-        self.data = pd.read_csv(path, header=0)
-
-        # create two new columns, one for the datetime based on the future_year and one based on the analysis_year.
-        self.data["datetime"] = datetime.datetime(future_year, 1, 1) + pd.to_timedelta(self.data["hour"], unit="h")
-        # If the year is a leap year, then shift the datetime by one day, effectively eliminating the leap day.
-        # This isn't working yet, moving on...
-        # if self.data['datetime'][0].is_leap_year:
-        # after 2/28/future_year, shift all hours back by 24 hours
-        # self.data.loc[self.data['datetime'] > datetime.datetime(future_year, 3, 1), 'datetime'] = self.data.loc[self.data['datetime'] > datetime.datetime(future_year, 3, 1), 'datetime'] - pd.to_timedelta(1, unit='d')
-
-        self.data["analysis_datetime_end"] = datetime.datetime(analysis_year, 1, 1) + pd.to_timedelta(self.data["hour"], unit="h")
-        self.data["analysis_datetime_start"] = self.data["analysis_datetime_end"] - pd.to_timedelta(1, unit="h")
-
-        # move the datetime columns to the front
-        cols = self.data.columns.tolist()
-        cols = cols[-2:] + cols[:-2]
-        self.data = self.data[cols]
-        # swap the first two columns
-        cols = self.data.columns.tolist()
-        cols = cols[1:2] + cols[0:1] + cols[2:]
-        self.data = self.data[cols]
-
-        # index on the analysis_datetime
-        self.data = self.data.set_index(["analysis_datetime_start"])
-
-        # load in the other_fuels.csv file and fill down for every hour that
-        # exists in the self.data. These data are non-location dependent
-        # and non-time dependent.
-        other_fuels_path = Path(__file__).parent / "emissions" / "other_fuels.csv"
-        self.other_fuel_data = pd.read_csv(other_fuels_path, header=0)
-
-        # remove the MBtu column, and then transpose
-        # if the column exists, then drop it
-        if "emission_kg_per_mbtu" in self.other_fuel_data.columns:
-            self.other_fuel_data = self.other_fuel_data.drop(columns=["emission_kg_per_mbtu"])
-
-        self.other_fuel_data = self.other_fuel_data.T
-        # make the first row the column names
-        self.other_fuel_data.columns = self.other_fuel_data.iloc[0]
-        # drop the first row
-        self.other_fuel_data = self.other_fuel_data.drop(self.other_fuel_data.index[0])
-        self.other_fuel_data = self.other_fuel_data.reset_index()
-        self.other_fuel_data = self.other_fuel_data.drop(columns=["index"])
-
-        # copy the self.data and remove all the columns except
-        self.other_fuels = self.data.copy()
-        # drop all columns except 'analysis_datetime_start', 'analysis_datetime_end', 'hour'
-        to_drop = [col for col in self.other_fuels.columns if col not in ["analysis_datetime_start", "analysis_datetime_end", "hour"]]
-        self.other_fuels = self.other_fuels.drop(columns=to_drop)
-
-        # merge in the other_fuels_data with the self.other_fuels and fill down
-        # the columns for each row
-        for column in self.other_fuel_data.columns:
-            self.other_fuels[column] = self.other_fuel_data[column][0]
+        hours = pd.to_timedelta(store.hours, unit="h")
+        # create two datetimes, one for the datetime based on the future_year and one based on the analysis_year.
+        # If the year is a leap year, then the datetime should be shifted by one day after 2/28, effectively
+        # eliminating the leap day. This isn't working yet, moving on...
+        analysis_datetime_end = datetime.datetime(analysis_year, 1, 1) + hours
+        self.data = pd.DataFrame(
+            # copy the year out of the read only memory mapped store
+            np.array(factors),
+            index=pd.DatetimeIndex(analysis_datetime_end - pd.to_timedelta(1, unit="h"), name="analysis_datetime_start"),
+            columns=store.regions,
+        )
+        self.data.insert(0, "analysis_datetime_end", analysis_datetime_end)
+        self.data.insert(1, "hour", store.hours)
+        self.data["datetime"] = datetime.datetime(future_year, 1, 1) + hours
+
+        # The other fuels are non-location dependent and non-time dependent, so they are kept
+        # as one emission factor (kg/MWh) per fuel and applied to the hourly data as a scalar.
+        self.other_fuels = dict(store.other_fuels)
+
+    @property
+    def index(self) -> pd.DatetimeIndex:
+        """Return the start of each hour of the emissions data in the analysis year"""
+        return self.data.index
+
+    def factors_at(self, index: pd.DatetimeIndex, egrid_subregion: str) -> np.ndarray:
+        """Return the hourly emission factors of the subregion at each timestamp of the index, which can be at a
+        finer resolution than hourly (e.g., 15 minutes). Each timestamp uses the factor of the hour that it is in,
+        which is the hour that starts at the floor of the timestamp.
+
+        Args:
+            index (pd.DatetimeIndex): Timestamps of the data, typically hourly or 15 minute data
+            egrid_subregion (str): EPA's 4-letter identifier for the emissions subregion
+
+        Returns:
+            np.ndarray: Emission factors in kg/MWh, NaN for timestamps outside of the emissions data
+        """
+        # the datafile has a `c` appended to the end of the subregion
+        factors = self.data[f"{egrid_subregion}c"].to_numpy(dtype=float)
+        positions = self.data.index.get_indexer(index.floor("h"))
+        return np.where(positions >= 0, factors[positions], np.nan)
 
     def region_names(self):
         """Return the list of eGRID subregions to check against the incoming requests"""
@@ -130,3 +115,88 @@ class HourlyEmissionsData:
             "SRTV",
             "SRVC",
         ]
+
+
+class HistoricalEmissionsData:
+    def __init__(
+        self,
+        egrid_subregion: str,
+        historical_year: int,
+        analysis_year: Union[int, None] = None,
+        with_td_losses: bool = True,
+        store_path: Union[Path, None] = None,
+    ):
+        """Historical annual average emission rates from eGRID with the same interface as HourlyEmissionsData, so the
+        rates can be used to calibrate against metered years. The rate of the historical year is applied to every
+        hour of the analysis year. The rates are loaded from the emission factor store on first use.
+
+        Args:
+            egrid_subregion (str): eGRID subregion, as defined by the EPA
+            historical_year (int): Year of the eGRID data to load.
+            analysis_year (Union[int, None], optional): The year that the analysis data will be in. Defaults to None which sets the analysis_year to the historical_year.
+            with_td_losses (bool, optional): Include transmission and distribution losses. Defaults to True.
+            store_path (Union[Path, None], optional): Directory of the emission factor store. Defaults to None, which is
+                the user's cache directory, see EmissionFactorStore.
+
+        Raises:
+            Exception: Historical year not found
+            Exception: Invalid eGRID subregion
+        """
+        self.store = get_emission_factor_store(store_path)
+        years, regions, _ = self.store.historical(with_td_losses)
+        if historical_year not in years:
+            raise Exception(f"Historical emissions data does not exist for {historical_year}, expected one of {years}")
+
+        if egrid_subregion not in regions:
+            raise Exception(f"Invalid eGRID subregion: {egrid_subregion}, expected one of {regions}")
+
+        if analysis_year is None:
+            analysis_year = historical_year
+
+        self.egrid_subregion = egrid_subregion
+        self.historical_year = historical_year
+        self.with_td_losses = with_td_losses
+        # the same hours as the future emissions data, starting at the beginning of the analysis year
+        self.index = pd.DatetimeIndex(
+            datetime.datetime(analysis_year, 1, 1) + pd.to_timedelta(self.store.hours - 1, unit="h"), name="analysis_datetime_start"
+        )
+        self.other_fuels = dict(self.store.other_fuels)
+        self._rates = None
+        self._data = None
+
+    @property
+    def rates(self) -> dict[str, float]:
+        """Return the annual average emission rate (kg/MWh) of each region, loaded on first use"""
+        if self._rates is None:
+            self._rates = self.store.historical_rates(self.historical_year, self.with_td_losses)
+        return self._rates
+
+    @property
+    def data(self) -> pd.DataFrame:
+        """Return the hourly emission rates of each region, which are only created if requested"""
+        if self._data is None:
+            self._data = pd.DataFrame(
+                np.repeat(np.array([list(self.rates.values())]), len(self.index), axis=0),
+                index=self.index,
+                columns=list(self.rates),
+            )
+            self._data.insert(0, "analysis_datetime_end", self.index + pd.to_timedelta(1, unit="h"))
+            self._data.insert(1, "hour", self.store.hours)
+        return self._data
+
+    def factors_at(self, index: pd.DatetimeIndex, egrid_subregion: str) -> np.ndarray:
+        """Return the emission rate of the subregion at each timestamp of the index. See HourlyEmissionsData.factors_at.
+
+        Args:
+            index (pd.DatetimeIndex): Timestamps of the data, typically hourly or 15 minute data
+            egrid_subregion (str): EPA's 4-letter identifier for the emissions subregion
+
+        Returns:
+            np.ndarray: Emission rates in kg/MWh, NaN for timestamps outside of the analysis year
+        """
+        positions = self.index.get_indexer(index.floor("h"))
+        return np.where(positions >= 0, self.rates[egrid_subregion], np.nan)
+
+    def region_names(self) -> list[str]:
+        """Return the list of eGRID subregions of the historical data"""
+        return list(self.store.historical(self.with_td_losses)[1])
@@ -0,0 +1,223 @@
+# Batched carbon emissions of many emission scenarios (eGRID subregion, future or historical year,
+# emissions type, and T&D losses) for many analyses. The hourly electricity of all of the analyses is
+# stacked into one energy block, which is multiplied by the factor matrix of all of the scenarios.
+
+import datetime
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+from .emission_factor_store import EmissionFactorStore, get_emission_factor_store
+from .results_base import ResultsBase
+
+SCENARIO_LEVELS = ["Region", "Year", "Emissions Type", "With T&D Losses"]
+
+
+def emission_factor_matrix(
+    store: EmissionFactorStore,
+    egrid_subregions: list[str],
+    future_years: list[int],
+    emissions_types: list[str],
+    with_td_losses: list[bool],
+    historical_years: list[int] = [],
+) -> tuple[pd.MultiIndex, np.ndarray]:
+    """Create the matrix of the hourly emission factors of every combination of the scenario options. The
+    historical years are added as scenarios with the 'historical' emissions type, which apply the annual average
+    rate of the year to every hour.
+
+    Args:
+        store (EmissionFactorStore): Store of the emission factors
+        egrid_subregions (list[str]): EPA's 4-letter identifiers of the eGRID subregions
+        future_years (list[int]): Future years of the emission data
+        emissions_types (list[str]): Types of emissions, 'marginal' and/or 'average'
+        with_td_losses (list[bool]): Include transmission and distribution losses, or not
+        historical_years (list[int], optional): Historical years of the eGRID data. Defaults to [].
+
+    Raises:
+        Exception: Invalid eGRID subregion
+
+    Returns:
+        tuple[pd.MultiIndex, np.ndarray]: Scenarios and the emission factors in kg/MWh (hour x scenario)
+    """
+    # for some reason, the future datafiles have a `c` appended to the end of the subregion, probably for Cambium
+    future_regions = [region[:-1] for region in store.regions]
+    region_positions = _region_positions(egrid_subregions, future_regions) if future_years else []
+
+    # one block of regions per year, type, and losses
+    blocks, scenarios = [], []
+    for emissions_type in emissions_types if future_years else []:
+        for td_losses in with_td_losses:
+            for future_year in future_years:
+                blocks.append(store.factors(future_year, emissions_type, td_losses)[:, region_positions])
+                scenarios += [(egrid_subregion, future_year, emissions_type, td_losses) for egrid_subregion in egrid_subregions]
+
+    for td_losses in with_td_losses if historical_years else []:
+        years, regions, rates = store.historical(td_losses)
+        for historical_year in historical_years:
+            if historical_year not in years:
+                raise Exception(f"Historical emissions data does not exist for {historical_year}, expected one of {years}")
+            year_rates = rates[years.index(historical_year), _region_positions(egrid_subregions, regions)]
+            blocks.append(np.broadcast_to(year_rates, (len(store.hours), len(egrid_subregions))))
+            scenarios += [(egrid_subregion, historical_year, "historical", td_losses) for egrid_subregion in egrid_subregions]
+
+    if not blocks:
+        raise Exception("No emission scenarios, at least one future year or historical year is required")
+    scenario_index = pd.MultiIndex.from_tuples(scenarios, names=SCENARIO_LEVELS)
+    return scenario_index, np.concatenate(blocks, axis=1).astype(float)
+
+
+def _region_positions(egrid_subregions: list[str], regions: list[str]) -> list[int]:
+    for egrid_subregion in egrid_subregions:
+        if egrid_subregion not in regions:
+            raise Exception(f"Invalid eGRID subregion: {egrid_subregion}, expected one of {regions}")
+    return [regions.index(egrid_subregion) for egrid_subregion in egrid_subregions]
+
+
+class CarbonEmissionsCube:
+    def __init__(
+        self,
+        electricity: np.ndarray,
+        natural_gas: np.ndarray,
+        factors: np.ndarray,
+        natural_gas_factor: float,
+        scenarios: pd.MultiIndex,
+        analyses: list[str],
+        index: pd.DatetimeIndex,
+        other_fuels: Union[np.ndarray, None] = None,
+    ) -> None:
+        """Carbon emissions of each scenario and analysis. The hourly emissions (scenario x analysis x time)
+        are only created when requested, the annual emissions are one matrix product of the energy block
+        and the factor matrix. Create the cube with from_dataframes.
+
+        Args:
+            electricity (np.ndarray): Hourly electricity of each analysis in Wh (analysis x time), NaN if missing
+            natural_gas (np.ndarray): Hourly natural gas of each analysis in Wh (analysis x time), NaN if missing
+            factors (np.ndarray): Hourly emission factors of each scenario in kg/MWh (time x scenario)
+            natural_gas_factor (float): Emission factor of natural gas, which does not depend on the scenario
+            scenarios (pd.MultiIndex): Region, future or historical year, emissions type, and T&D losses of each scenario
+            analyses (list[str]): Names of the analyses
+            index (pd.DatetimeIndex): Start of each hour of the analysis year
+            other_fuels (np.ndarray, optional): Hourly carbon emissions of the other fuels (e.g., propane) of each analysis
+                in mtCO2e (analysis x time), which do not depend on the scenario. Defaults to None, which is no other fuels.
+        """
+        self.electricity = electricity
+        self.natural_gas = natural_gas
+        self.factors = factors
+        self.natural_gas_factor = natural_gas_factor
+        self.scenarios = scenarios
+        self.analyses = list(analyses)
+        self.index = index
+        self.other_fuels = other_fuels if other_fuels is not None else np.zeros(natural_gas.shape)
+
+    @classmethod
+    def from_dataframes(
+        cls,
+        dataframes: dict[str, pd.DataFrame],
+        egrid_subregions: list[str],
+        future_years: list[int],
+        emissions_types: list[str] = ["marginal"],
+        with_td_losses: list[bool] = [True],
+        historical_years: list[int] = [],
+        analysis_year: int = 2017,
+        electricity_column: str = "Total Electricity",
+        natural_gas_column: str = "Total Building Natural Gas",
+        store: Union[EmissionFactorStore, None] = None,
+    ) -> "CarbonEmissionsCube":
+        """Create the cube from the hourly data frames of the analyses. The rows of each data frame are matched to
+        the hour of the emission data that starts at the same time, the same as calculate_carbon_emissions. The
+        other fuels of the buildings (e.g., propane) are included as in calculate_carbon_emissions, see
+        ResultsBase.other_fuel_emissions.
+
+        Args:
+            dataframes (dict[str, pd.DataFrame]): Hourly data of each analysis, with a datetime index
+            egrid_subregions (list[str]): EPA's 4-letter identifiers of the eGRID subregions
+            future_years (list[int]): Future years of the emission data
+            emissions_types (list[str], optional): Types of emissions. Defaults to ["marginal"].
+            with_td_losses (list[bool], optional): Include transmission and distribution losses. Defaults to [True].
+            historical_years (list[int], optional): Historical years of the eGRID data. Defaults to [].
+            analysis_year (int, optional): Year that the analysis data are representing. Defaults to 2017.
+            electricity_column (str, optional): Column of the electricity in Wh. Defaults to "Total Electricity".
+            natural_gas_column (str, optional): Column of the natural gas in Wh. Defaults to "Total Building Natural Gas".
+            store (EmissionFactorStore, optional): Store of the emission factors. Defaults to the shared store.
+
+        Returns:
+            CarbonEmissionsCube: Emissions of every scenario and analysis
+        """
+        if store is None:
+            store = get_emission_factor_store()
+        scenarios, factors = emission_factor_matrix(
+            store, egrid_subregions, future_years, emissions_types, with_td_losses, historical_years
+        )
+
+        start = pd.Timestamp(datetime.datetime(analysis_year, 1, 1))
+        index = pd.DatetimeIndex(start + pd.to_timedelta(store.hours - 1, unit="h"), name="analysis_datetime_start")
+
+        # scatter the rows of each analysis into the hours of the analysis year, rows that are not
+        # at the start of an hour of the analysis year are skipped
+        electricity = np.full((len(dataframes), len(index)), np.nan)
+        natural_gas = np.full((len(dataframes), len(index)), np.nan)
+        other_fuels = np.zeros((len(dataframes), len(index)))
+        for i, df in enumerate(dataframes.values()):
+            positions = index.get_indexer(df.index)
+            valid = positions >= 0
+            electricity[i, positions[valid]] = df[electricity_column].to_numpy(dtype=float)[valid]
+            natural_gas[i, positions[valid]] = df[natural_gas_column].to_numpy(dtype=float)[valid]
+            other_fuel_emissions = ResultsBase.other_fuel_emissions(df, store.other_fuels)
+            if other_fuel_emissions is not None:
+                other_fuels[i, positions[valid]] = other_fuel_emissions[valid]
+
+        return cls(electricity, natural_gas, factors, store.other_fuels["natural_gas"], scenarios, list(dataframes), index, other_fuels)
+
+    def hourly(self) -> np.ndarray:
+        """Return the hourly total carbon emissions.
+
+        Returns:
+            np.ndarray: Total carbon emissions in mtCO2e (scenario x analysis x time)
+        """
+        # emissions data are in kg/MWh, so Wh->MWh, then divide by another 1000 to get mtCO2e
+        electricity = self.factors.T[:, None, :] * self.electricity[None, :, :] / 1e6 / 1000
+        natural_gas = self.natural_gas * self.natural_gas_factor / 1e6 / 1000
+        return electricity + (natural_gas + self.other_fuels)[None, :, :]
+
+    def annual(self) -> pd.DataFrame:
+        """Return the annual carbon emissions of each scenario and analysis.
+
+        Returns:
+            pd.DataFrame: Electricity, natural gas, other fuels, and total carbon emissions in mtCO2e, indexed by
+                the scenario and the analysis
+        """
+        # one matrix product of all of the analyses and scenarios (analysis x scenario), the missing hours are skipped
+        electricity = np.nan_to_num(self.electricity) @ self.factors / 1e6 / 1000
+        natural_gas = np.nansum(self.natural_gas, axis=1) * self.natural_gas_factor / 1e6 / 1000
+
+        index = pd.MultiIndex.from_tuples(
+            [(*scenario, analysis) for scenario in self.scenarios for analysis in self.analyses],
+            names=[*SCENARIO_LEVELS, "Analysis"],
+        )
+        annual = pd.DataFrame(
+            {
+                "Electricity Carbon Emissions": electricity.T.ravel(),
+                "Natural Gas Carbon Emissions": np.tile(natural_gas, len(self.scenarios)),
+                "Other Fuels Carbon Emissions": np.tile(self.other_fuels.sum(axis=1), len(self.scenarios)),
+            },
+            index=index,
+        )
+        annual["Total Carbon Emissions"] = (
+            annual["Electricity Carbon Emissions"] + annual["Natural Gas Carbon Emissions"] + annual["Other Fuels Carbon Emissions"]
+        )
+        return annual
+
+    def time_series(self, analysis: str) -> pd.DataFrame:
+        """Return the hourly total carbon emissions of one analysis.
+
+        Args:
+            analysis (str): Name of the analysis
+
+        Returns:
+            pd.DataFrame: Total carbon emissions in mtCO2e, one column per scenario
+        """
+        i = self.analyses.index(analysis)
+        electricity = self.electricity[i][:, None] * self.factors / 1e6 / 1000
+        natural_gas = self.natural_gas[i] * self.natural_gas_factor / 1e6 / 1000
+        return pd.DataFrame(electricity + (natural_gas + self.other_fuels[i])[:, None], index=self.index, columns=self.scenarios)
@@ -0,0 +1,112 @@
+# Binary cache of the parsed URBANopt feature reports so that the per-building
+# CSV files only need to be parsed again when they change on disk.
+
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+class FeatureReportCache:
+    # bump this if the layout of the cached files changes
+    CACHE_VERSION = 2
+
+    def __init__(self, cache_path: Path) -> None:
+        """Store parsed, unit-converted, and year-remapped per-building data frames in
+        a compact binary format (one .npz file per entry). Each entry is keyed on the
+        source file's path, size, and modification time plus any parsing options
+        (e.g., column spec and year of data), so stale entries are never returned.
+
+        Args:
+            cache_path (Path): Directory to store the cached data frames.
+        """
+        self.path = cache_path
+
+    @classmethod
+    def cache_key(cls, source_file: Path, **parse_options) -> str:
+        """Return the key of a source file. The key changes if the file is modified
+        or if any of the parse options are different.
+
+        Args:
+            source_file (Path): Path to the file that is parsed (e.g., default_feature_report.csv)
+            parse_options: Any JSON serializable values that impact the parsed result.
+
+        Returns:
+            str: sha256 hex digest of the key data
+        """
+        stat = source_file.stat()
+        key_data = {
+            "version": cls.CACHE_VERSION,
+            "path": str(source_file.resolve()),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "options": parse_options,
+        }
+        return hashlib.sha256(json.dumps(key_data, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _entry_path(self, name: str) -> Path:
+        return self.path / f"{name}.npz"
+
+    def load(self, name: str, key: str) -> pd.DataFrame | None:
+        """Load the cached data frame if it exists and the key matches.
+
+        Args:
+            name (str): Name of the entry, e.g., feature_report_<building_id>
+            key (str): Key from the `cache_key` method
+
+        Returns:
+            pd.DataFrame | None: Cached data frame, or None if there is no valid entry
+        """
+        entry = self._entry_path(name)
+        if not entry.exists():
+            return None
+
+        try:
+            with np.load(entry, allow_pickle=False) as data:
+                if str(data["key"]) != key:
+                    return None
+
+                columns = data["columns"].tolist()
+                index = pd.DatetimeIndex(data["index"], name=str(data["index_name"]) or None)
+                cached_df = pd.DataFrame({column: data[f"c{i}"] for i, column in enumerate(columns)}, index=index)
+        except (OSError, ValueError, KeyError) as e:
+            # corrupt or old cache file, will be overwritten on the next save
+            print(f"WARNING: could not read cache entry {entry}: {e}")
+            return None
+
+        return cached_df
+
+    def save(self, name: str, key: str, df: pd.DataFrame) -> None:
+        """Save the data frame to the cache. The data frame must have a datetime index and
+        numeric columns.
+
+        Args:
+            name (str): Name of the entry, e.g., feature_report_<building_id>
+            key (str): Key from the `cache_key` method
+            df (pd.DataFrame): Data frame to save
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        arrays = {
+            "key": np.array(key),
+            "columns": np.array(df.columns.astype(str).tolist()),
+            "index": df.index.to_numpy(dtype="datetime64[ns]"),
+            "index_name": np.array(df.index.name or ""),
+        }
+        for i, column in enumerate(df.columns):
+            arrays[f"c{i}"] = df[column].to_numpy()
+
+        # write to a temporary file first so a partially written entry is never read
+        entry = self._entry_path(name)
+        tmp_entry = entry.with_suffix(".tmp")
+        with open(tmp_entry, "wb") as f:
+            np.savez(f, **arrays)
+        tmp_entry.replace(entry)
+
+    def clear(self) -> None:
+        """Remove all of the cached entries"""
+        if self.path.exists():
+            for entry in self.path.glob("*.npz"):
+                entry.unlink()
@@ -0,0 +1,184 @@
+# Memory budget of the data frames of the results. The frames that are assigned to the attributes of
+# the results are kept in the store, which tracks the size of each frame and spills the least recently
+# used frames to disk (one .npy file per dtype, see SnapshotWriter) when the frames in memory are over the
+# budget. A spilled frame is reloaded the next time that its attribute is used.
+
+import shutil
+import threading
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+from .snapshot import SnapshotReader, SnapshotWriter
+
+
+class FrameStore:
+    def __init__(self, path: Path, memory_budget: int) -> None:
+        """Store of the data frames of one or more owners (e.g., the URBANopt and Modelica results of an
+        analysis) that keeps the frames in memory within the memory budget. The frames are keyed on the
+        owner and the name of the attribute, see ResultsBase.use_frame_store.
+
+        The size of a frame is measured when it is stored or reloaded, so columns that are added in place
+        are only counted once the frame is assigned again. A frame that is spilled is only freed once the
+        other references to it (e.g., views or slices of the frame) are released.
+
+        Args:
+            path (Path): Directory to spill the frames to, which is created when the first frame is spilled
+            memory_budget (int): Maximum size of the frames in memory, in bytes
+        """
+        self.path = path
+        self.memory_budget = memory_budget
+        # frames in memory from the least to the most recently used, and their sizes
+        self.frames: OrderedDict[tuple[int, str], pd.DataFrame] = OrderedDict()
+        self.sizes: dict[tuple[int, str], int] = {}
+        # directory, name, and layout of each frame that was spilled to disk
+        self.spilled: dict[tuple[int, str], tuple[Path, str, dict]] = {}
+        self.memory_usage = 0
+        self.spill_count = 0
+        self.reload_count = 0
+        # ids of the owners, the frames of an owner are removed when it is garbage collected
+        self.owners: set[int] = set()
+        # the results of an analysis may be processed in threads, see URBANoptAnalysis.run_pipeline
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def frame_size(frame: pd.DataFrame) -> int:
+        """Return the size of the frame in memory, including the index and the contents of object columns"""
+        return int(frame.memory_usage(index=True, deep=True).sum())
+
+    def contains(self, owner: Any, name: str) -> bool:
+        """Return True if the frame of the owner's attribute is in the store, in memory or spilled"""
+        key = (id(owner), name)
+        with self._lock:
+            return key in self.frames or key in self.spilled
+
+    def names(self, owner: Any) -> list[str]:
+        """Return the names of the attributes of the owner that are in the store"""
+        with self._lock:
+            return [name for owner_id, name in [*self.frames, *self.spilled] if owner_id == id(owner)]
+
+    def put(self, owner: Any, name: str, frame: pd.DataFrame) -> None:
+        """Store the frame of the owner's attribute, replacing the previous frame, and spill the least
+        recently used frames if the frames in memory are over the budget.
+
+        Args:
+            owner (Any): Object of the attribute
+            name (str): Name of the attribute
+            frame (pd.DataFrame): Data frame to store
+        """
+        key = (id(owner), name)
+        with self._lock:
+            if id(owner) not in self.owners:
+                self.owners.add(id(owner))
+                weakref.finalize(owner, self._remove_owner, id(owner))
+            self._remove(key)
+            self.frames[key] = frame
+            self.sizes[key] = self.frame_size(frame)
+            self.memory_usage += self.sizes[key]
+            self.enforce(keep=key)
+
+    def get(self, owner: Any, name: str) -> pd.DataFrame:
+        """Return the frame of the owner's attribute, which is reloaded if it was spilled, and mark
+        it as the most recently used frame.
+
+        Args:
+            owner (Any): Object of the attribute
+            name (str): Name of the attribute
+
+        Raises:
+            KeyError: The attribute is not in the store
+
+        Returns:
+            pd.DataFrame: Data frame of the attribute
+        """
+        key = (id(owner), name)
+        with self._lock:
+            if key in self.frames:
+                self.frames.move_to_end(key)
+                return self.frames[key]
+
+            directory, frame_name, layout = self.spilled.pop(key)
+            frame = SnapshotReader(directory, layout, mmap_mode=None).read_frame(frame_name)
+            shutil.rmtree(directory, ignore_errors=True)
+            self.reload_count += 1
+            self.put(owner, name, frame)
+            return frame
+
+    def get_if_present(self, owner: Any, name: str) -> pd.DataFrame | None:
+        """Return the frame of the owner's attribute, or None if it is not in the store. The check and the
+        reload are done under one lock, so the frame cannot be removed by another thread in between.
+
+        Args:
+            owner (Any): Object of the attribute
+            name (str): Name of the attribute
+
+        Returns:
+            pd.DataFrame | None: Data frame of the attribute, or None if it is not in the store
+        """
+        with self._lock:
+            if not self.contains(owner, name):
+                return None
+            return self.get(owner, name)
+
+    def discard(self, owner: Any, name: str) -> bool:
+        """Remove the frame of the owner's attribute from the store, if it exists
+
+        Returns:
+            bool: True if the frame was in the store
+        """
+        with self._lock:
+            key = (id(owner), name)
+            removed = key in self.frames or key in self.spilled
+            self._remove(key)
+            return removed
+
+    def enforce(self, keep: tuple[int, str] | None = None) -> None:
+        """Spill the least recently used frames until the frames in memory are within the budget.
+
+        Args:
+            keep (tuple[int, str], optional): Key of a frame that is not spilled, e.g., the frame that is
+                being used. Defaults to None.
+        """
+        with self._lock:
+            for key in list(self.frames):
+                if self.memory_usage <= self.memory_budget:
+                    break
+                if key != keep:
+                    self._spill(key)
+
+    def clear(self) -> None:
+        """Remove all of the frames and the spilled files"""
+        with self._lock:
+            self.frames.clear()
+            self.sizes.clear()
+            self.spilled.clear()
+            self.owners.clear()
+            self.memory_usage = 0
+            if self.path.exists():
+                shutil.rmtree(self.path)
+
+    def _spill(self, key: tuple[int, str]) -> None:
+        directory = self.path / f"frame_{self.spill_count}"
+        directory.mkdir(parents=True, exist_ok=True)
+        writer = SnapshotWriter(directory)
+        name = writer.write_frame(self.frames.pop(key))
+        self.spilled[key] = (directory, name, writer.layout())
+        self.memory_usage -= self.sizes.pop(key)
+        self.spill_count += 1
+
+    def _remove_owner(self, owner_id: int) -> None:
+        with self._lock:
+            for key in [key for key in [*self.frames, *self.spilled] if key[0] == owner_id]:
+                self._remove(key)
+            self.owners.discard(owner_id)
+
+    def _remove(self, key: tuple[int, str]) -> None:
+        if key in self.frames:
+            del self.frames[key]
+            self.memory_usage -= self.sizes.pop(key)
+        if key in self.spilled:
+            directory, _, _ = self.spilled.pop(key)
+            shutil.rmtree(directory, ignore_errors=True)
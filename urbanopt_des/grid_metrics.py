@@ -0,0 +1,363 @@
+# Grid metrics engine. The daily metrics are calculated from partial daily statistics
+# (max, min, sum, count, ramping) that can be merged, so the same kernel is used for a
+# full data frame and for streaming chunks of a long (e.g., multi-year) simulation.
+
+import heapq
+from collections.abc import Iterable
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+from .peaks import top_k_peaks
+
+# the partial statistics of each day, which are arrays of shape (days x meters)
+PARTIAL_STATISTICS = ["max", "max_time", "min", "min_time", "sum", "count", "ramping"]
+
+
+def daily_grid_metric_partials(
+    df: pd.DataFrame, meters: list[str], previous_values: Union[np.ndarray, None] = None
+) -> tuple[pd.DatetimeIndex, dict[str, np.ndarray]]:
+    """Calculate the partial daily statistics of all the meters in one pass. The selected meters
+    are laid out as a (day x interval x meter) array, so the source data frame is not copied. Days
+    without data are included (the bins are calendar days) and missing values are skipped.
+
+    Args:
+        df (pd.DataFrame): Time series data with a sorted datetime index
+        meters (list[str]): Names of the meters (columns)
+        previous_values (np.ndarray, optional): Values of the meters in the row before the data frame, which
+            is used for the ramping of the first row. Defaults to None, which has no ramping in the first row.
+
+    Returns:
+        tuple[pd.DatetimeIndex, dict[str, np.ndarray]]: Days and the partial statistics of each day (days x meters).
+            The times are int64 nanoseconds, with NaT for days without data.
+    """
+    values = df[meters].to_numpy(dtype=float)
+    timestamps = df.index.to_numpy().astype("datetime64[ns]").astype(np.int64)
+
+    # position of each row in the (day x interval) layout
+    days = df.index.normalize()
+    day_index = pd.date_range(days[0], days[-1], freq="D", name=df.index.name)
+    day_of_row = ((days - days[0]) // pd.Timedelta(days=1)).to_numpy()
+    day_starts = np.searchsorted(day_of_row, np.arange(len(day_index)), side="left")
+    interval_of_row = np.arange(len(df)) - day_starts[day_of_row]
+    n_intervals = interval_of_row.max() + 1
+
+    layout = np.full((len(day_index), n_intervals, len(meters)), np.nan)
+    layout[day_of_row, interval_of_row] = values
+    rows = np.full((len(day_index), n_intervals), -1)
+    rows[day_of_row, interval_of_row] = np.arange(len(df))
+
+    # the ramping is the absolute change from the previous interval, including across days
+    if previous_values is None:
+        previous_values = np.full((1, len(meters)), np.nan)
+    ramping = np.zeros((len(day_index), n_intervals, len(meters)))
+    ramping[day_of_row, interval_of_row] = np.nan_to_num(np.abs(np.diff(values, axis=0, prepend=np.reshape(previous_values, (1, -1)))))
+
+    missing = np.isnan(layout)
+    all_missing = missing.all(axis=1)
+    argmax = np.where(missing, -np.inf, layout).argmax(axis=1)
+    argmin = np.where(missing, np.inf, layout).argmin(axis=1)
+
+    # timestamps of the first occurrence of the max and min of each day
+    day_positions = np.arange(len(day_index))[:, None]
+    nat = np.datetime64("NaT").astype("datetime64[ns]").astype(np.int64)
+    partials = {
+        "max": np.where(all_missing, np.nan, layout[day_positions, argmax, np.arange(len(meters))]),
+        "max_time": np.where(all_missing, nat, timestamps[rows[day_positions, argmax]]),
+        "min": np.where(all_missing, np.nan, layout[day_positions, argmin, np.arange(len(meters))]),
+        "min_time": np.where(all_missing, nat, timestamps[rows[day_positions, argmin]]),
+        "sum": np.where(missing, 0, layout).sum(axis=1),
+        "count": (~missing).sum(axis=1),
+        "ramping": ramping.sum(axis=1),
+    }
+    return day_index, partials
+
+
+def merge_daily_grid_metric_partials(first: dict[str, np.ndarray], second: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    """Merge the partial statistics of the same days, where the data of the first are before the data
+    of the second. If the max (or min) are equal, then the time of the first is kept.
+
+    Args:
+        first (dict[str, np.ndarray]): Partial statistics of the earlier data
+        second (dict[str, np.ndarray]): Partial statistics of the later data
+
+    Returns:
+        dict[str, np.ndarray]: Merged partial statistics
+    """
+    first_max = np.where(np.isnan(first["max"]), -np.inf, first["max"])
+    first_min = np.where(np.isnan(first["min"]), np.inf, first["min"])
+    use_second_max = second["max"] > first_max
+    use_second_min = second["min"] < first_min
+    return {
+        "max": np.where(use_second_max, second["max"], first["max"]),
+        "max_time": np.where(use_second_max, second["max_time"], first["max_time"]),
+        "min": np.where(use_second_min, second["min"], first["min"]),
+        "min_time": np.where(use_second_min, second["min_time"], first["min_time"]),
+        "sum": first["sum"] + second["sum"],
+        "count": first["count"] + second["count"],
+        "ramping": first["ramping"] + second["ramping"],
+    }
+
+
+def daily_grid_metrics_from_partials(day_index: pd.DatetimeIndex, partials: dict[str, np.ndarray], meters: list[str]) -> pd.DataFrame:
+    """Create the daily grid metrics data frame from the partial statistics.
+
+    Args:
+        day_index (pd.DatetimeIndex): Days of the partial statistics
+        partials (dict[str, np.ndarray]): Partial statistics (days x meters)
+        meters (list[str]): Names of the meters
+
+    Returns:
+        pd.DataFrame: Daily grid metrics with the columns "{meter} Max", "{meter} Max Datetime", "{meter} Min",
+            "{meter} Min Datetime", "{meter} Mean", "{meter} Sum", "{meter} PVR", "{meter} Load Factor",
+            and "{meter} System Ramping" for each meter.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        day_mean = np.where(partials["count"] > 0, partials["sum"] / partials["count"], np.nan)
+        pvr = partials["max"] / partials["min"]
+        load_factor = day_mean / partials["max"]
+    day_ramping = partials["ramping"] / 1e6
+    max_datetime = partials["max_time"].astype("datetime64[ns]")
+    min_datetime = partials["min_time"].astype("datetime64[ns]")
+
+    metrics = {}
+    for i, meter in enumerate(meters):
+        metrics[f"{meter} Max"] = partials["max"][:, i]
+        metrics[f"{meter} Max Datetime"] = max_datetime[:, i]
+        metrics[f"{meter} Min"] = partials["min"][:, i]
+        metrics[f"{meter} Min Datetime"] = min_datetime[:, i]
+        metrics[f"{meter} Mean"] = day_mean[:, i]
+        metrics[f"{meter} Sum"] = partials["sum"][:, i]
+        metrics[f"{meter} PVR"] = pvr[:, i]
+        metrics[f"{meter} Load Factor"] = load_factor[:, i]
+        metrics[f"{meter} System Ramping"] = day_ramping[:, i]
+
+    return pd.DataFrame(metrics, index=day_index)
+
+
+class GridMetricsAccumulator:
+    def __init__(
+        self,
+        meters: list[str],
+        peak_meters: Union[list[str], None] = None,
+        peak_signs: Union[list[int], None] = None,
+        energy_meters: Union[list[str], None] = None,
+        k: int = 5,
+    ) -> None:
+        """Online grid metrics that consume the time series in chunks (in order). Only the
+        daily statistics, the annual energy sums, and a bounded top-K heap of peaks per meter
+        and year are kept, so the full time series never needs to be in memory.
+
+            accumulator = GridMetricsAccumulator(meters, peak_meters=["Total Electricity"])
+            for chunk in chunks_15min:
+                accumulator.update(chunk)
+            for chunk in chunks_60min:
+                accumulator.update_energy(chunk)
+            daily = accumulator.daily_metrics()
+
+        A day can be split across chunks. The peaks are unique values (zeros can repeat) at
+        the time of their first occurrence, which is the same as top_k_peaks.
+
+        Args:
+            meters (list[str]): Names of the meters for the daily metrics
+            peak_meters (list[str], optional): Names of the meters for the peaks. Defaults to None.
+            peak_signs (list[int], optional): 1 if the peak is the largest value, -1 if the peak is the most
+                negative value (e.g., cooling). Defaults to None, which is 1 for all of the peak meters.
+            energy_meters (list[str], optional): Names of the meters to sum per year in update_energy. Defaults to None.
+            k (int, optional): Number of peaks per meter and year. Defaults to 5.
+        """
+        self.meters = list(meters)
+        self.peak_meters = list(peak_meters or [])
+        self.peak_signs = list(peak_signs) if peak_signs is not None else [1] * len(self.peak_meters)
+        self.energy_meters = list(energy_meters or [])
+        self.k = k
+
+        # closed days, the last day is kept open in case the next chunk continues the day
+        self._closed_days: list[pd.DatetimeIndex] = []
+        self._closed_partials: list[dict[str, np.ndarray]] = []
+        self._open_day: Union[pd.Timestamp, None] = None
+        self._open_partials: Union[dict[str, np.ndarray], None] = None
+        self._last_values: Union[np.ndarray, None] = None
+        self._last_time: Union[pd.Timestamp, None] = None
+
+        # {year: {meter: [(value, time), ...]}}
+        self._peaks: dict[int, dict[str, list[tuple[float, pd.Timestamp]]]] = {}
+        # {year: np.ndarray of the sums of the energy meters}
+        self._energy: dict[int, np.ndarray] = {}
+        self.index_name = None
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """Add the next chunk of the time series to the daily metrics and the peaks.
+
+        Args:
+            chunk (pd.DataFrame): Next chunk of the time series with a sorted datetime index
+
+        Raises:
+            Exception: The chunk starts before the end of the previous chunk
+        """
+        if chunk.empty:
+            return
+        if self._last_time is not None and chunk.index[0] <= self._last_time:
+            raise Exception(
+                f"Chunks must be in order, chunk starts at {chunk.index[0]} before the previous chunk ended at {self._last_time}"
+            )
+        self.index_name = chunk.index.name
+
+        day_index, partials = daily_grid_metric_partials(chunk, self.meters, self._last_values)
+        if self._open_day is not None:
+            if day_index[0] == self._open_day:
+                first_day = merge_daily_grid_metric_partials(self._open_partials, {name: p[:1] for name, p in partials.items()})
+                for name in PARTIAL_STATISTICS:
+                    partials[name] = np.concatenate([first_day[name], partials[name][1:]])
+            else:
+                self._closed_days.append(pd.DatetimeIndex([self._open_day]))
+                self._closed_partials.append(self._open_partials)
+
+        # all but the last day of the chunk are complete
+        if len(day_index) > 1:
+            self._closed_days.append(day_index[:-1])
+            self._closed_partials.append({name: p[:-1] for name, p in partials.items()})
+        self._open_day = day_index[-1]
+        self._open_partials = {name: p[-1:] for name, p in partials.items()}
+        self._last_values = chunk[self.meters].iloc[-1].to_numpy(dtype=float)
+        self._last_time = chunk.index[-1]
+
+        if self.peak_meters:
+            for year, year_chunk in self._split_years(chunk):
+                values, positions = top_k_peaks(year_chunk, self.peak_meters, k=self.k, signs=self.peak_signs)
+                year_peaks = self._peaks.setdefault(year, {meter: [] for meter in self.peak_meters})
+                for meter, sign, meter_values, meter_positions in zip(self.peak_meters, self.peak_signs, values, positions):
+                    new_peaks = [
+                        (value, year_chunk.index[position]) for value, position in zip(meter_values, meter_positions) if position != -1
+                    ]
+                    year_peaks[meter] = self._merge_peaks(year_peaks[meter], new_peaks, sign)
+
+    def update_energy(self, chunk: pd.DataFrame) -> None:
+        """Add the next chunk of the time series to the annual sums of the energy meters. This is
+        typically the hourly data, since the 15 minute data cannot be summed to energy.
+
+        Args:
+            chunk (pd.DataFrame): Next chunk of the time series with a datetime index
+        """
+        if chunk.empty or not self.energy_meters:
+            return
+        sums = chunk[self.energy_meters].groupby(chunk.index.year).sum()
+        for year, row in zip(sums.index, sums.to_numpy(dtype=float)):
+            self._energy[year] = self._energy.get(year, 0) + row
+
+    def _split_years(self, chunk: pd.DataFrame) -> Iterable[tuple[int, pd.DataFrame]]:
+        """Split the chunk into the data of each year, without copying the data"""
+        years = chunk.index.year.to_numpy()
+        boundaries = np.flatnonzero(np.diff(years)) + 1
+        for start, end in zip(np.concatenate([[0], boundaries]), np.concatenate([boundaries, [len(chunk)]])):
+            yield int(years[start]), chunk.iloc[start:end]
+
+    def _merge_peaks(self, peaks: list[tuple], new_peaks: list[tuple], sign: int) -> list[tuple]:
+        """Merge the new peaks into the bounded top-K peaks, keeping the first occurrence of each value"""
+        first_occurrence = {}
+        zeros = []
+        for value, time in [*peaks, *new_peaks]:
+            if value == 0:
+                zeros.append((value, time))
+            elif value not in first_occurrence or time < first_occurrence[value]:
+                first_occurrence[value] = time
+        candidates = [*first_occurrence.items(), *zeros]
+        return heapq.nsmallest(self.k, candidates, key=lambda peak: (-sign * peak[0], peak[1]))
+
+    def daily_metrics(self) -> pd.DataFrame:
+        """Return the daily grid metrics of all of the data that has been consumed. Days without data
+        between the chunks are included.
+
+        Returns:
+            pd.DataFrame: Daily grid metrics, see daily_grid_metrics_from_partials
+        """
+        if self._open_day is None:
+            raise Exception("No data has been added to the grid metrics")
+        day_index = pd.DatetimeIndex(
+            np.concatenate([*(days.to_numpy() for days in self._closed_days), [self._open_day.to_datetime64()]]), name=self.index_name
+        )
+        partials = {
+            name: np.concatenate([*(p[name] for p in self._closed_partials), self._open_partials[name]]) for name in PARTIAL_STATISTICS
+        }
+        daily = daily_grid_metrics_from_partials(day_index, partials, self.meters)
+
+        # include the days without data, which have a sum and ramping of zero
+        all_days = pd.date_range(day_index[0], day_index[-1], freq="D", name=self.index_name)
+        if len(all_days) != len(day_index):
+            daily = daily.reindex(all_days)
+            fill_columns = [f"{meter} {metric}" for meter in self.meters for metric in ["Sum", "System Ramping"]]
+            daily[fill_columns] = daily[fill_columns].fillna(0)
+        return daily
+
+    def peaks(self) -> dict[int, dict[str, list[tuple[float, pd.Timestamp]]]]:
+        """Return the top-K peaks of each year and peak meter, as a list of (value, time) from the largest peak"""
+        return self._peaks
+
+    def energy(self) -> pd.DataFrame:
+        """Return the annual sums of the energy meters, indexed by the end of each year
+
+        Returns:
+            pd.DataFrame: Annual sums with one column per energy meter
+        """
+        years = sorted(self._energy)
+        return pd.DataFrame(
+            [self._energy[year] for year in years],
+            index=pd.DatetimeIndex([pd.Timestamp(year=year, month=12, day=31) for year in years]),
+            columns=self.energy_meters,
+        )
+
+
+def peak_diversity(block: np.ndarray, index: pd.DatetimeIndex, freq: str = "Y") -> pd.DataFrame:
+    """Calculate the coincident peak, the sum of the non-coincident peaks, and the diversity factor
+    of a block of loads (e.g., the electricity of every building) for each period. The non-coincident
+    peaks of all of the columns are found in one pass, and the coincident peak is the peak of the
+    sum of the columns.
+
+    Args:
+        block (np.ndarray): Loads with shape (time x columns), missing values are skipped
+        index (pd.DatetimeIndex): Datetime index of the rows of the block, which does not need to be sorted
+        freq (str, optional): Period of the peaks, "Y" for each year or "M" for each month. Defaults to "Y".
+
+    Returns:
+        pd.DataFrame: One row per period with the "Coincident Peak", "Coincident Peak Datetime",
+            "Sum of Non-Coincident Peaks", and the "Diversity Factor" (sum of the non-coincident peaks
+            divided by the coincident peak)
+    """
+    block = np.asarray(block, dtype=float)
+    if not index.is_monotonic_increasing:
+        # the periods are runs of adjacent rows, e.g., the last row of the URBANopt data wraps back to
+        # the start of the year and would be a second period
+        order = index.argsort(kind="stable")
+        block, index = block[order], index[order]
+    periods = index.to_period(freq)
+    starts = np.flatnonzero(np.concatenate([[True], periods[1:] != periods[:-1]]))
+    lengths = np.diff(np.append(starts, len(index)))
+
+    # peak of each column in each period, columns without data are skipped
+    missing = np.isnan(block)
+    column_peaks = np.maximum.reduceat(np.where(missing, -np.inf, block), starts, axis=0)
+    column_peaks = np.where(np.isinf(column_peaks), np.nan, column_peaks)
+    non_coincident = np.nansum(column_peaks, axis=1)
+
+    # peak of the total in each period, laid out as (period x interval)
+    total = np.where(missing, 0, block).sum(axis=1)
+    period_of_row = np.repeat(np.arange(len(starts)), lengths)
+    interval_of_row = np.arange(len(index)) - starts[period_of_row]
+    layout = np.full((len(starts), lengths.max()), -np.inf)
+    layout[period_of_row, interval_of_row] = total
+    peak_interval = layout.argmax(axis=1)
+    coincident = layout[np.arange(len(starts)), peak_interval]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        diversity_factor = non_coincident / coincident
+
+    return pd.DataFrame(
+        {
+            "Coincident Peak": coincident,
+            "Coincident Peak Datetime": index[starts + peak_interval],
+            "Sum of Non-Coincident Peaks": non_coincident,
+            "Diversity Factor": diversity_factor,
+        },
+        index=pd.Index(periods[starts].astype(str), name="Period"),
+    )
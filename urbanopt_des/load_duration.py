@@ -0,0 +1,189 @@
+# Load duration curves and quantile sketches of the meters. All of the meters are sorted
+# in one batched sort, and the sketch keeps a fixed grid of quantiles per meter so that
+# percentiles and hours above a threshold can be answered without sorting again. Meters
+# whose load is negative (e.g., cooling) are sorted by the magnitude of the load with a sign
+# of -1, the same as the peaks, see top_k_peaks.
+
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+
+def interval_hours(index: pd.DatetimeIndex) -> float:
+    """Return the hours of each interval of an index at a fixed interval, 1 if there is only one row"""
+    return (index[1] - index[0]) / pd.Timedelta(hours=1) if len(index) > 1 else 1.0
+
+
+def sort_meters(df: pd.DataFrame, meters: list[str], signs: Union[list[int], None] = None) -> tuple[np.ndarray, np.ndarray, float]:
+    """Sort all of the meters in one batched sort.
+
+    Args:
+        df (pd.DataFrame): Time series data with a datetime index at a fixed interval
+        meters (list[str]): Names of the meters (columns)
+        signs (list[int], optional): 1 if the load is positive, -1 if the load is negative (e.g., cooling), so
+            that the largest load is the most negative value. Defaults to None, which is 1 for all of the meters.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, float]: Values times the sign sorted in ascending order per column (time x meters,
+            missing values at the end), the number of values of each meter, and the hours of each interval
+    """
+    values = df[meters].to_numpy(dtype=float)
+    if signs is not None:
+        values = values * np.asarray(signs, dtype=float)
+    values = np.sort(values, axis=0)
+    counts = (~np.isnan(values)).sum(axis=0)
+    return values, counts, interval_hours(df.index)
+
+
+def load_duration_curves(df: pd.DataFrame, meters: list[str], signs: Union[list[int], None] = None) -> pd.DataFrame:
+    """Create the load duration curves of the meters, which are the values sorted from the largest
+    to smallest load against the number of hours that the load is equaled or exceeded.
+
+    Args:
+        df (pd.DataFrame): Time series data with a datetime index at a fixed interval
+        meters (list[str]): Names of the meters (columns)
+        signs (list[int], optional): Sign of the load of each meter, see sort_meters. Defaults to None.
+
+    Returns:
+        pd.DataFrame: One column per meter indexed by the hours, missing values are at the end
+    """
+    values, counts, interval_hours = sort_meters(df, meters, signs)
+    return load_duration_curves_from_sorted(values, counts, interval_hours, meters, signs)
+
+
+def load_duration_curves_from_sorted(
+    values: np.ndarray, counts: np.ndarray, interval_hours: float, meters: list[str], signs: Union[list[int], None] = None
+) -> pd.DataFrame:
+    """Create the load duration curves from the output of sort_meters, with the same signs. See load_duration_curves."""
+    # reverse the values that are not missing of each meter, so the missing values stay at the end
+    rows = np.arange(len(values))[:, None]
+    descending = np.where(rows < counts, counts - 1 - rows, rows)
+    curves = np.take_along_axis(values, descending, axis=0)
+    if signs is not None:
+        curves = curves * np.asarray(signs, dtype=float)
+    index = pd.Index((np.arange(len(values)) + 1) * interval_hours, name="Hours")
+    return pd.DataFrame(curves, index=index, columns=meters)
+
+
+class QuantileSketch:
+    def __init__(
+        self,
+        quantiles: np.ndarray,
+        grid: np.ndarray,
+        counts: np.ndarray,
+        interval_hours: float,
+        meters: list[str],
+        signs: Union[list[int], None] = None,
+    ) -> None:
+        """Compact summary of the distribution of each meter, which is the value of the meter at a fixed
+        grid of quantiles. Percentiles (e.g., P99 demand) and the hours above a threshold are interpolated
+        from the grid. With the default 1001 quantiles, the error of the hours above a threshold is at most
+        0.1% of the hours of the data. Create the sketch with from_dataframe.
+
+        The quantiles are of the load, so for a meter with a sign of -1 (e.g., cooling), the 0.99 quantile is
+        the 99th percentile of the cooling load, which is a negative value.
+
+        Args:
+            quantiles (np.ndarray): Grid of quantiles from 0 to 1
+            grid (np.ndarray): Value of each meter times its sign at each quantile (quantiles x meters)
+            counts (np.ndarray): Number of values (not missing) of each meter
+            interval_hours (float): Hours of each interval of the data
+            meters (list[str]): Names of the meters
+            signs (list[int], optional): Sign of the load of each meter, see sort_meters. Defaults to None,
+                which is 1 for all of the meters.
+        """
+        self.quantiles = quantiles
+        self.grid = grid
+        self.counts = counts
+        self.interval_hours = interval_hours
+        self.meters = list(meters)
+        self.signs = np.asarray(signs if signs is not None else [1] * len(self.meters), dtype=float)
+
+    @classmethod
+    def from_dataframe(
+        cls, df: pd.DataFrame, meters: list[str], n_quantiles: int = 1001, signs: Union[list[int], None] = None
+    ) -> "QuantileSketch":
+        """Create the sketch of the meters with one batched sort.
+
+        Args:
+            df (pd.DataFrame): Time series data with a datetime index at a fixed interval
+            meters (list[str]): Names of the meters (columns)
+            n_quantiles (int, optional): Number of quantiles in the grid. Defaults to 1001.
+            signs (list[int], optional): Sign of the load of each meter, see sort_meters. Defaults to None.
+
+        Returns:
+            QuantileSketch: Sketch of the meters
+        """
+        values, counts, interval_hours = sort_meters(df, meters, signs)
+        return cls.from_sorted(values, counts, interval_hours, meters, n_quantiles, signs)
+
+    @classmethod
+    def from_sorted(
+        cls,
+        values: np.ndarray,
+        counts: np.ndarray,
+        interval_hours: float,
+        meters: list[str],
+        n_quantiles: int = 1001,
+        signs: Union[list[int], None] = None,
+    ) -> "QuantileSketch":
+        """Create the sketch from the output of sort_meters, with the same signs. See from_dataframe."""
+        quantiles = np.linspace(0, 1, n_quantiles)
+        # linear interpolation between the sorted values, the same as np.quantile
+        positions = quantiles[:, None] * np.maximum(counts - 1, 0)
+        lower = np.floor(positions).astype(np.int64)
+        upper = np.minimum(lower + 1, np.maximum(counts - 1, 0))
+        weights = positions - lower
+        lower_values = np.take_along_axis(values, lower, axis=0) if len(values) else np.full(positions.shape, np.nan)
+        upper_values = np.take_along_axis(values, upper, axis=0) if len(values) else np.full(positions.shape, np.nan)
+        grid = lower_values + (upper_values - lower_values) * weights
+        grid[:, counts == 0] = np.nan
+        return cls(quantiles, grid, counts, interval_hours, meters, signs)
+
+    def quantile(self, q: Union[float, list[float]]) -> Union[pd.Series, pd.DataFrame]:
+        """Return the value of each meter at the quantile(s), e.g., 0.99 for the P99 demand.
+
+        Args:
+            q (Union[float, list[float]]): Quantile or list of quantiles from 0 to 1
+
+        Returns:
+            Union[pd.Series, pd.DataFrame]: Value of each meter, or one row per quantile if q is a list
+        """
+        qs = np.atleast_1d(np.asarray(q, dtype=float))
+        result = pd.DataFrame(
+            {meter: np.interp(qs, self.quantiles, self.grid[:, i]) * self.signs[i] for i, meter in enumerate(self.meters)},
+            index=pd.Index(qs, name="Quantile"),
+        )
+        return result.iloc[0] if np.ndim(q) == 0 else result
+
+    def hours_above(self, threshold: Union[float, dict[str, float]]) -> pd.Series:
+        """Return the number of hours that the load of each meter is above the threshold. For a meter with a sign
+        of -1, this is the hours that the value is below the (negative) threshold.
+
+        Args:
+            threshold (Union[float, dict[str, float]]): Threshold of all of the meters, or the threshold of each meter
+
+        Returns:
+            pd.Series: Hours above the threshold of each meter
+        """
+        hours = {}
+        for i, meter in enumerate(self.meters):
+            value = (threshold[meter] if isinstance(threshold, dict) else threshold) * self.signs[i]
+            column = self.grid[:, i]
+            if self.counts[i] == 0 or value >= column[-1]:
+                hours[meter] = 0.0
+            elif value < column[0]:
+                hours[meter] = self.counts[i] * self.interval_hours
+            else:
+                # the last quantile at or below the threshold, which handles flat sections of the grid
+                fraction_below = np.interp(value, column, self.quantiles, left=0, right=1)
+                equal = np.flatnonzero(column == value)
+                if len(equal) > 0:
+                    fraction_below = self.quantiles[equal[-1]]
+                hours[meter] = (1 - fraction_below) * self.counts[i] * self.interval_hours
+        return pd.Series(hours, name="Hours Above")
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Return the grid of quantiles, with one column per meter"""
+        return pd.DataFrame(self.grid * self.signs, index=pd.Index(self.quantiles, name="Quantile"), columns=self.meters)
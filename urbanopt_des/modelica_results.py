@@ -4,10 +4,13 @@ import re
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 from buildingspy.io.outputfile import Reader
 
-from .emissions import HourlyEmissionsData
+from .aggregations import AggregationGraph
+from .emissions import HistoricalEmissionsData, HourlyEmissionsData
+from .resolution_view import UpsampledView
 from .results_base import ResultsBase
 
 _log = logging.getLogger(__name__)
@@ -18,6 +21,9 @@ VariablesDict = dict[str, bool | str | int]
 class ModelicaResults(ResultsBase):
     """Catch for modelica methods. This needs to be refactored"""
 
+    # attributes that are not saved in a snapshot, the reader of the .mat file is not kept
+    SNAPSHOT_EXCLUDE = [*ResultsBase.SNAPSHOT_EXCLUDE, "modelica_data"]
+
     def __init__(self, mat_filename: Path, output_path: Path | None = None) -> None:
         """Class for holding the results of a Modelica simulation. This class will handle the post processing
         necessary to create data frames that can be easily compared with other simulation results including
@@ -73,9 +79,15 @@ class ModelicaResults(ResultsBase):
         self.min_60_with_buildings = None
         self.monthly = None
         self.data_annual = None
+        # optional daily and time-of-use rollups, see URBANoptAnalysis.create_rollups
+        self.daily = None
+        self.tou = None
         self.end_use_summary = None
         self.grid_metrics_daily = None
         self.grid_metrics_annual = None
+        self.load_duration_curves = None
+        self.load_duration_sketch = None
+        self.building_carbon_emissions = None
 
     def save_variables(self, path_to_save: Path | None = None) -> dict:
         """Save the names of the Modelica variables, including the descriptions and units (if available).
@@ -447,19 +459,28 @@ class ModelicaResults(ResultsBase):
 
         df_power = pd.DataFrame(data)
 
-        # create aggregations for the cooling plant
-        df_power["Total Chillers"] = df_power[agg_columns["Chillers Total"]].sum(axis=1)
-        df_power["Total Cooling Plant"] = df_power[agg_columns["Cooling Plant Total"]].sum(axis=1)
-
-        # create aggregations for the heating plant
-        df_power["Total Boilers"] = df_power[agg_columns["Boilers Total"]].sum(axis=1)
-        df_power["Total Heating Plant"] = df_power[agg_columns["Heating Plant Total"]].sum(axis=1)
-
-        # create aggregation columns for total pumps, total heat pumps, and total
-        df_power["ETS Pump Electricity Total"] = df_power[agg_columns["ETS Pump Electricity Total"]].sum(axis=1)
-        df_power["ETS Heat Pump Electricity Total"] = df_power[agg_columns["ETS Heat Pump Electricity Total"]].sum(axis=1)
-        df_power["Total Thermal Cooling Energy"] = df_power[agg_columns["ETS Thermal Cooling Total"]].sum(axis=1)
-        df_power["Total Thermal Heating Energy"] = df_power[agg_columns["ETS Thermal Heating Total"]].sum(axis=1)
+        # create aggregations for the cooling plant, the heating plant, and the
+        # total pumps, total heat pumps, and total thermal energy
+        totals = {
+            "Total Chillers": agg_columns["Chillers Total"],
+            "Total Cooling Plant": agg_columns["Cooling Plant Total"],
+            "Total Boilers": agg_columns["Boilers Total"],
+            "Total Heating Plant": agg_columns["Heating Plant Total"],
+            "ETS Pump Electricity Total": agg_columns["ETS Pump Electricity Total"],
+            "ETS Heat Pump Electricity Total": agg_columns["ETS Heat Pump Electricity Total"],
+            "Total Thermal Cooling Energy": agg_columns["ETS Thermal Cooling Total"],
+            "Total Thermal Heating Energy": agg_columns["ETS Thermal Heating Total"],
+            "Total DES Electricity": [
+                "ETS Pump Electricity Total",
+                "ETS Heat Pump Electricity Total",
+                "Sewer Pump Electricity",
+                "GHX Pump Electricity",
+                "Distribution Pump Electricity",
+                "Total Cooling Plant",
+                "Total Heating Plant",
+            ],
+        }
+        AggregationGraph(totals).apply(df_power)
 
         # Calculate the District Loop Power - Default to zero to start with
         df_power["District Loop Energy"] = 0
@@ -470,17 +491,6 @@ class ModelicaResults(ResultsBase):
                 df_power["TDisWatRet.port_a.m_flow"] * 4186 * abs(df_power["TDisWatRet.T"] - df_power["TDisWatSup.T"])
             )
 
-        column_names = [
-            "ETS Pump Electricity Total",
-            "ETS Heat Pump Electricity Total",
-            "Sewer Pump Electricity",
-            "GHX Pump Electricity",
-            "Distribution Pump Electricity",
-            "Total Cooling Plant",
-            "Total Heating Plant",
-        ]
-        df_power["Total DES Electricity"] = df_power[column_names].sum(axis=1)
-
         # TODO: Add in total DES Natural Gas
 
         # sum up all ETS data (pump and heat pump)
@@ -500,52 +510,143 @@ class ModelicaResults(ResultsBase):
 
         return True
 
+    # non-HVAC end uses of each building that are combined with the Modelica results
+    BUILDING_END_USE_METERS = [
+        # by building end use and fuel type
+        "InteriorLights:Electricity Building",
+        "ExteriorLights:Electricity Building",
+        "InteriorEquipment:Electricity Building",
+        "ExteriorEquipment:Electricity Building",
+        "InteriorEquipment:NaturalGas Building",
+    ]
+    # end use totals that are non-HVAC
+    END_USE_TOTAL_METERS = [
+        "Total Building Interior Lighting",
+        "Total Building Exterior Lighting",
+        "Total Building Interior Equipment Electricity",
+        "Total Building Exterior Equipment Electricity",
+        "Total Building Interior Equipment Natural Gas",
+        "Total Building Interior Equipment",
+    ]
+
+    @classmethod
+    def openstudio_meter_names(cls, building_ids: list[str]) -> list[str]:
+        """Return the names of the OpenStudio columns that are combined with the Modelica results.
+
+        Args:
+            building_ids (list[str]): Name of the buildings
+
+        Returns:
+            list[str]: Names of the end use columns of each building and the end use totals
+        """
+        return [f"{meter_name} {building_id}" for building_id in building_ids for meter_name in cls.BUILDING_END_USE_METERS] + list(
+            cls.END_USE_TOTAL_METERS
+        )
+
+    @staticmethod
+    def align_indexes(index: pd.Index, other_index: pd.Index) -> tuple[slice | np.ndarray | None, slice | np.ndarray | None, pd.Index]:
+        """Return the rows of both indexes that are in both indexes (an inner join), in the order of the first index.
+        Equal indexes are not aligned, and indexes on the same regular time step are aligned by the offset of their
+        first timestamps, which only leaves the other indexes to be aligned by a hash join.
+
+        Args:
+            index (pd.Index): Index of the first data frame
+            other_index (pd.Index): Index of the other data frame
+
+        Returns:
+            tuple[slice | np.ndarray | None, slice | np.ndarray | None, pd.Index]: Rows of each index (None if all of
+                the rows in the same order) and the joined index
+        """
+        if index.equals(other_index):
+            return None, None, index
+
+        step = _regular_step(index)
+        if step is not None and step == _regular_step(other_index) and index.tz == other_index.tz:
+            offset, remainder = divmod(int(other_index.asi8[0] - index.asi8[0]), step)
+            if remainder != 0:
+                # the time steps are shifted, so no timestamps are in both indexes
+                return slice(0, 0), slice(0, 0), index[:0]
+            # the rows of index that are in other_index, and the same rows of other_index
+            start = max(0, offset)
+            stop = max(start, min(len(index), offset + len(other_index)))
+            return slice(start, stop), slice(start - offset, stop - offset), index[start:stop]
+
+        positions = other_index.get_indexer(index)
+        rows = np.flatnonzero(positions >= 0)
+        return rows, positions[rows], index[rows]
+
     def combine_with_openstudio_results(
         self,
         building_ids: list[str] | None,
         openstudio_df: pd.DataFrame,
         openstudio_df_15: pd.DataFrame,
+        alignment_cache: dict | None = None,
     ) -> None:
         """Only combine the end uses, not the total energy since that needs to be
         recalculated based on the modelica results. Basically, this only looks at the columns that are not
         HVAC related.
 
+        The OpenStudio columns are selected once and the alignment of the indexes is reused when the same
+        alignment_cache is passed for each analysis, so the analyses share the selected OpenStudio columns. The
+        alignments are keyed on the values of the indexes, so they are also reused for a new data frame (or a new
+        15 minute view, which data_15min creates on each access) with the same index. The combined data frames
+        are joined without copying the rows that are selected by a slice.
+
         Args:
             building_ids (list[str] | None): Name of the buildings
             openstudio_df (pd.DataFrame): dataframe of URBANopt/OpenStudio hourly results
             openstudio_df_15 (pd.DataFrame): dataframe of URBANopt/OpenStudio 15min results
+            alignment_cache (dict, optional): Selected OpenStudio columns and index alignments of each resolution,
+                shared across the analyses. Defaults to None, which does not reuse the alignment.
         Returns:
             NoneType: None
         """
-        # create the list of columns from the building name
-        building_meter_names = [
-            # by building end use and fuel type
-            "InteriorLights:Electricity Building",
-            "ExteriorLights:Electricity Building",
-            "InteriorEquipment:Electricity Building",
-            "ExteriorEquipment:Electricity Building",
-            "InteriorEquipment:NaturalGas Building",
-        ]
-        meter_names = [f"{meter_name} {building_id}" for building_id in building_ids for meter_name in building_meter_names]
-        # add in the end use totals that are non-HVAC
-        meter_names += [
-            "Total Building Interior Lighting",
-            "Total Building Exterior Lighting",
-            "Total Building Interior Equipment Electricity",
-            "Total Building Exterior Equipment Electricity",
-            "Total Building Interior Equipment Natural Gas",
-            "Total Building Interior Equipment",
-        ]
+        if alignment_cache is None:
+            alignment_cache = {}
 
-        self.min_60_with_buildings = pd.concat([self.min_60, openstudio_df[meter_names]], axis=1, join="inner")
-        self.min_60_with_buildings.index.name = "datetime"
+        self.min_60_with_buildings = self._combine_openstudio_block(self.min_60, openstudio_df, building_ids, "60min", alignment_cache)
 
         # also conduct this for the 15 minute time step
-        self.min_15_with_buildings = pd.concat([self.min_15, openstudio_df_15[meter_names]], axis=1, join="inner")
-        self.min_15_with_buildings.index.name = "datetime"
+        self.min_15_with_buildings = self._combine_openstudio_block(self.min_15, openstudio_df_15, building_ids, "15min", alignment_cache)
 
         # should we resort the columns?
 
+    def _combine_openstudio_block(
+        self, data: pd.DataFrame, openstudio_df: pd.DataFrame, building_ids: list[str], resolution: str, alignment_cache: dict
+    ) -> pd.DataFrame:
+        cached = alignment_cache.setdefault(resolution, {"source": None, "building_ids": None, "block": None, "alignments": []})
+        if not self._same_source(cached["source"], openstudio_df) or cached["building_ids"] != list(building_ids):
+            # the other fuels of the buildings (e.g., propane) are not served by the district system
+            other_fuel_columns = [
+                column for column in self.other_fuel_columns(openstudio_df.columns) if column.split(" Building ")[1] in building_ids
+            ]
+            cached["source"] = openstudio_df
+            cached["building_ids"] = list(building_ids)
+            cached["block"] = openstudio_df[self.openstudio_meter_names(building_ids) + other_fuel_columns]
+
+        # the alignments are keyed on the values of both indexes, the same as RollupEngine.calendar
+        block = cached["block"]
+        for index, block_index, alignment in cached["alignments"]:
+            if (index is data.index or index.equals(data.index)) and (block_index is block.index or block_index.equals(block.index)):
+                break
+        else:
+            alignment = self.align_indexes(data.index, block.index)
+            cached["alignments"].append((data.index, block.index, alignment))
+
+        # both sides are on the joined index, so they are not aligned again
+        rows, block_rows, index = alignment
+        index = index.rename("datetime")
+        data = data if rows is None else data.iloc[rows]
+        block = block if block_rows is None else block.iloc[block_rows]
+        return pd.concat([data.set_axis(index, axis=0, copy=False), block.set_axis(index, axis=0, copy=False)], axis=1, copy=False)
+
+    @staticmethod
+    def _same_source(source: pd.DataFrame | UpsampledView | None, other: pd.DataFrame | UpsampledView) -> bool:
+        """Return True if the OpenStudio results are the same, a 15 minute view is the same if it is of the same data"""
+        if isinstance(source, UpsampledView) and isinstance(other, UpsampledView):
+            return source.source is other.source and source.index.equals(other.index)
+        return source is other
+
     def agg_for_reopt(self):
         """Aggregate building-level results from the Modelica data.
 
@@ -658,7 +759,7 @@ class ModelicaResults(ResultsBase):
 
     def calculate_carbon_emissions(
         self,
-        hourly_emissions_data: HourlyEmissionsData,
+        hourly_emissions_data: HourlyEmissionsData | HistoricalEmissionsData,
         egrid_subregion: str = "RFCE",
         future_year: int = 2045,
     ):
@@ -667,26 +768,18 @@ class ModelicaResults(ResultsBase):
         for the correct year, but all the regions.
 
         Args:
-            hourly_emissions_data (HourlyEmissionsData): Data object with the emissions.
+            hourly_emissions_data (HourlyEmissionsData | HistoricalEmissionsData): Data object with the emissions.
             egrid_subregion (str): EPA's 4-letter identifier for the emissions subregion.
             future_year (int, optional): Year of the emission data, used to assign the correct column name, that is all. Defaults to 2045.
         """
-        # for some reason, the datafile has a `c` appended to the end of the subregion, probably for Cambium
-        lookup_egrid_subregion = egrid_subregion + "c"
-
         # multiply the hourly emissions hourly data by the min_60_with_buildings data, but first, verify that the lengths are the same.
-        if len(hourly_emissions_data.data) != len(self.min_60_with_buildings):
-            raise Exception(
-                f"Length of emissions data {len(hourly_emissions_data.data)} does not match the length of the min_60_with_buildings data {len(self.min_60_with_buildings)}."
-            )
-
-        # also verify the length of the other_fuels
-        if len(hourly_emissions_data.other_fuels) != len(self.min_60_with_buildings):
+        if len(hourly_emissions_data.index) != len(self.min_60_with_buildings):
             raise Exception(
-                f"Length of other fuel emission data {len(hourly_emissions_data.data)} does not match the length of the min_60_with_buildings data {len(self.min_60_with_buildings)}."
+                f"Length of emissions data {len(hourly_emissions_data.index)} does not match the length of the min_60_with_buildings data {len(self.min_60_with_buildings)}."
             )
 
-        # Calculate the natural gas emissions, emissions data is in kg/MWh so Wh->MWh, then divide by another 1000 to get mtCO2e
+        # Calculate the natural gas emissions, the other fuel emission factors are a scalar in kg/MWh so Wh->MWh, then
+        # divide by another 1000 to get mtCO2e
         self.min_60_with_buildings["Total Building Natural Gas Carbon Emissions"] = (
             self.min_60_with_buildings["Total Building Natural Gas"] * hourly_emissions_data.other_fuels["natural_gas"] / 1e6 / 1000
         )
@@ -694,16 +787,64 @@ class ModelicaResults(ResultsBase):
             "Total Building Natural Gas Carbon Emissions"
         ]
 
+        # Calculate the emissions of the other fuels of the buildings (e.g., propane and fuel oil), which are combined
+        # from the OpenStudio results, the same as the URBANopt results
+        other_fuel_emissions = self.other_fuel_emissions(self.min_60_with_buildings, hourly_emissions_data.other_fuels)
+        if other_fuel_emissions is not None:
+            self.min_60_with_buildings["Total Other Fuels Carbon Emissions"] = other_fuel_emissions
+        else:
+            other_fuel_emissions = 0
+
         # Calculate the electricity carbon emissions, emissions data is in kg/MWh, so Wh->Mwh, then divide by another 1000 to get mtCO2e
         self.min_60_with_buildings[f"Total Electricity Carbon Emissions {future_year}"] = (
-            self.min_60_with_buildings["Total Electricity"] * hourly_emissions_data.data[lookup_egrid_subregion] / 1e6 / 1000
+            self.min_60_with_buildings["Total Electricity"]
+            * hourly_emissions_data.factors_at(self.min_60_with_buildings.index, egrid_subregion)
+            / 1e6
+            / 1000
         )
         # Sum the total carbon emissions
         self.min_60_with_buildings[f"Total Carbon Emissions {future_year}"] = (
             self.min_60_with_buildings["Total Natural Gas Carbon Emissions"]
             + self.min_60_with_buildings[f"Total Electricity Carbon Emissions {future_year}"]
+            + other_fuel_emissions
         )
 
+    def calculate_building_carbon_emissions(
+        self,
+        hourly_emissions_data: HourlyEmissionsData | HistoricalEmissionsData,
+        building_ids: list[str],
+        egrid_subregion: str = "RFCE",
+        resolution: str = "60min",
+    ) -> pd.DataFrame:
+        """Calculate the carbon emissions of every building from the building's non-HVAC end uses (from OpenStudio)
+        and the building's ETS pumps and heat pump. See ResultsBase.carbon_emissions_by_building.
+
+        Args:
+            hourly_emissions_data (HourlyEmissionsData | HistoricalEmissionsData): Data object with the emissions.
+            building_ids (list[str]): IDs of the buildings
+            egrid_subregion (str, optional): EPA's 4-letter identifier for the emissions subregion. Defaults to "RFCE".
+            resolution (str, optional): Resolution of the data, "60min" or "15min". Defaults to "60min".
+
+        Returns:
+            pd.DataFrame: Electricity, Natural Gas, and Total Carbon Emissions Building {id} in mtCO2e
+        """
+        timeseries = self.min_15_with_buildings if resolution == "15min" else self.min_60_with_buildings
+        electricity_meters = [
+            "InteriorLights:Electricity",
+            "ExteriorLights:Electricity",
+            "InteriorEquipment:Electricity",
+            "ExteriorEquipment:Electricity",
+            "ETS Pump Electricity",
+            "ETS Pump CHW Electricity",
+            "ETS Pump HHW Electricity",
+            "ETS Heat Pump Electricity",
+        ]
+        self.building_carbon_emissions = self.carbon_emissions_by_building(
+            timeseries, hourly_emissions_data, building_ids, electricity_meters, ["InteriorEquipment:NaturalGas"], egrid_subregion
+        )
+
+        return self.building_carbon_emissions
+
     def calculate_grid_metrics(
         self,
         meters: list[str] = [
@@ -716,146 +857,13 @@ class ModelicaResults(ResultsBase):
         ],
     ):
         """Calculate the grid metrics for this building."""
-        # recreate the grid_metrics_daily data frame in case we are overwriting it.
-
-        self.min_15_with_buildings_to_process = self.min_15_with_buildings.copy()
-
         # skip n-days at the beginning of the grid metrics, due to
         # warm up times that have yet to be resolved.
         n_days = 2
         skip_time = n_days * 96
-        self.min_15_with_buildings_to_process = self.min_15_with_buildings_to_process.iloc[skip_time:]
-        # # END NEED TO FIX
+        self.min_15_with_buildings_to_process = self.min_15_with_buildings.iloc[skip_time:]
 
-        # # THIS IS HARD CODED -- NEED TO FIX!
-        # # Start with the latest in the year...
-
-        # # remove 2017-02-06 -- 2017-02-07 from the data, as it is a warm up period
-        # # convert 2/6 to hours
-        # skip_time = 96 * (31)
-        # # remove skip_time to skip_time + 96
-        # print(f"Removing {skip_time} to {skip_time + 96} from the data")
-        # # remove rows 96*31 to 96*38
-        # self.min_15_with_buildings_to_process = self.min_15_with_buildings_to_process.drop(
-        #     self.min_15_with_buildings_to_process.index[range(skip_time, skip_time + 168)]
-        # )
-
-        # END NEED TO FIX
-
-        self.grid_metrics_daily = None
-        for meter in meters:
-            df_tmp = self.min_15_with_buildings_to_process.copy()
-            df_tmp = df_tmp.groupby([pd.Grouper(freq="1d")])[meter].agg(["max", "idxmax", "min", "idxmin", "mean", "sum"])
-
-            # update the column names and save back into the results data frame
-            df_tmp.columns = [
-                f"{meter} Max",
-                f"{meter} Max Datetime",
-                f"{meter} Min",
-                f"{meter} Min Datetime",
-                f"{meter} Mean",
-                f"{meter} Sum",
-            ]
-
-            # calculate the peak to valley ratio
-            df_tmp[f"{meter} PVR"] = df_tmp[f"{meter} Max"] / df_tmp[f"{meter} Min"]
-
-            # calculate the load factor
-            df_tmp[f"{meter} Load Factor"] = df_tmp[f"{meter} Mean"] / df_tmp[f"{meter} Max"]
-
-            # add in the system ramping, which has to be calculated from the original data frame
-            df_tmp2 = self.min_15_with_buildings_to_process.copy()
-            df_tmp2[f"{meter} System Ramping"] = df_tmp2[meter].diff().abs().fillna(0)
-            df_tmp2 = df_tmp2.groupby([pd.Grouper(freq="1d")])[f"{meter} System Ramping"].agg(["sum"]) / 1e6
-            df_tmp2.columns = [f"{meter} System Ramping"]
-
-            df_tmp = pd.concat([df_tmp, df_tmp2], axis=1, join="inner")
-            if self.grid_metrics_daily is None:
-                self.grid_metrics_daily = df_tmp
-            else:
-                self.grid_metrics_daily = pd.concat([self.grid_metrics_daily, df_tmp], axis=1, join="inner")
-
-        # aggregate the df_daily daily data to annual metrics. For the maxes/mins, we only want the max of the max
-        # and the min of the min.
-        df_tmp = self.grid_metrics_daily.copy()
-        aggs = {}
-        for meter in meters:
-            aggs[f"{meter} Max"] = ["max", "idxmax", "sum"]
-            aggs[f"{meter} Min"] = ["min", "idxmin"]
-            aggs[f"{meter} PVR"] = ["max", "min", "sum", "mean"]
-            aggs[f"{meter} Load Factor"] = ["max", "min", "sum", "mean"]
-            aggs[f"{meter} System Ramping"] = ["max", "min", "sum", "mean"]
-
-        df_tmp = df_tmp.groupby([pd.Grouper(freq="YE")]).agg(aggs)
-        # rename the columns
-        df_tmp.columns = [f"{c[0]} {c[1]}" for c in df_tmp.columns]
-        # this is a strange section, the idxmax/idxmin are the indexes where the max/min values
-        # were found, but we want the timestamps from the original dataframe, so go get them!
-        for meter in meters:
-            # there is only one year of data, so grab the idmax/idmin of the first element. If
-            # we expand to multiple years, then this will need to be updated
-            # FIXME: this id_lookup produces Pandas FutureWarning
-            id_lookup = df_tmp[f"{meter} Max idxmax"][0]
-            df_tmp[f"{meter} Max idxmax"] = self.grid_metrics_daily.loc[id_lookup][f"{meter} Max Datetime"]
-            id_lookup = df_tmp[f"{meter} Min idxmin"][0]
-            df_tmp[f"{meter} Min idxmin"] = self.grid_metrics_daily.loc[id_lookup][f"{meter} Min Datetime"]
-            # rename these two columns to remove the idxmax/idxmin nomenclature
-            df_tmp = df_tmp.rename(
-                columns={
-                    f"{meter} Max idxmax": f"{meter} Max Datetime",
-                    f"{meter} Min idxmin": f"{meter} Min Datetime",
-                }
-            )
-
-        # Add the MWh related metrics, can't sum up the 15 minute data, so we have to sum up the hourly
-        df_tmp["Total Electricity"] = self.min_60_with_buildings["Total Electricity"].resample("YE").sum() / 1e6  # MWh
-        df_tmp["Total Natural Gas"] = self.min_60_with_buildings["Total Natural Gas"].resample("YE").sum() / 1e6  # MWh
-        df_tmp["Total Thermal Cooling Energy"] = (
-            self.min_60_with_buildings["Total Thermal Cooling Energy"].resample("YE").sum() / 1e6
-        )  # MWh
-        df_tmp["Total Thermal Heating Energy"] = (
-            self.min_60_with_buildings["Total Thermal Heating Energy"].resample("YE").sum() / 1e6
-        )  # MWh
-
-        # graph the top 5 peak values for each of the meters
-        meters = [
-            "Total Natural Gas",
-            "Total Electricity",
-            "Total Thermal Cooling Energy",
-            "Total Thermal Heating Energy",
-        ]
-        for meter in meters:
-            peaks = []
-            df_to_proc = self.min_15_with_buildings_to_process.copy()
-            if "Cooling" in meter:
-                # values are negative, so ascending is actually descending
-                df_to_proc = df_to_proc.sort_values(by=meter, ascending=True)
-            else:
-                df_to_proc = df_to_proc.sort_values(by=meter, ascending=False)
-            df_to_proc = df_to_proc.head(50)
-
-            # save the top 5 values to the df_tmp
-            i = 0
-            for dt, row in df_to_proc.iterrows():
-                peak_value = row[meter] / 1e6  # MWh
-                if peak_value not in peaks or peak_value == 0:
-                    peaks.append(peak_value)
-                    df_tmp[f"{meter} Peak {i + 1}"] = peak_value
-                    if peak_value != 0:
-                        df_tmp[f"{meter} Peak Date Time {i + 1}"] = dt
-                    else:
-                        df_tmp[f"{meter} Peak Date Time {i + 1}"] = "N/A"
-                    i += 1
-
-                if i == 5:
-                    break
-
-        # transpose and save
-        df_tmp = df_tmp.T
-        df_tmp.index.name = "Grid Metric"
-        self.grid_metrics_annual = df_tmp
-
-        return self.grid_metrics_annual
+        return self.calculate_annual_grid_metrics(self.min_15_with_buildings_to_process, self.min_60_with_buildings, meters)
 
     def save_dataframes(
         self,
@@ -905,3 +913,11 @@ class ModelicaResults(ResultsBase):
             self.grid_metrics_daily.to_csv(self.path / "grid_metrics_daily.csv")
         if self.grid_metrics_annual is not None and "grid_metrics_annual" in dfs_to_save:
             self.grid_metrics_annual.to_csv(self.path / "grid_metrics_annual.csv")
+
+
+def _regular_step(index: pd.Index) -> int | None:
+    """Return the time step (ns) of a datetime index with increasing timestamps on a regular step, otherwise None"""
+    if not isinstance(index, pd.DatetimeIndex) or len(index) < 2:
+        return None
+    steps = np.diff(index.asi8)
+    return int(steps[0]) if steps[0] > 0 and (steps == steps[0]).all() else None
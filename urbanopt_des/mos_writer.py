@@ -0,0 +1,45 @@
+# Writer for Modelica MOS (table) files that formats the NumPy data block directly
+# instead of building a list of rows in Python, which is needed for large districts.
+
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+
+def write_mos_file(
+    filename: Union[str, Path],
+    time: np.ndarray,
+    values: np.ndarray,
+    header_data: str,
+    data_definition: str = "double tab1",
+) -> None:
+    """Write a MOS file with an integer time column followed by float value columns. The
+    output is the same as ModelicaMOS.from_list(...).save_as(filename), but the data block
+    is written to a buffered file stream by the pandas C CSV writer.
+
+    Args:
+        filename (Union[str, Path]): Name of the MOS file to write
+        time (np.ndarray): Time of each row, typically seconds in the year, cast to integers
+        values (np.ndarray): 2D array (rows x columns) of the values
+        header_data (str): Header of the file, each line starting with a #
+        data_definition (str, optional): Type of the data without the dimension. Defaults to "double tab1".
+
+    Raises:
+        Exception: The time and values do not have the same number of rows
+    """
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values.reshape(-1, 1)
+    if len(time) != len(values):
+        raise Exception(f"Time has {len(time)} rows, but values have {len(values)} rows")
+
+    # one column per array so that the time stays an integer and the values are floats
+    block = pd.DataFrame({i + 1: values[:, i] for i in range(values.shape[1])})
+    block.insert(0, 0, np.asarray(time).astype(np.int64))
+
+    with Path(filename).open("w", buffering=1024 * 1024, newline="\n") as f:
+        f.write(header_data)
+        f.write(f"{data_definition}({len(block)},{block.shape[1]})\n")
+        block.to_csv(f, sep=";", header=False, index=False, lineterminator="\n")
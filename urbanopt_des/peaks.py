@@ -0,0 +1,92 @@
+# Top-K peak detection for the grid metrics. The candidates are found with a partial
+# selection (argpartition) of all the meters at once, so the data are never fully sorted.
+
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+
+def top_k_peaks(
+    df: pd.DataFrame,
+    meters: list[str],
+    k: int = 5,
+    signs: Union[list[int], None] = None,
+    min_separation: Union[pd.Timedelta, None] = None,
+    unique_values: bool = True,
+    n_candidates: int = 50,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Return the K largest peaks of each meter. The peaks are chosen greedily from the largest value
+    down, skipping values that are already a peak (if unique_values, zeros are never skipped) and values
+    within min_separation of a peak that has already been chosen. Missing values are never peaks.
+
+    Args:
+        df (pd.DataFrame): Time series data with a datetime index
+        meters (list[str]): Names of the meters (columns) to find the peaks
+        k (int, optional): Number of peaks per meter. Defaults to 5.
+        signs (list[int], optional): 1 if the peak is the largest value, -1 if the peak is the most negative
+            value (e.g., cooling). Defaults to None, which is 1 for all the meters.
+        min_separation (pd.Timedelta, optional): Minimum time between two peaks, e.g., pd.Timedelta(days=1).
+            Defaults to None, which allows peaks in consecutive intervals.
+        unique_values (bool, optional): Only allow each value to be a peak once. Defaults to True.
+        n_candidates (int, optional): Initial number of candidates per meter, which is doubled until K
+            peaks are found or all of the values are candidates. Defaults to 50.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Values (meters x K) and row positions (meters x K) of the peaks, in
+            order of the peak. If a meter has fewer than K peaks, then the values are NaN and the positions are -1.
+    """
+    if signs is None:
+        signs = [1] * len(meters)
+    signs = np.asarray(signs, dtype=float)
+
+    values = df[meters].to_numpy(dtype=float)
+    # flip the sign so that the peaks are always the largest values
+    signed = np.where(np.isnan(values), -np.inf, values * signs)
+    times = df.index.to_numpy().astype("datetime64[ns]").astype(np.int64)
+    separation = None if min_separation is None else pd.Timedelta(min_separation).value
+
+    n_rows = len(df)
+    peak_values = np.full((len(meters), k), np.nan)
+    peak_positions = np.full((len(meters), k), -1, dtype=np.int64)
+    remaining = np.arange(len(meters))
+    n_candidates = max(n_candidates, k)
+    while len(remaining) > 0:
+        n_candidates = min(n_candidates, n_rows)
+        # partial selection of the candidates of all of the remaining meters, then only the
+        # candidates are sorted, from largest to smallest with ties in time order
+        candidates = np.argpartition(-signed[:, remaining], n_candidates - 1, axis=0)[:n_candidates] if n_candidates < n_rows else None
+        if candidates is None:
+            candidates = np.broadcast_to(np.arange(n_rows)[:, None], (n_rows, len(remaining)))
+
+        unfinished = []
+        for column, meter_index in enumerate(remaining):
+            rows = np.sort(candidates[:, column])
+            rows = rows[np.argsort(-signed[rows, meter_index], kind="stable")]
+
+            found = 0
+            for row in rows:
+                if signed[row, meter_index] == -np.inf:
+                    break
+                value = values[row, meter_index]
+                chosen = peak_positions[meter_index, :found]
+                if unique_values and value != 0 and (peak_values[meter_index, :found] == value).any():
+                    continue
+                if separation is not None and (np.abs(times[chosen] - times[row]) < separation).any():
+                    continue
+                peak_values[meter_index, found] = value
+                peak_positions[meter_index, found] = row
+                found += 1
+                if found == k:
+                    break
+
+            if found < k and n_candidates < n_rows and signed[rows[-1], meter_index] != -np.inf:
+                # not enough peaks in the candidates, try again with more candidates
+                peak_values[meter_index] = np.nan
+                peak_positions[meter_index] = -1
+                unfinished.append(meter_index)
+
+        remaining = np.array(unfinished, dtype=np.int64)
+        n_candidates *= 2
+
+    return peak_values, peak_positions
@@ -0,0 +1,223 @@
+# Incremental executor of the post processing stages. The stages are a dependency graph and
+# each stage has a key from the hash of its inputs (values and file contents) and the keys of
+# the stages that it depends on. Running the pipeline again only runs the stages whose key
+# changed, and the stages that do not depend on each other run concurrently.
+
+import hashlib
+import json
+from collections.abc import Callable
+from concurrent.futures import FIRST_EXCEPTION, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Union
+
+
+def hash_inputs(value: Any, file_digests: Union[dict, None] = None) -> str:
+    """Return the sha256 hex digest of the inputs. Paths to files are hashed by the file contents, paths
+    to directories by the relative path, size, and modification time of all of the files in the directory.
+
+    Args:
+        value (Any): JSON serializable values, paths, or lists/dicts of them
+        file_digests (dict, optional): Digests of the files that were already hashed, keyed on the path, size,
+            and modification time of the file, so that unchanged files are not read again. Defaults to None.
+
+    Returns:
+        str: sha256 hex digest of the inputs
+    """
+    if file_digests is None:
+        file_digests = {}
+
+    def convert(item: Any) -> Any:
+        if isinstance(item, Path):
+            if item.is_dir():
+                return [
+                    [str(path.relative_to(item)), path.stat().st_size, path.stat().st_mtime_ns]
+                    for path in sorted(item.rglob("*"))
+                    if path.is_file()
+                ]
+            if item.is_file():
+                return _file_digest(item, file_digests)
+            return f"missing: {item}"
+        if isinstance(item, dict):
+            return {str(key): convert(value) for key, value in item.items()}
+        if isinstance(item, (list, tuple, set)):
+            return [convert(value) for value in item]
+        return item
+
+    return hashlib.sha256(json.dumps(convert(value), sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _file_digest(path: Path, file_digests: dict) -> str:
+    stat = path.stat()
+    stat_key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+    if stat_key not in file_digests:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        file_digests[stat_key] = digest.hexdigest()
+    return file_digests[stat_key]
+
+
+class PipelineStage:
+    def __init__(
+        self,
+        name: str,
+        function: Callable[[], Any],
+        depends_on: list[str],
+        inputs: Union[Callable[[], Any], None],
+        apply: Union[Callable[[Any], None], None],
+    ) -> None:
+        """Stage of the pipeline, see Pipeline.add_stage"""
+        self.name = name
+        self.function = function
+        self.depends_on = list(depends_on)
+        self.inputs = inputs
+        self.apply = apply
+
+
+class Pipeline:
+    def __init__(self, max_workers: Union[int, None] = None) -> None:
+        """Dependency graph of the stages with the keys of the last successful run of each stage. Add the stages
+        with add_stage, then call run. Calling run again only runs the stages whose inputs, or the inputs of
+        a stage that they depend on, changed.
+
+        Args:
+            max_workers (int, optional): Maximum number of stages to run at the same time. Defaults to None,
+                which is the ThreadPoolExecutor default.
+        """
+        self.max_workers = max_workers
+        self.stages: dict[str, PipelineStage] = {}
+        # key of the last successful run of each stage
+        self.keys: dict[str, str] = {}
+        self._file_digests: dict = {}
+
+    def add_stage(
+        self,
+        name: str,
+        function: Callable[[], Any],
+        depends_on: list[str] = [],
+        inputs: Union[Callable[[], Any], None] = None,
+        apply: Union[Callable[[Any], None], None] = None,
+    ) -> None:
+        """Add a stage to the pipeline, replacing the stage with the same name. The stages run in threads, so a
+        stage that creates a result for shared state (e.g., a dict of the results) returns it and the apply
+        function assigns it on the thread that runs the pipeline.
+
+        Args:
+            name (str): Unique name of the stage
+            function (Callable[[], Any]): Function that runs the stage
+            depends_on (list[str], optional): Names of the stages that must run before this stage. Defaults to [].
+            inputs (Callable[[], Any], optional): Function that returns the inputs of the stage (values and paths),
+                which is called at the start of each run. Defaults to None, which is no inputs.
+            apply (Callable[[Any], None], optional): Function that is called with the return value of the stage on
+                the thread that runs the pipeline, before the stages that depend on it start. Defaults to None.
+        """
+        self.stages[name] = PipelineStage(name, function, depends_on, inputs, apply)
+
+    def invalidate(self, name: str) -> None:
+        """Force the stage (and the stages that depend on it) to run on the next run.
+
+        Args:
+            name (str): Name of the stage
+        """
+        self.keys.pop(name, None)
+        for stage in self.stages.values():
+            if name in stage.depends_on:
+                self.invalidate(stage.name)
+
+    def order(self) -> list[str]:
+        """Return the names of the stages in an order where each stage is after the stages that it depends on.
+
+        Raises:
+            Exception: Unknown stage or circular dependency
+
+        Returns:
+            list[str]: Names of the stages
+        """
+        order, visiting, visited = [], set(), set()
+
+        def visit(name: str) -> None:
+            if name in visited:
+                return
+            if name not in self.stages:
+                raise Exception(f"Unknown pipeline stage: {name}")
+            if name in visiting:
+                raise Exception(f"Circular dependency in the pipeline at stage {name}")
+            visiting.add(name)
+            for dependency in self.stages[name].depends_on:
+                visit(dependency)
+            visiting.remove(name)
+            visited.add(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def stale_stages(self) -> dict[str, str]:
+        """Return the stages that need to run with their new keys.
+
+        Returns:
+            dict[str, str]: New key of each stage that needs to run, in the order of the stages
+        """
+        keys, stale = {}, {}
+        for name in self.order():
+            stage = self.stages[name]
+            inputs = stage.inputs() if stage.inputs is not None else None
+            keys[name] = hash_inputs(
+                {"inputs": inputs, "depends_on": {dependency: keys[dependency] for dependency in stage.depends_on}},
+                self._file_digests,
+            )
+            if self.keys.get(name) != keys[name]:
+                stale[name] = keys[name]
+        return stale
+
+    def run(self) -> list[str]:
+        """Run the stages whose inputs changed since the last successful run. The stages that do not depend
+        on each other run concurrently. If a stage fails, the running stages are finished, no new stages
+        are started, and the exception is raised.
+
+        Returns:
+            list[str]: Names of the stages that ran, in the order that they finished
+        """
+        stale = self.stale_stages()
+        pending = dict(stale)
+        ran: list[str] = []
+        running: dict[Future, str] = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                # start every stage that does not wait on a stage that still needs to run
+                for name in list(pending):
+                    if all(dependency not in pending and dependency not in running.values() for dependency in self.stages[name].depends_on):
+                        print(f"Running pipeline stage {name}")
+                        running[executor.submit(self.stages[name].function)] = name
+                        del pending[name]
+
+                done, _ = wait(running, return_when=FIRST_EXCEPTION)
+                errors = []
+                for future in done:
+                    name = running.pop(future)
+                    if future.exception() is not None:
+                        errors.append((name, future.exception()))
+                        continue
+                    self._finish(name, future.result(), stale[name], ran)
+
+                if errors:
+                    # finish the stages that are running, but do not start any new stages
+                    for future in list(running):
+                        name = running.pop(future)
+                        if future.exception() is None:
+                            self._finish(name, future.result(), stale[name], ran)
+                    name, error = errors[0]
+                    raise Exception(f"Pipeline stage {name} failed: {error}") from error
+
+        return ran
+
+    def _finish(self, name: str, result: Any, key: str, ran: list[str]) -> None:
+        """Apply the result of a stage that ran and save its key"""
+        stage = self.stages[name]
+        if stage.apply is not None:
+            stage.apply(result)
+        self.keys[name] = key
+        ran.append(name)
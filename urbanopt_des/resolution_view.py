@@ -0,0 +1,170 @@
+# Lazy view of time series data at a higher resolution. The hourly energy data are presented
+# at a 15 minute resolution by mapping each 15 minute row to the hourly row that it falls in
+# (the same as resample("15min").ffill()), without copying the hourly data.
+
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+
+class UpsampledView:
+    # methods of the materialized data frame that change it in place, which would be lost
+    MUTATING_METHODS = ["insert", "pop", "update"]
+    # indexers of the materialized data frame, which are read only
+    INDEXERS = ["loc", "at", "iat"]
+
+    def __init__(
+        self,
+        source: pd.DataFrame,
+        freq: str = "15min",
+        positions: Union[np.ndarray, None] = None,
+        index: Union[pd.DatetimeIndex, None] = None,
+    ) -> None:
+        """Present the source data at a higher resolution (e.g., hourly data at 15 minutes) by index
+        mapping. Only the columns that are selected are materialized, for example:
+
+            data_15min = UpsampledView(data, "15min")
+            data_15min[["Total Electricity", "Total Natural Gas"]]  # DataFrame of only these columns
+            data_15min.iloc[192:]  # view without the first two days
+
+        The selected columns are taken from the source when they are selected, so changes to the source
+        data (e.g., new aggregation columns or scaling) are reflected in the view. The values are the same
+        as source.resample(freq).ffill().
+
+        The other DataFrame attributes and methods (e.g., loc, sum, resample, and plot) are those of the
+        materialized data frame, see __getattr__, so the view can be used where a DataFrame is expected. The
+        materialized data frame is cached by the view until the columns of the source change, so use a new
+        view (e.g., data_15min creates one on each access) after the values of the source are changed.
+
+        The view is read only, changes are made to the source data. Assigning to the view (e.g.,
+        view.loc[...] = value or view["column"] = value) or calling a method that changes the data frame in
+        place (e.g., insert or inplace=True) raises an exception, use to_frame() for a data frame to change.
+
+        Args:
+            source (pd.DataFrame): Data with a datetime index
+            freq (str, optional): Resolution of the view. Defaults to "15min".
+            positions (np.ndarray, optional): Row of the source for each row of the view. Defaults to None, which
+                is calculated from the freq.
+            index (pd.DatetimeIndex, optional): Index of the view, required if positions are passed. Defaults to None.
+        """
+        self.source = source
+        self.freq = freq
+        if positions is None:
+            # the last source row at or before each timestamp of the view, which is a forward fill
+            order = np.argsort(source.index.to_numpy(), kind="stable")
+            sorted_index = source.index[order]
+            index = pd.date_range(sorted_index[0], sorted_index[-1], freq=freq, name=source.index.name)
+            positions = order[np.searchsorted(sorted_index, index, side="right") - 1]
+        self.positions = positions
+        self.index = index
+        self._frame = None
+
+    @property
+    def columns(self) -> pd.Index:
+        return self.source.columns
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return (len(self.index), len(self.columns))
+
+    @property
+    def empty(self) -> bool:
+        return len(self.index) == 0 or len(self.columns) == 0
+
+    def __getattr__(self, name: str):
+        # only called for the attributes that the view does not have, which are taken from the materialized
+        # data frame (all of the rows and columns), e.g., view.loc["2017-07-01"] or view.resample("D").sum()
+        if name.startswith("_") or name in ["source", "freq", "positions", "index"]:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        if name in self.MUTATING_METHODS:
+            raise Exception(f"The UpsampledView is read only, use to_frame().{name}() or change the source data")
+
+        if self._frame is None or not self._frame.columns.equals(self.source.columns):
+            self._frame = self.to_frame()
+        attribute = getattr(self._frame, name)
+        if name in self.INDEXERS:
+            return _ReadOnlyIndexer(attribute, name)
+        if callable(attribute):
+            return _read_only_method(attribute, name)
+        return attribute
+
+    def __setitem__(self, key, value) -> None:
+        raise Exception("The UpsampledView is read only, assign the column to the source data or to to_frame()")
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, column: str) -> bool:
+        return column in self.source.columns
+
+    def __getitem__(self, key: Union[str, list[str]]) -> Union[pd.Series, pd.DataFrame]:
+        """Materialize the column (as a Series) or the list of columns (as a DataFrame)"""
+        if isinstance(key, str):
+            return pd.Series(self.source[key].to_numpy()[self.positions], index=self.index, name=key)
+        return self.to_frame(list(key))
+
+    @property
+    def iloc(self) -> "_UpsampledViewRows":
+        """Select rows by position, which returns a new view"""
+        return _UpsampledViewRows(self)
+
+    def to_frame(self, columns: Union[list[str], None] = None) -> pd.DataFrame:
+        """Materialize the view as a DataFrame.
+
+        Args:
+            columns (list[str], optional): Columns to materialize. Defaults to None, which is all of the columns.
+
+        Returns:
+            pd.DataFrame: Materialized data
+        """
+        columns = list(self.columns) if columns is None else columns
+        # take each block of the same dtype so that the dtypes are kept
+        return self.source[columns].take(self.positions).set_axis(self.index, axis=0)
+
+    def to_csv(self, path: Path, chunk_rows: int = 100000, **kwargs) -> None:
+        """Save the view to a CSV file, materializing the rows in chunks.
+
+        Args:
+            path (Path): Path of the CSV file
+            chunk_rows (int, optional): Number of rows to materialize at a time. Defaults to 100000.
+        """
+        with open(path, "w", newline="") as f:
+            for start in range(0, max(len(self), 1), chunk_rows):
+                self.iloc[start : start + chunk_rows].to_frame().to_csv(f, header=start == 0, **kwargs)
+
+
+def _read_only_method(method, name: str):
+    def call(*args, **kwargs):
+        if kwargs.get("inplace"):
+            raise Exception(f"The UpsampledView is read only, use to_frame().{name}(inplace=True) or change the source data")
+        return method(*args, **kwargs)
+
+    return call
+
+
+class _ReadOnlyIndexer:
+    def __init__(self, indexer, name: str) -> None:
+        self.indexer = indexer
+        self.name = name
+
+    def __getitem__(self, key):
+        return self.indexer[key]
+
+    def __setitem__(self, key, value) -> None:
+        raise Exception(f"The UpsampledView is read only, assign to to_frame().{self.name}[...] or to the source data")
+
+
+class _UpsampledViewRows:
+    def __init__(self, view: UpsampledView) -> None:
+        self.view = view
+
+    def __getitem__(self, rows: Union[slice, int]) -> Union[UpsampledView, pd.Series]:
+        if isinstance(rows, slice):
+            return UpsampledView(self.view.source, self.view.freq, self.view.positions[rows], self.view.index[rows])
+        # a single row as a Series, the same as DataFrame.iloc[row]
+        return self.view.source.iloc[self.view.positions[rows]].rename(self.view.index[rows])
+
+    def __setitem__(self, rows, value) -> None:
+        raise Exception("The UpsampledView is read only, assign to to_frame().iloc[...] or to the source data")
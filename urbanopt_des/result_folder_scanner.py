@@ -0,0 +1,237 @@
+# Scanner of the simulation folders of an analysis that finds the valid Modelica results. The
+# folders are checked concurrently, only the end of the Dymola log is read for the termination
+# status, and the result of each folder can be kept in an index file (e.g., in the _results_summary
+# folder of the analysis) so that the folders that did not change are not checked again on the next scan.
+
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Union
+
+
+class ResultFolderScanner:
+    # bump this if the layout of the index changes
+    INDEX_VERSION = 1
+
+    # number of bytes at the end of the dslog.txt file that are checked for errors
+    DSLOG_TAIL_BYTES = 64 * 1024
+
+    def __init__(self, root_analysis_path: Path, index_path: Union[Path, None] = None, max_workers: Union[int, None] = None) -> None:
+        """Find the simulation folders (with a package.mo) in the root_analysis_path that have valid
+        Dymola or OpenModelica results.
+
+        Args:
+            root_analysis_path (Path): Analysis folder with one folder per simulation
+            index_path (Path, optional): File to save the result of each folder, which is created on the first
+                scan. Defaults to None, which checks all of the folders on every scan and does not write any files.
+            max_workers (int, optional): Maximum number of folders to check at the same time. Defaults to None,
+                which is the ThreadPoolExecutor default.
+        """
+        self.root_analysis_path = root_analysis_path
+        self.index_path = index_path
+        self.max_workers = max_workers
+        # names of the folders that were checked (not found in the index) on the last scan
+        self.checked: list[str] = []
+
+    def _load_index(self) -> dict:
+        if self.index_path is None or not self.index_path.exists():
+            return {}
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"WARNING: could not read the result folder index {self.index_path}: {e}")
+            return {}
+        if index.get("version") != self.INDEX_VERSION:
+            return {}
+        return index["folders"]
+
+    def _save_index(self, folders: dict) -> None:
+        if self.index_path is None:
+            return
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        # write to a temporary file and move it in place, so that a partial index is never read
+        fd, temp_path = tempfile.mkstemp(dir=self.index_path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"version": self.INDEX_VERSION, "folders": folders}, f)
+            os.replace(temp_path, self.index_path)
+        except OSError as e:
+            Path(temp_path).unlink(missing_ok=True)
+            print(f"WARNING: could not save the result folder index {self.index_path}: {e}")
+
+    def scan(self, use_index: bool = True) -> tuple[dict, dict]:
+        """Check all of the simulation folders and return the valid results and the bad or empty results.
+
+        Args:
+            use_index (bool, optional): Skip the folders that did not change since the last scan, if there is an
+                index_path. Defaults to True.
+
+        Returns:
+            tuple[dict, dict]: Valid results keyed on the analysis name, and the bad or empty results keyed on the folder
+        """
+        index = self._load_index() if use_index else {}
+        with os.scandir(self.root_analysis_path) as entries:
+            folder_names = sorted(entry.name for entry in entries if entry.is_dir())
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            entries = list(executor.map(lambda name: self._scan_folder(name, index.get(name)), folder_names))
+
+        self.checked = []
+        folders, results, bad_or_empty_results = {}, {}, {}
+        for folder_name, (entry, checked) in zip(folder_names, entries):
+            if entry is None:
+                # not a simulation folder
+                continue
+            folders[folder_name] = entry
+            if checked:
+                self.checked.append(folder_name)
+
+            sim_path = self.root_analysis_path / folder_name
+            if entry["error"] is not None:
+                bad_or_empty_results[sim_path] = {"path_to_analysis": sim_path, "name": folder_name, "error": entry["error"]}
+                continue
+            # If we are here then there is likely a successful simulation. Now store it in a
+            # dictionary for later loading/processing
+            results[entry["analysis_name"]] = {
+                "path_to_analysis": sim_path,
+                "name": entry["analysis_name"],
+                "mat_path": sim_path / entry["mat_path"] if entry["mat_path"] is not None else None,
+            }
+
+        self._save_index(folders)
+        return results, bad_or_empty_results
+
+    def _scan_folder(self, folder_name: str, indexed: Union[dict, None]) -> tuple[Union[dict, None], bool]:
+        """Return the result of the folder (None if it is not a simulation folder) and if the folder was checked"""
+        sim_path = self.root_analysis_path / folder_name
+        files, directories = self._list_folder(sim_path)
+        if "package.mo" not in files:
+            return None, False
+
+        # search for any folder in the sim_folder with a prepended _results to the name
+        om_results_folders = sorted(name for name in directories if name.endswith("_results"))
+        om_results_files = {name: self._list_folder(sim_path / name)[0] for name in om_results_folders}
+        # the signature changes if any of the files in the folder (or the _results folders) change
+        signature = [[name, *files[name]] for name in sorted(files)]
+        signature += [
+            [f"{folder}/{name}", *om_results_files[folder][name]]
+            for folder in om_results_folders
+            for name in sorted(om_results_files[folder])
+        ]
+
+        if indexed is not None and indexed["signature"] == signature:
+            return indexed, False
+
+        # now go and check the dslog.txt file (assuming dymola was used) to find if there were errors
+        if "dslog.txt" in files:
+            error, mat_path = self._check_dymola_results(sim_path, files)
+        elif om_results_folders:
+            error, mat_path = self._check_openmodelica_results(sim_path, om_results_folders, om_results_files)
+        else:
+            # if here, then we don't know how to process the folder
+            error, mat_path = "No valid results found", None
+
+        analysis_name = None
+        if error is None:
+            # Get the simulation name from the analysis_name.txt file
+            if "analysis_name.txt" in files:
+                with open(sim_path / "analysis_name.txt") as f:
+                    analysis_name = f.read().strip()
+            else:
+                mat_folder = (sim_path / mat_path).parent if mat_path is not None else sim_path
+                print(f"Warning: could not load analysis_name.txt file for {mat_folder}. Setting to directory name.")
+                analysis_name = mat_folder.name
+
+        return {"signature": signature, "error": error, "mat_path": mat_path, "analysis_name": analysis_name}, True
+
+    @staticmethod
+    def _list_folder(path: Path) -> tuple[dict[str, list[int]], list[str]]:
+        """Return the size and modification time of the files in the folder, and the names of the directories"""
+        files, directories = {}, []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    directories.append(entry.name)
+                elif entry.is_file():
+                    stat = entry.stat()
+                    files[entry.name] = [stat.st_size, stat.st_mtime_ns]
+        return files, directories
+
+    @classmethod
+    def read_tail(cls, path: Path, tail_bytes: Union[int, None] = None) -> list[str]:
+        """Return the lines at the end of the file, without reading the rest of the file.
+
+        Args:
+            path (Path): Path of the file
+            tail_bytes (int, optional): Number of bytes to read. Defaults to None, which is DSLOG_TAIL_BYTES.
+
+        Returns:
+            list[str]: Complete lines in the tail of the file
+        """
+        tail_bytes = cls.DSLOG_TAIL_BYTES if tail_bytes is None else tail_bytes
+        with open(path, "rb") as f:
+            size = f.seek(0, os.SEEK_END)
+            f.seek(max(0, size - tail_bytes))
+            lines = f.read().decode(errors="replace").splitlines()
+        # the first line is partial if the tail does not start at the beginning of the file
+        return lines[1:] if size > tail_bytes else lines
+
+    @classmethod
+    def _check_dymola_results(cls, sim_path: Path, files: dict[str, list[int]]) -> tuple[Union[str, None], Union[str, None]]:
+        """Check if the simulation has valid dymola results.
+
+        Args:
+            sim_path (Path): Path to the simulation folder
+            files (dict[str, list[int]]): Size and modification time of the files in the simulation folder
+
+        Returns:
+            tuple[str, str]: Error (None if valid) and the .mat file relative to the simulation folder
+        """
+        for line in cls.read_tail(sim_path / "dslog.txt"):
+            if "Error" in line:
+                return "Error in dslog.txt", None
+            if 'Integration terminated before reaching "StopTime"' in line:
+                return "Error did not reach the stop time", None
+
+        # Find the first .mat file in the simulation folder
+        mat_files = sorted(name for name in files if name.endswith(".mat"))
+        if not mat_files:
+            return "No result .mat file in root directory", None
+        if len(mat_files) > 1:
+            print(f"Warning: multiple .mat files found in {sim_path}. Using the first one.")
+        return None, mat_files[0]
+
+    @staticmethod
+    def _check_openmodelica_results(
+        sim_path: Path, om_results_folders: list[str], om_results_files: dict[str, dict[str, list[int]]]
+    ) -> tuple[Union[str, None], Union[str, None]]:
+        """Check if the OpenModelica simulation results are valid.
+
+        Args:
+            sim_path (Path): Path to the simulation folder
+            om_results_folders (list[str]): Names of the *_results folders
+            om_results_files (dict[str, dict[str, list[int]]]): Size and modification time of the files in each *_results folder
+
+        Returns:
+            tuple[str, str]: Error (None if valid) and the .mat file relative to the simulation folder
+        """
+        if len(om_results_folders) > 1:
+            print(f"Warning: multiple _results folders found in {sim_path}. Please delete others.")
+            return None, None
+
+        # see if there is a .mat file in the results folder
+        results_folder = om_results_folders[0]
+        mat_files = sorted(name for name in om_results_files[results_folder] if name.endswith(".mat"))
+        if not mat_files:
+            # no .mat file, then this is an empty folder
+            return "No result .mat file in _results directory", None
+        if len(mat_files) > 1:
+            print(f"Warning: multiple .mat files found in {sim_path / results_folder}. Using the first one.")
+            return None, f"{results_folder}/{mat_files[0]}"
+        # check if the .mat file is empty, from the size of the listing without opening the file
+        if om_results_files[results_folder][mat_files[0]][0] == 0:
+            return "Empty .mat file in _results directory", None
+        return None, f"{results_folder}/{mat_files[0]}"
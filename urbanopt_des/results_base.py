@@ -1,12 +1,98 @@
+import warnings
+from collections.abc import Iterable
+
 import numpy as np
 import pandas as pd
 
+from .aggregations import AggregationGraph
+from .emissions import HistoricalEmissionsData, HourlyEmissionsData
+from .frame_store import FrameStore
+from .grid_metrics import GridMetricsAccumulator, daily_grid_metric_partials, daily_grid_metrics_from_partials
+from .load_duration import QuantileSketch, interval_hours, load_duration_curves_from_sorted, sort_meters
+
 
 class ResultsBase:
+    # attributes that are not saved in a snapshot, the frames in the frame store are saved as attributes
+    SNAPSHOT_EXCLUDE = ["frame_store"]
+
+    # other fuel meters of the buildings (without the building) and the fuel of their emission factor. The other
+    # fuels are not served by the district system, so they are in both the URBANopt and the Modelica results
+    OTHER_FUEL_METERS = {"Propane:Facility": "propane", "FuelOilNo2:Facility": "fuel_oil_no_2"}
+
     def __init__(self) -> None:
         """Base class for processing results. This is used for the Modelica and OpenStudio results to create
         common methods/datasets that can be used for easy comparison."""
 
+    @classmethod
+    def other_fuel_columns(cls, columns: Iterable[str]) -> list[str]:
+        """Return the other fuel columns of the buildings (e.g., "Propane:Facility Building 1")"""
+        return [column for column in columns if column.split(" Building ")[0] in cls.OTHER_FUEL_METERS]
+
+    @classmethod
+    def other_fuel_emissions(cls, df: pd.DataFrame, other_fuels: dict[str, float]) -> np.ndarray | None:
+        """Return the carbon emissions of the other fuels of all of the buildings (e.g., propane and fuel oil) as
+        one product of the fuel columns and the scalar factor of each column.
+
+        Args:
+            df (pd.DataFrame): Hourly data with the other fuel columns of the buildings, in Wh
+            other_fuels (dict[str, float]): Emission factor of each fuel in kg/MWh
+
+        Returns:
+            np.ndarray | None: Other fuel carbon emissions of each row in mtCO2e, None if there are no other fuel columns
+        """
+        columns = cls.other_fuel_columns(df.columns)
+        if not columns:
+            return None
+        factors = np.array([other_fuels[cls.OTHER_FUEL_METERS[column.split(" Building ")[0]]] for column in columns])
+        # the factors are in kg/MWh, so Wh->MWh, then divide by another 1000 to get mtCO2e
+        return df[columns].to_numpy(dtype=float) @ factors / 1e6 / 1000
+
+    def use_frame_store(self, frame_store: FrameStore | None) -> None:
+        """Keep the data frames that are assigned to the attributes in the frame store, which spills the least
+        recently used frames to disk when they are over the memory budget of the store. The attributes are used
+        as before, a spilled frame is reloaded when its attribute is used.
+
+        Args:
+            frame_store (FrameStore | None): Store of the frames. Pass None to move the frames back to the attributes.
+        """
+        frames = {name: value for name, value in vars(self).items() if isinstance(value, pd.DataFrame)}
+        current = self.__dict__.get("frame_store")
+        if current is not None:
+            for name in current.names(self):
+                frames[name] = current.get(self, name)
+                current.discard(self, name)
+
+        object.__setattr__(self, "frame_store", frame_store)
+        for name, frame in frames.items():
+            self.__dict__.pop(name, None)
+            setattr(self, name, frame)
+
+    def __setattr__(self, name: str, value) -> None:
+        frame_store = self.__dict__.get("frame_store")
+        # properties (e.g., data_15min) set the attribute that they wrap
+        if frame_store is None or isinstance(getattr(type(self), name, None), property):
+            object.__setattr__(self, name, value)
+        elif isinstance(value, pd.DataFrame):
+            self.__dict__.pop(name, None)
+            frame_store.put(self, name, value)
+        else:
+            frame_store.discard(self, name)
+            object.__setattr__(self, name, value)
+
+    def __getattr__(self, name: str):
+        # only called for the attributes that are not found, which includes the frames in the frame store
+        frame_store = self.__dict__.get("frame_store")
+        # checked and reloaded under the lock of the store, another thread may spill or remove the frame
+        frame = None if frame_store is None else frame_store.get_if_present(self, name)
+        if frame is not None:
+            return frame
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def __delattr__(self, name: str) -> None:
+        frame_store = self.__dict__.get("frame_store")
+        if frame_store is None or not frame_store.discard(self, name):
+            object.__delattr__(self, name)
+
     @property
     def end_use_summary_dict(self) -> dict:
         """Return a dictionary with the end use summary data structure."""
@@ -177,3 +263,256 @@ class ResultsBase:
                 self.end_use_summary.loc[column["display_name"], self.display_name] = 0.0
 
         return self.end_use_summary
+
+    def calculate_daily_grid_metrics(self, df: pd.DataFrame, meters: list[str]) -> pd.DataFrame:
+        """Calculate the daily grid metrics (max, min, the datetimes of the max/min, mean, sum,
+        peak to valley ratio, load factor, and system ramping) of all the meters in one pass. The
+        source data frame is not copied. Days without data are included (the bins are calendar days)
+        and missing values are skipped, which is consistent with grouping by pd.Grouper(freq="1d").
+
+        Args:
+            df (pd.DataFrame): Time series data with a sorted datetime index, typically 15 minute data
+            meters (list[str]): Names of the meters (columns) to calculate the metrics
+
+        Returns:
+            pd.DataFrame: Daily grid metrics with the columns "{meter} Max", "{meter} Max Datetime", "{meter} Min",
+                "{meter} Min Datetime", "{meter} Mean", "{meter} Sum", "{meter} PVR", "{meter} Load Factor",
+                and "{meter} System Ramping" for each meter.
+        """
+        day_index, partials = daily_grid_metric_partials(df, meters)
+        return daily_grid_metrics_from_partials(day_index, partials, meters)
+
+    def calculate_annual_grid_metrics(self, df_15min: pd.DataFrame, df_60min: pd.DataFrame, meters: list[str]) -> pd.DataFrame:
+        """Calculate the daily and annual grid metrics. The daily metrics are saved to grid_metrics_daily
+        and the annual metrics (transposed, one row per metric and one column per year) to grid_metrics_annual.
+
+        Args:
+            df_15min (pd.DataFrame): 15 minute time series data, without any warm up days
+            df_60min (pd.DataFrame): Hourly time series data used for the annual MWh totals
+            meters (list[str]): Names of the meters to calculate the metrics
+
+        Returns:
+            pd.DataFrame: Annual grid metrics
+        """
+        return self.calculate_grid_metrics_from_chunks([df_15min], [df_60min], meters)
+
+    def calculate_grid_metrics_from_chunks(
+        self, chunks_15min: Iterable[pd.DataFrame], chunks_60min: Iterable[pd.DataFrame], meters: list[str]
+    ) -> pd.DataFrame:
+        """Calculate the daily and annual grid metrics from chunks of the time series (e.g., one year or
+        month at a time of a multi-year simulation), so that the full time series is never in memory.
+        The chunks must be in order. See calculate_annual_grid_metrics for the results.
+
+        Args:
+            chunks_15min (Iterable[pd.DataFrame]): Chunks of the 15 minute time series data, without any warm up days
+            chunks_60min (Iterable[pd.DataFrame]): Chunks of the hourly time series data used for the annual MWh totals
+            meters (list[str]): Names of the meters to calculate the metrics
+
+        Returns:
+            pd.DataFrame: Annual grid metrics
+        """
+        energy_meters = ["Total Electricity", "Total Natural Gas", "Total Thermal Cooling Energy", "Total Thermal Heating Energy"]
+        # graph the top 5 peak values for each of the meters, cooling values are negative
+        # so the peaks are the most negative values
+        peak_meters = [
+            "Total Natural Gas",
+            "Total Electricity",
+            "Total Thermal Cooling Energy",
+            "Total Thermal Heating Energy",
+        ]
+        accumulator = GridMetricsAccumulator(
+            meters,
+            peak_meters=peak_meters,
+            peak_signs=[-1 if "Cooling" in meter else 1 for meter in peak_meters],
+            energy_meters=energy_meters,
+            k=5,
+        )
+        for chunk in chunks_15min:
+            accumulator.update(chunk)
+        for chunk in chunks_60min:
+            accumulator.update_energy(chunk)
+
+        self.grid_metrics_daily = accumulator.daily_metrics()
+
+        # aggregate the df_daily daily data to annual metrics. For the maxes/mins, we only want the max of the max
+        # and the min of the min.
+        aggs = {}
+        for meter in meters:
+            aggs[f"{meter} Max"] = ["max", "idxmax", "sum"]
+            aggs[f"{meter} Min"] = ["min", "idxmin"]
+            aggs[f"{meter} PVR"] = ["max", "min", "sum", "mean"]
+            aggs[f"{meter} Load Factor"] = ["max", "min", "sum", "mean"]
+            aggs[f"{meter} System Ramping"] = ["max", "min", "sum", "mean"]
+
+        df_tmp = self.grid_metrics_daily.groupby([pd.Grouper(freq="YE")]).agg(aggs)
+        # rename the columns
+        df_tmp.columns = [f"{c[0]} {c[1]}" for c in df_tmp.columns]
+        # this is a strange section, the idxmax/idxmin are the days where the max/min values
+        # were found, but we want the timestamps from the original dataframe, so go get them for each year!
+        for meter in meters:
+            for column, datetime_column in [
+                (f"{meter} Max idxmax", f"{meter} Max Datetime"),
+                (f"{meter} Min idxmin", f"{meter} Min Datetime"),
+            ]:
+                df_tmp[column] = self.grid_metrics_daily[datetime_column].reindex(df_tmp[column]).to_numpy()
+            # rename these two columns to remove the idxmax/idxmin nomenclature
+            df_tmp = df_tmp.rename(
+                columns={
+                    f"{meter} Max idxmax": f"{meter} Max Datetime",
+                    f"{meter} Min idxmin": f"{meter} Min Datetime",
+                }
+            )
+
+        # Add the MWh related metrics, can't sum up the 15 minute data, so we have to sum up the hourly
+        energy = accumulator.energy()
+        for meter in energy_meters:
+            df_tmp[meter] = energy[meter] / 1e6  # MWh
+
+        peaks = accumulator.peaks()
+        for meter in peak_meters:
+            n_peaks = max((len(peaks.get(year, {}).get(meter, [])) for year in df_tmp.index.year), default=0)
+            for i in range(n_peaks):
+                peak_values, peak_datetimes = [], []
+                for year in df_tmp.index.year:
+                    year_peaks = peaks.get(year, {}).get(meter, [])
+                    if i < len(year_peaks):
+                        peak_value = year_peaks[i][0] / 1e6  # MWh
+                        peak_values.append(peak_value)
+                        peak_datetimes.append(year_peaks[i][1] if peak_value != 0 else "N/A")
+                    else:
+                        peak_values.append(np.nan)
+                        peak_datetimes.append(pd.NaT)
+                df_tmp[f"{meter} Peak {i + 1}"] = peak_values
+                df_tmp[f"{meter} Peak Date Time {i + 1}"] = peak_datetimes
+
+        # transpose and save
+        df_tmp = df_tmp.T
+        df_tmp.index.name = "Grid Metric"
+        self.grid_metrics_annual = df_tmp
+
+        return self.grid_metrics_annual
+
+    def calculate_bulk_grid_metrics(self, df: pd.DataFrame, columns: dict[str, str]) -> pd.DataFrame:
+        """Calculate the grid metrics of many columns (e.g., the electricity of every building) as
+        one 2-D array operation. The daily metrics are calculated with the same kernel as the
+        grid_metrics_daily and then reduced over all of the days.
+
+        Args:
+            df (pd.DataFrame): Time series data with a sorted datetime index, typically 15 minute data
+            columns (dict[str, str]): Label of each row of the result (e.g., building id) and the name of the column
+
+        Returns:
+            pd.DataFrame: One row per label and one column per metric (Peak, Peak Datetime, Min, Min Datetime,
+                PVR Max/Min/Mean, Load Factor Max/Min/Mean, System Ramping Max/Sum, and Sum)
+        """
+        labels = list(columns.keys())
+        day_index, partials = daily_grid_metric_partials(df, list(columns.values()))
+
+        # the day of the peak and valley, days without data are never chosen
+        has_data = partials["count"] > 0
+        peak_day = np.where(has_data, partials["max"], -np.inf).argmax(axis=0)
+        valley_day = np.where(has_data, partials["min"], np.inf).argmin(axis=0)
+        positions = np.arange(len(labels))
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pvr = np.where(has_data, partials["max"] / partials["min"], np.nan)
+            load_factor = np.where(has_data, (partials["sum"] / partials["count"]) / partials["max"], np.nan)
+        ramping = partials["ramping"] / 1e6
+
+        with warnings.catch_warnings():
+            # labels without any data have all NaN metrics
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            metrics = {
+                "Peak": partials["max"][peak_day, positions],
+                "Peak Datetime": partials["max_time"][peak_day, positions].astype("datetime64[ns]"),
+                "Min": partials["min"][valley_day, positions],
+                "Min Datetime": partials["min_time"][valley_day, positions].astype("datetime64[ns]"),
+                "PVR Max": np.nanmax(pvr, axis=0),
+                "PVR Min": np.nanmin(pvr, axis=0),
+                "PVR Mean": np.nanmean(pvr, axis=0),
+                "Load Factor Max": np.nanmax(load_factor, axis=0),
+                "Load Factor Min": np.nanmin(load_factor, axis=0),
+                "Load Factor Mean": np.nanmean(load_factor, axis=0),
+                "System Ramping Max": ramping.max(axis=0),
+                "System Ramping Sum": ramping.sum(axis=0),
+                "Sum": partials["sum"].sum(axis=0),
+            }
+
+        return pd.DataFrame(metrics, index=pd.Index(labels, name="Building"))
+
+    def calculate_load_duration(
+        self, df: pd.DataFrame, meters: list[str], n_quantiles: int = 1001, signs: list[int] | None = None
+    ) -> pd.DataFrame:
+        """Create the load duration curves and the quantile sketch of the meters from one batched sort.
+        The curves are saved to load_duration_curves and the sketch to load_duration_sketch, which answers
+        percentiles (e.g., P99 demand) and hours above a threshold without sorting again.
+
+        Args:
+            df (pd.DataFrame): Time series data with a datetime index at a fixed interval, typically 15 minute data
+            meters (list[str]): Names of the meters (columns)
+            n_quantiles (int, optional): Number of quantiles in the sketch. Defaults to 1001.
+            signs (list[int], optional): Sign of the load of each meter, see sort_meters. Defaults to None, which is
+                -1 for the cooling meters (the load is negative) and 1 for the other meters, the same as the peaks.
+
+        Returns:
+            pd.DataFrame: Load duration curves with one column per meter indexed by the hours
+        """
+        if signs is None:
+            signs = [-1 if "Cooling" in meter else 1 for meter in meters]
+        values, counts, interval_hours = sort_meters(df, meters, signs)
+        self.load_duration_curves = load_duration_curves_from_sorted(values, counts, interval_hours, meters, signs)
+        self.load_duration_sketch = QuantileSketch.from_sorted(values, counts, interval_hours, meters, n_quantiles, signs)
+
+        return self.load_duration_curves
+
+    def carbon_emissions_by_building(
+        self,
+        df: pd.DataFrame,
+        hourly_emissions_data: HourlyEmissionsData | HistoricalEmissionsData,
+        building_ids: list[str],
+        electricity_meters: list[str],
+        natural_gas_meters: list[str],
+        egrid_subregion: str = "RFCE",
+    ) -> pd.DataFrame:
+        """Calculate the carbon emissions of each building at the resolution of the data (e.g., 15 minutes or
+        hourly). The hourly emission factors are mapped onto the index of the data, so each row uses the factor
+        of the hour that it falls in. The emissions of all of the buildings are calculated as one broadcast of the
+        building energy block (time x building) against the factors. The meters are hourly rates (Wh per hour,
+        or the mean power in W), so the energy of each row is the rate times the hours of the row, and the
+        emissions of the 15 minute rows add up to the emissions of the hourly rows.
+
+        Args:
+            df (pd.DataFrame): Time series data with a datetime index at a fixed interval and columns named
+                "{meter} Building {building_id}"
+            hourly_emissions_data (HourlyEmissionsData | HistoricalEmissionsData): Data object with the emissions.
+            building_ids (list[str]): IDs of the buildings
+            electricity_meters (list[str]): Electricity meters of each building, which are summed (in Wh)
+            natural_gas_meters (list[str]): Natural gas meters of each building, which are summed (in Wh)
+            egrid_subregion (str, optional): EPA's 4-letter identifier for the emissions subregion. Defaults to "RFCE".
+
+        Returns:
+            pd.DataFrame: Electricity, Natural Gas, and Total Carbon Emissions Building {building_id} in mtCO2e
+        """
+        blocks = []
+        for meters in [electricity_meters, natural_gas_meters]:
+            totals = {
+                building_id: [f"{meter} Building {building_id}" for meter in meters if f"{meter} Building {building_id}" in df.columns]
+                for building_id in building_ids
+            }
+            columns = list(dict.fromkeys(column for sources in totals.values() for column in sources))
+            blocks.append(AggregationGraph(totals).compute(df[columns]).to_numpy())
+        # energy of each row, in Wh
+        electricity, natural_gas = (block * interval_hours(df.index) for block in blocks)
+
+        # emissions data are in kg/MWh, so Wh->MWh, then divide by another 1000 to get mtCO2e
+        electricity_factors = hourly_emissions_data.factors_at(df.index, egrid_subregion)
+        electricity_emissions = electricity * electricity_factors[:, None] / 1e6 / 1000
+        natural_gas_emissions = natural_gas * hourly_emissions_data.other_fuels["natural_gas"] / 1e6 / 1000
+
+        emissions = np.concatenate([electricity_emissions, natural_gas_emissions, electricity_emissions + natural_gas_emissions], axis=1)
+        columns = [
+            f"{name} Carbon Emissions Building {building_id}"
+            for name in ["Electricity", "Natural Gas", "Total"]
+            for building_id in building_ids
+        ]
+        return pd.DataFrame(emissions, index=df.index, columns=columns)
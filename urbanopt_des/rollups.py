@@ -0,0 +1,135 @@
+# Rollup engine that is shared by the URBANopt and Modelica results to sum the hourly data into
+# monthly and annual (and optionally daily and time-of-use) totals. The group label of each row
+# is calculated once per calendar (index), each frame is reduced once by the labels, and the
+# small result of the reduction is then summed into each of the rollups.
+
+import numpy as np
+import pandas as pd
+
+
+class RollupCalendar:
+    def __init__(self, index: pd.DatetimeIndex, daily: bool = False, tou_periods: dict[str, list[int]] | None = None) -> None:
+        """Group labels of the rows of the index. The rows are labeled by day and time-of-use period if
+        tou_periods are passed, by day if daily, otherwise by month, which is the finest group that
+        is needed for the rollups. The bins are the same as resample, from the first to the last
+        timestamp of the index, including the bins without data.
+
+        Args:
+            index (pd.DatetimeIndex): Index of the data to roll up
+            daily (bool, optional): Create the daily rollup. Defaults to False.
+            tou_periods (dict[str, list[int]], optional): Name of each time-of-use period and the hours of the day
+                (0 to 23) in the period. The hours that are not in a period are in the 'Other' period. Defaults to None.
+        """
+        self.index = index
+        self.daily = daily
+        self.tou_periods = tou_periods
+
+        days = index.normalize()
+        first_day, last_day = days.min(), days.max()
+        self.days = pd.date_range(first_day, last_day, freq="D", name=index.name)
+        self.months = pd.date_range(first_day + pd.offsets.MonthEnd(0), last_day + pd.offsets.MonthEnd(0), freq="ME", name=index.name)
+        self.years = pd.date_range(first_day + pd.offsets.YearEnd(0), last_day + pd.offsets.YearEnd(0), freq="YE", name=index.name)
+        self.periods = [*tou_periods, "Other"] if tou_periods is not None else []
+
+        # year of each month, from the first year
+        self.month_years = (first_day.month - 1 + np.arange(len(self.months))) // 12
+
+        # label of each row and the day, month, and period of each label
+        if tou_periods is None and not daily:
+            self.labels = np.asarray((index.year - first_day.year) * 12 + index.month - first_day.month)
+            self.group_months = np.arange(len(self.months))
+            self.group_days = None
+            self.group_periods = None
+        else:
+            self.labels = np.asarray((days - first_day).days)
+            self.group_days = np.arange(len(self.days))
+            self.group_months = np.asarray((self.days.year - first_day.year) * 12 + self.days.month - first_day.month)
+            self.group_periods = None
+
+        if tou_periods is not None:
+            # period of each hour of the day
+            hour_periods = np.full(24, len(tou_periods))
+            for position, hours in enumerate(tou_periods.values()):
+                hour_periods[list(hours)] = position
+            self.labels = self.labels * len(self.periods) + hour_periods[index.hour]
+            self.group_days = np.repeat(self.group_days, len(self.periods))
+            self.group_months = np.repeat(self.group_months, len(self.periods))
+            self.group_periods = np.tile(np.arange(len(self.periods)), len(self.days))
+
+        self.n_groups = len(self.group_months)
+
+    def reduce(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Sum the rows of the frame by the group labels, in one grouped reduction.
+
+        Args:
+            frame (pd.DataFrame): Data with the index of the calendar
+
+        Returns:
+            pd.DataFrame: Sum of each group, including the groups without data (sum of 0)
+        """
+        return frame.groupby(self.labels).sum().reindex(range(self.n_groups), fill_value=0)
+
+    def rollup(self, frame: pd.DataFrame) -> dict[str, pd.DataFrame]:
+        """Return the monthly and annual sums of the frame, and the daily and time-of-use sums if configured. The
+        sums are the same as frame.resample("ME").sum(), frame.resample("YE").sum(), and frame.resample("D").sum().
+
+        Args:
+            frame (pd.DataFrame): Data with the index of the calendar
+
+        Returns:
+            dict[str, pd.DataFrame]: Sums keyed on 'monthly', 'annual', and if configured, 'daily' and 'tou'. The
+                'tou' sums are by month and time-of-use period.
+        """
+        groups = self.reduce(frame)
+
+        rollups = {}
+        if self.group_days is not None:
+            monthly = groups.groupby(self.group_months).sum()
+        else:
+            monthly = groups
+        rollups["monthly"] = monthly.set_axis(self.months, axis=0)
+        rollups["annual"] = monthly.groupby(self.month_years).sum().set_axis(self.years, axis=0)
+
+        if self.daily:
+            daily = groups.groupby(self.group_days).sum() if self.group_periods is not None else groups
+            rollups["daily"] = daily.set_axis(self.days, axis=0)
+
+        if self.group_periods is not None:
+            tou = groups.groupby([self.group_months, self.group_periods]).sum()
+            rollups["tou"] = tou.set_axis(
+                pd.MultiIndex.from_product([self.months, self.periods], names=[self.index.name, "Period"]), axis=0
+            )
+
+        return rollups
+
+
+class RollupEngine:
+    def __init__(self, daily: bool = False, tou_periods: dict[str, list[int]] | None = None) -> None:
+        """Roll up the data frames of many analyses. The calendar (group labels) of an index is calculated
+        once and reused by all of the frames with the same index, e.g., the hourly data of each Modelica analysis.
+
+            engine = RollupEngine(tou_periods={"On-Peak": range(12, 18)})
+            rollups = engine.rollup(df_60min)
+            rollups["monthly"], rollups["annual"], rollups["tou"]
+
+        Args:
+            daily (bool, optional): Create the daily rollups. Defaults to False.
+            tou_periods (dict[str, list[int]], optional): Name of each time-of-use period and the hours of the day
+                in the period, see RollupCalendar. Defaults to None.
+        """
+        self.daily = daily
+        self.tou_periods = tou_periods
+        self.calendars: list[RollupCalendar] = []
+
+    def calendar(self, index: pd.DatetimeIndex) -> RollupCalendar:
+        """Return the calendar of the index, which is reused for equal indexes"""
+        for calendar in self.calendars:
+            if calendar.index is index or calendar.index.equals(index):
+                return calendar
+        calendar = RollupCalendar(index, self.daily, self.tou_periods)
+        self.calendars.append(calendar)
+        return calendar
+
+    def rollup(self, frame: pd.DataFrame) -> dict[str, pd.DataFrame]:
+        """Return the rollups of the frame, see RollupCalendar.rollup"""
+        return self.calendar(frame.index).rollup(frame)
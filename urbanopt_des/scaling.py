@@ -0,0 +1,58 @@
+# Helpers to convert billing period scalars (start, end, factor) into per-timestamp
+# scaling factors that can be applied to the time series results in one operation.
+
+import numpy as np
+import pandas as pd
+
+
+def interval_scaling_factors(
+    index: pd.DatetimeIndex,
+    start_times: pd.Series,
+    end_times: pd.Series,
+    group_ids: np.ndarray,
+    factors: np.ndarray,
+    n_groups: int,
+) -> np.ndarray:
+    """Join a set of time intervals to a datetime index and return the scaling factor of each
+    timestamp for each group (e.g., building). The intervals are inclusive of both the start
+    and end time. Timestamps that are not covered by an interval have a factor of 1. If the
+    intervals of a group overlap, then every interval is applied to the timestamps that they
+    share, i.e., the factor is the product of the factors of the overlapping intervals, the same
+    as scaling the data by each interval in turn.
+
+    Args:
+        index (pd.DatetimeIndex): Sorted index of the data that will be scaled
+        start_times (pd.Series): Start time of each interval
+        end_times (pd.Series): End time of each interval
+        group_ids (np.ndarray): Integer group (column of the result) of each interval, 0 to n_groups - 1
+        factors (np.ndarray): Scaling factor of each interval, NaN values are skipped
+        n_groups (int): Number of groups
+
+    Returns:
+        np.ndarray: Array of shape (len(index), n_groups) with the scaling factors
+    """
+    result = np.ones((len(index), n_groups))
+
+    factors = np.asarray(factors, dtype=float)
+    group_ids = np.asarray(group_ids, dtype=np.int64)
+    valid = ~np.isnan(factors)
+    if not valid.any():
+        return result
+
+    # convert the interval times into row positions of the index, hi is exclusive
+    lo = index.searchsorted(pd.DatetimeIndex(start_times)[valid], side="left")
+    hi = index.searchsorted(pd.DatetimeIndex(end_times)[valid], side="right")
+    group_ids = group_ids[valid]
+    factors = factors[valid]
+
+    lengths = np.clip(hi - lo, 0, None)
+    if lengths.sum() == 0:
+        return result
+
+    # expand each interval into its row positions and multiply in the factors, unbuffered so that
+    # the factors of overlapping intervals are all applied to the rows that they share
+    offsets = np.repeat(lo - np.cumsum(lengths) + lengths, lengths)
+    rows = np.arange(lengths.sum()) + offsets
+    np.multiply.at(result, (rows, np.repeat(group_ids, lengths)), np.repeat(factors, lengths))
+
+    return result
@@ -0,0 +1,410 @@
+# Snapshot of a processed analysis. The state of the objects (e.g., URBANoptAnalysis, URBANoptResults,
+# and each ModelicaResults) is walked and every data frame is split into one .npy file per dtype
+# (column x row, so each column is contiguous) that can be memory mapped on load. The numeric and
+# datetime indexes are .npy files as well. The rest of the state (paths, settings, and small values) is
+# JSON, and the JSON manifest has the layout of each frame (including the column labels) and lists the
+# files. Nothing is unpickled on load, and only the classes of this package are created.
+
+import datetime
+import importlib
+import json
+import shutil
+import weakref
+from pathlib import Path
+from typing import Any, Union
+
+import numpy as np
+import pandas as pd
+
+from .resolution_view import UpsampledView
+
+SNAPSHOT_VERSION = 2
+
+# kinds of the numpy dtypes that are saved in .npy files (bool, int, unsigned, float, complex, timedelta, datetime)
+NUMPY_KINDS = "biufcmM"
+
+
+class SnapshotWriter:
+    def __init__(self, path: Path) -> None:
+        """Write the state of objects to a snapshot directory, see write_snapshot.
+
+        Args:
+            path (Path): Directory of the snapshot, which must exist
+        """
+        self.path = path
+        # name of each frame and array that was written, keyed on the id of the object so
+        # that objects that are referenced more than once (e.g., by a view) are only written once.
+        # The objects are weakly referenced, so that frames that are reloaded from a frame store
+        # can be freed, and a reused id is detected when the reference is dead.
+        self.written: dict[int, tuple[str, weakref.ref]] = {}
+        self.frames: dict[str, dict] = {}
+        self.indexes: dict[str, dict] = {}
+        self.files: list[str] = []
+
+    def layout(self) -> dict:
+        """Return the layout of the frames and indexes that were written, see SnapshotReader"""
+        return {"frames": self.frames, "indexes": self.indexes}
+
+    def encode(self, value: Any) -> Any:
+        """Return the value as JSON, with the frames, series, indexes, arrays, and package objects replaced by
+        references to the files of the snapshot. Values of other types are saved as None, with a warning."""
+        # numpy scalars are checked first, since np.float64 is also a float
+        if isinstance(value, np.generic) and value.dtype.kind in "biuf":
+            return {"__scalar__": value.item(), "dtype": value.dtype.str}
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        if isinstance(value, pd.DataFrame):
+            return {"__frame__": self.write_frame(value)}
+        if isinstance(value, pd.Series):
+            return {"__series__": self.write_frame(value.to_frame()), "name": self.encode(value.name)}
+        if isinstance(value, UpsampledView):
+            return {
+                "__view__": self.write_frame(value.source),
+                "freq": value.freq,
+                "positions": self.encode(value.positions),
+                "index": self.encode(value.index),
+            }
+        if isinstance(value, pd.Index):
+            return {"__index__": self.write_index(value)}
+        if isinstance(value, np.ndarray) and value.dtype.kind in NUMPY_KINDS:
+            return {"__array__": self.write_array(value)}
+        if isinstance(value, datetime.datetime) or value is pd.NaT:
+            return {"__timestamp__": pd.Timestamp(value).isoformat()}
+        if isinstance(value, datetime.timedelta):
+            return {"__timedelta__": pd.Timedelta(value).value}
+        if isinstance(value, Path):
+            return {"__path__": str(value)}
+        if isinstance(value, dict):
+            return {"__dict__": [[self.encode(key), self.encode(item)] for key, item in value.items()]}
+        if isinstance(value, (list, tuple)):
+            return {"__list__": [self.encode(item) for item in value], "tuple": isinstance(value, tuple)}
+        if type(value).__module__.startswith(f"{__package__}.") and hasattr(value, "__dict__"):
+            return self.encode_object(value)
+        print(f"WARNING: a {type(value).__name__} cannot be saved in a snapshot, it is loaded as None")
+        return None
+
+    def encode_object(self, obj: Any) -> dict:
+        """Encode the attributes of an object of this package, skipping the attributes in the SNAPSHOT_EXCLUDE of its class"""
+        exclude = getattr(type(obj), "SNAPSHOT_EXCLUDE", [])
+        names = list(vars(obj))
+        # the frames in a frame store are not in the attributes, see ResultsBase.use_frame_store
+        frame_store = vars(obj).get("frame_store")
+        if frame_store is not None:
+            names += frame_store.names(obj)
+        return {
+            "__object__": [type(obj).__module__, type(obj).__qualname__],
+            "state": {name: self.encode(getattr(obj, name)) for name in names if name not in exclude},
+            "excluded": [name for name in names if name in exclude],
+        }
+
+    def _written_name(self, value: Any) -> Union[str, None]:
+        """Return the name of the object if it was already written"""
+        written = self.written.get(id(value))
+        if written is not None and written[1]() is value:
+            return written[0]
+        return None
+
+    def write_array(self, values: np.ndarray) -> str:
+        name = self._written_name(values)
+        if name is None:
+            name = f"array_{len(self.files)}.npy"
+            np.save(self.path / name, np.ascontiguousarray(values), allow_pickle=False)
+            self.written[id(values)] = (name, weakref.ref(values))
+            self.files.append(name)
+        return name
+
+    def write_index(self, index: pd.Index) -> str:
+        """Write the index, the numeric and datetime values are a .npy file and the other labels (e.g.,
+        the names of the columns) are kept in the layout of the index.
+
+        Args:
+            index (pd.Index): Index to write
+
+        Returns:
+            str: Name of the index in the snapshot
+        """
+        name = self._written_name(index)
+        if name is None:
+            name = f"index_{len(self.indexes)}"
+            self.written[id(index)] = (name, weakref.ref(index))
+            self.indexes[name] = self._index_layout(index)
+        return name
+
+    def _index_layout(self, index: pd.Index) -> dict:
+        if isinstance(index, pd.MultiIndex):
+            return {
+                "levels": [self._index_layout(index.get_level_values(level)) for level in range(index.nlevels)],
+                "names": [self.encode(name) for name in index.names],
+            }
+        layout = {"name": self.encode(index.name)}
+        if isinstance(index, pd.RangeIndex):
+            layout["range"] = [index.start, index.stop, index.step]
+            return layout
+        if isinstance(index, pd.DatetimeIndex):
+            layout["freq"] = index.freqstr
+            if index.tz is not None:
+                # the values are saved in UTC
+                layout["tz"] = str(index.tz)
+                index = index.tz_convert("UTC").tz_localize(None)
+        if isinstance(index.dtype, np.dtype) and index.dtype.kind in NUMPY_KINDS:
+            layout["file"] = self.write_array(index.to_numpy())
+        else:
+            layout["dtype"] = str(index.dtype)
+            layout["labels"] = [self.encode(label) for label in index]
+        return layout
+
+    def write_frame(self, frame: pd.DataFrame) -> str:
+        """Write the frame as one .npy file per numpy dtype. Columns with other dtypes (e.g., strings
+        and categories) are kept as JSON in the layout of the frame.
+
+        Args:
+            frame (pd.DataFrame): Data frame to write
+
+        Returns:
+            str: Name of the frame in the snapshot
+        """
+        name = self._written_name(frame)
+        if name is not None:
+            return name
+
+        name = f"frame_{len(self.frames)}"
+        self.written[id(frame)] = (name, weakref.ref(frame))
+
+        # positions of the columns of each dtype, positions are used since the column names may not be unique
+        groups, objects = {}, []
+        for position, dtype in enumerate(frame.dtypes):
+            if isinstance(dtype, np.dtype) and dtype.kind in NUMPY_KINDS:
+                groups.setdefault(dtype, []).append(position)
+            else:
+                values = [self.encode(value) for value in frame.iloc[:, position].array]
+                objects.append({"position": position, "dtype": str(dtype), "values": values})
+
+        blocks = []
+        for dtype, positions in groups.items():
+            filename = f"{name}_{len(blocks)}.npy"
+            values = frame.iloc[:, positions].to_numpy(dtype=dtype)
+            np.save(self.path / filename, np.ascontiguousarray(values.T), allow_pickle=False)
+            blocks.append({"file": filename, "positions": positions})
+            self.files.append(filename)
+
+        self.frames[name] = {
+            "shape": list(frame.shape),
+            "index": self.write_index(frame.index),
+            "columns": self.write_index(frame.columns),
+            "blocks": blocks,
+            "objects": objects,
+        }
+        return name
+
+
+class SnapshotReader:
+    def __init__(self, path: Path, layout: dict, mmap_mode: Union[str, None] = "c") -> None:
+        """Read the state that was written by SnapshotWriter, see read_snapshot.
+
+        Args:
+            path (Path): Directory of the snapshot
+            layout (dict): Layout of the frames and indexes, see SnapshotWriter.layout
+            mmap_mode (str, optional): Memory map mode of the .npy files, see numpy.load. Defaults to "c",
+                which is copy-on-write, so the frames can be modified without changing the snapshot.
+        """
+        self.path = path
+        self.frames = layout["frames"]
+        self.indexes = layout["indexes"]
+        self.mmap_mode = mmap_mode
+        self.loaded: dict[str, Any] = {}
+
+    def decode(self, value: Any) -> Any:
+        """Return the value with the references to the files of the snapshot replaced by the data"""
+        if not isinstance(value, dict):
+            return value
+        if "__frame__" in value:
+            return self.read_frame(value["__frame__"])
+        if "__series__" in value:
+            return self.read_frame(value["__series__"]).iloc[:, 0].rename(self.decode(value["name"]))
+        if "__view__" in value:
+            return UpsampledView(
+                self.read_frame(value["__view__"]), value["freq"], self.decode(value["positions"]), self.decode(value["index"])
+            )
+        if "__index__" in value:
+            return self.read_index(value["__index__"])
+        if "__array__" in value:
+            return self.read_array(value["__array__"])
+        if "__scalar__" in value:
+            return np.dtype(value["dtype"]).type(value["__scalar__"])
+        if "__timestamp__" in value:
+            return pd.Timestamp(value["__timestamp__"])
+        if "__timedelta__" in value:
+            return pd.Timedelta(value["__timedelta__"])
+        if "__path__" in value:
+            return Path(value["__path__"])
+        if "__dict__" in value:
+            return {self.decode(key): self.decode(item) for key, item in value["__dict__"]}
+        if "__list__" in value:
+            items = [self.decode(item) for item in value["__list__"]]
+            return tuple(items) if value["tuple"] else items
+        if "__object__" in value:
+            return self.decode_object(value)
+        return value
+
+    def decode_object(self, value: dict) -> Any:
+        """Create the object without calling __init__, the excluded attributes are set to None"""
+        module_name, class_name = value["__object__"]
+        # only the classes of this package are created
+        if not module_name.startswith(f"{__package__}."):
+            raise Exception(f"Snapshot object {module_name}.{class_name} is not a class of {__package__}")
+        cls = getattr(importlib.import_module(module_name), class_name, None)
+        if not isinstance(cls, type) or not cls.__module__.startswith(f"{__package__}."):
+            raise Exception(f"Snapshot object {module_name}.{class_name} is not a class of {__package__}")
+        obj = cls.__new__(cls)
+        for name in value["excluded"]:
+            setattr(obj, name, None)
+        for name, item in value["state"].items():
+            setattr(obj, name, self.decode(item))
+        return obj
+
+    def read_array(self, filename: str) -> np.ndarray:
+        if filename not in self.loaded:
+            self.loaded[filename] = self._load(filename)
+        return self.loaded[filename]
+
+    def _load(self, filename: str) -> np.ndarray:
+        try:
+            return np.load(self.path / filename, mmap_mode=self.mmap_mode, allow_pickle=False)
+        except ValueError:
+            # empty arrays cannot be memory mapped
+            return np.load(self.path / filename, allow_pickle=False)
+
+    def read_index(self, name: str) -> pd.Index:
+        """Create the index, which is shared by the frames that were written with the same index"""
+        if name not in self.loaded:
+            self.loaded[name] = self._index(self.indexes[name])
+        return self.loaded[name]
+
+    def _index(self, layout: dict) -> pd.Index:
+        if "levels" in layout:
+            return pd.MultiIndex.from_arrays(
+                [self._index(level) for level in layout["levels"]], names=[self.decode(name) for name in layout["names"]]
+            )
+        name = self.decode(layout["name"])
+        if "range" in layout:
+            return pd.RangeIndex(*layout["range"], name=name)
+        if "labels" in layout:
+            labels = [self.decode(label) for label in layout["labels"]]
+            return pd.Index(labels, dtype=layout["dtype"], name=name, tupleize_cols=False)
+        # the index is read into memory
+        values = np.load(self.path / layout["file"], allow_pickle=False)
+        if "freq" in layout:
+            index = pd.DatetimeIndex(values)
+            if "tz" in layout:
+                index = index.tz_localize("UTC").tz_convert(layout["tz"])
+            return pd.DatetimeIndex(index, freq=layout["freq"], name=name)
+        return pd.Index(values, name=name)
+
+    def read_frame(self, name: str) -> pd.DataFrame:
+        """Create the frame from the memory mapped .npy files. A frame with only one dtype is a view
+        of its file, which is not read until the values are used.
+
+        Args:
+            name (str): Name of the frame in the snapshot
+
+        Returns:
+            pd.DataFrame: Data frame
+        """
+        if name in self.loaded:
+            return self.loaded[name]
+
+        layout = self.frames[name]
+        index, columns = self.read_index(layout["index"]), self.read_index(layout["columns"])
+        parts, positions = [], []
+        for block in layout["blocks"]:
+            # the file is column x row, so the transpose is the layout of the frame's block and is not copied
+            values = self._load(block["file"])
+            parts.append(pd.DataFrame(values.T, index=index, columns=columns[block["positions"]], copy=False))
+            positions += block["positions"]
+        for column in layout["objects"]:
+            values = pd.array([self.decode(value) for value in column["values"]], dtype=column["dtype"])
+            parts.append(pd.DataFrame({0: values}, index=index).set_axis(columns[[column["position"]]], axis=1))
+            positions.append(column["position"])
+
+        if not parts:
+            frame = pd.DataFrame(index=index, columns=columns)
+        elif len(parts) == 1:
+            frame = parts[0]
+        else:
+            frame = pd.concat(parts, axis=1)
+        if positions != sorted(positions):
+            frame = frame.iloc[:, np.argsort(positions)]
+
+        self.loaded[name] = frame
+        return frame
+
+
+def write_snapshot(path: Path, state: dict[str, Any], metadata: Union[dict, None] = None) -> dict:
+    """Save the state to the snapshot directory. The snapshot is written to a temporary directory
+    that replaces the existing snapshot once it is complete.
+
+    Args:
+        path (Path): Directory of the snapshot
+        state (dict[str, Any]): Objects to save (e.g., {"analysis": uo_analysis})
+        metadata (dict, optional): JSON serializable values to add to the manifest. Defaults to None.
+
+    Returns:
+        dict: Manifest of the snapshot
+    """
+    temp_path = path.with_name(f"{path.name}.tmp")
+    if temp_path.exists():
+        shutil.rmtree(temp_path)
+    temp_path.mkdir(parents=True)
+
+    writer = SnapshotWriter(temp_path)
+    encoded = {key: writer.encode(value) for key, value in state.items()}
+    with open(temp_path / "state.json", "w") as f:
+        json.dump(encoded, f)
+
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "created": datetime.datetime.now().isoformat(),
+        "metadata": metadata or {},
+        **writer.layout(),
+        "files": ["state.json", *writer.files],
+    }
+    with open(temp_path / "manifest.json", "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    if path.exists():
+        shutil.rmtree(path)
+    temp_path.rename(path)
+    return manifest
+
+
+def read_snapshot(path: Path, mmap_mode: Union[str, None] = "c") -> tuple[dict[str, Any], dict]:
+    """Load the state that was saved with write_snapshot.
+
+    Args:
+        path (Path): Directory of the snapshot
+        mmap_mode (str, optional): Memory map mode of the data files, see numpy.load. Defaults to "c" (copy-on-write).
+            Pass None to read all of the data into memory.
+
+    Raises:
+        Exception: Snapshot does not exist, is incomplete, is from another version, or has an object that is not
+            of a class of this package
+
+    Returns:
+        tuple[dict[str, Any], dict]: Objects that were saved and the manifest of the snapshot
+    """
+    manifest_path = path / "manifest.json"
+    if not manifest_path.exists():
+        raise Exception(f"Snapshot does not exist: {path}")
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get("version") != SNAPSHOT_VERSION:
+        raise Exception(f"Snapshot {path} is version {manifest.get('version')}, expected {SNAPSHOT_VERSION}")
+    missing = [filename for filename in manifest["files"] if not (path / filename).exists()]
+    if missing:
+        raise Exception(f"Snapshot {path} is missing files: {missing}")
+
+    with open(path / "state.json") as f:
+        encoded = json.load(f)
+
+    reader = SnapshotReader(path, manifest, mmap_mode)
+    return {key: reader.decode(value) for key, value in encoded.items()}, manifest
@@ -1,20 +1,59 @@
 # helpers to build an analysis
-import copy
-import datetime
 import json
 import math
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
+from .aggregations import AggregationGraph
+from .emission_factor_store import get_emission_factor_store
 from .emissions import HourlyEmissionsData
+from .emissions_cube import CarbonEmissionsCube
+from .frame_store import FrameStore
+from .grid_metrics import peak_diversity
 from .modelica_results import ModelicaResults
-from .urbanopt_geojson import DESGeoJSON
+from .pipeline import Pipeline
+from .result_folder_scanner import ResultFolderScanner
+from .results_base import ResultsBase
+from .rollups import RollupEngine
+from .snapshot import read_snapshot, write_snapshot
+from .urbanopt_geojson import DESGeoJSON, flatten_meter_readings
 from .urbanopt_results import URBANoptResults
 
 
 class URBANoptAnalysis:
-    def __init__(self, geojson_file: Path, analysis_dir: Path, year_of_data: int = 2017, **kwargs) -> None:
+    # attributes that are not saved in a snapshot, the GeoJSON file is loaded again and the pipeline is rebuilt
+    SNAPSHOT_EXCLUDE = ["geojson", "pipeline", "frame_store"]
+
+    # SEED meter types that the peak load and month are calculated for, and the name of the peak property
+    SEED_PEAK_METERS = {"Electric - Grid": "electricity", "Natural Gas": "natural_gas"}
+
+    # system type of the buildings with floor area up to 75,000, up to 125,000, and above 125,000 ft2,
+    # without and with natural gas
+    SYSTEM_TYPE_FLOOR_AREAS = [75000, 125000]
+    SYSTEM_TYPES = [
+        ["PSZ-HP", "PVAV with PFP boxes", "VAV chiller with PFP boxes"],
+        ["PSZ-AC with gas coil", "PVAV with gas heat with electric reheat", "VAV chiller with gas boiler reheat"],
+    ]
+
+    # construction template of the buildings built before each year, the buildings built after the last
+    # year use the worst case template
+    TEMPLATE_YEARS = [1980, 2004, 2007, 2010, 2013, 2016, 2019]
+    TEMPLATES = [
+        "DOE Ref Pre-1980",
+        "DOE Ref 1980-2004",
+        "90.1-2004",
+        "90.1-2007",
+        "90.1-2010",
+        "90.1-2013",
+        "90.1-2016",
+        "DOE Ref Pre-1980",
+    ]
+
+    def __init__(
+        self, geojson_file: Path, analysis_dir: Path, year_of_data: int = 2017, memory_budget: int | None = None, **kwargs
+    ) -> None:
         """Class to hold contents from a comprehensive UO analysis. The analysis can
         include contents from both URBANopt (OpenStudio/EnergyPlus) and URBANopt
         DES (Modelica).
@@ -28,11 +67,14 @@ class URBANoptAnalysis:
             geojson_file (Path): Path to the GeoJSON feature file
             analysis_dir (Path): Path to the analysis directory where the combined results will be stored.
             year_of_data (int, optional): year to use for the data. Defaults to 2017.
+            memory_budget (int, optional): Maximum size in bytes of the data frames of the URBANopt and Modelica results
+                to keep in memory, see set_memory_budget. Defaults to None, which keeps all of the data frames in memory.
 
         Raises:
             Exception: File does not exist
         """
         self.geojson_file = geojson_file
+        self.geojson_kwargs = kwargs
         if geojson_file.exists():
             self.geojson = DESGeoJSON(geojson_file, **kwargs)
         else:
@@ -59,12 +101,64 @@ class URBANoptAnalysis:
         # dataframe to summarize the grid metrics summary
         self.grid_summary = None
         self.end_use_summary = None
+        # dataframe of the coincident and non-coincident peaks of each analysis
+        self.diversity_factors = None
+        # load duration curves and quantile sketches of each analysis
+        self.load_duration_curves = None
+        self.load_duration_sketches = {}
+        # carbon emissions of each emission scenario and analysis, kept separate from the time series
+        self.carbon_emissions_cube = None
+        self.carbon_emissions = None
+
+        # incremental pipeline of the post processing stages, see run_pipeline
+        self.pipeline = None
+        self.pipeline_config = {}
 
         # Dataframes of the actual meter data
         self.actual_data = None
         self.actual_data_monthly = None
         self.actual_data_yearly = None
 
+        # store of the data frames of the results when there is a memory budget
+        self.frame_store = None
+        self.set_memory_budget(memory_budget)
+
+    def set_memory_budget(self, memory_budget: int | None) -> None:
+        """Limit the memory of the data frames of the URBANopt and Modelica results (e.g., min_60_with_buildings
+        and grid_metrics_daily). When the data frames are over the budget, the least recently used data frames are
+        spilled to _results_summary/frame_store and they are reloaded when they are used again, so the results are
+        used as before. The data frames of the results that are added later are also in the budget.
+
+        Args:
+            memory_budget (int | None): Maximum size of the data frames in memory, in bytes. Pass None to remove the
+                budget and load all of the data frames back into memory.
+        """
+        if memory_budget is None:
+            if self.frame_store is not None:
+                for results in self._results():
+                    results.use_frame_store(None)
+                self.frame_store.clear()
+                self.frame_store = None
+            return
+
+        if self.frame_store is None:
+            self.frame_store = FrameStore(self.analysis_output_dir / "frame_store", memory_budget)
+            for results in self._results():
+                results.use_frame_store(self.frame_store)
+        else:
+            self.frame_store.memory_budget = memory_budget
+            self.frame_store.enforce()
+
+    def _results(self) -> list[ResultsBase]:
+        """Return the URBANopt and Modelica results that are loaded"""
+        return [results for results in [self.urbanopt, *self.modelica.values()] if results is not None]
+
+    def _use_frame_store(self, results: ResultsBase) -> ResultsBase:
+        """Add the data frames of the results to the memory budget, if there is one"""
+        if self.frame_store is not None:
+            results.use_frame_store(self.frame_store)
+        return results
+
     def display_name_mappings(self) -> dict:
         """Return the list of analysis names to display names"""
         display_names = {}
@@ -179,7 +273,7 @@ class URBANoptAnalysis:
             path_to_urbanopt (Path): URBANopt project directory where the feature file and Gemfile are located. Only processes feature file.
             scenario_name (str): Name of the scenario that was run with URBANopt.
         """
-        self.urbanopt = URBANoptResults(path_to_urbanopt, scenario_name)
+        self.urbanopt = self._use_frame_store(URBANoptResults(path_to_urbanopt, scenario_name))
         self.urbanopt.process_results(self.geojson.get_building_ids(), year_of_data=self.year_of_data)
 
         # note that the number of buildings in the geojson will match here since the file being passed
@@ -194,6 +288,8 @@ class URBANoptAnalysis:
         if not self.urbanopt:
             raise Exception("URBANopt results are not loaded, run `add_urbanopt_results` method")
 
+        # collect the scaling factors for all the buildings, then scale the results at once
+        all_scalars = []
         for building_id in self.geojson.get_building_ids():
             # retrieve the scaling factors, fixed at electric_grid and natural_gas
             for meter_type in ["electric_grid", "natural_gas"]:
@@ -214,14 +310,17 @@ class URBANoptAnalysis:
                             "scaling_factor_natural_gas",
                         ],
                     )
-                    # set start_time and end time to be datetime objects
-                    df_scalars["start_time"] = pd.to_datetime(df_scalars["start_time"])
-                    # add midnight to the start_time
-                    df_scalars["start_time"] = df_scalars["start_time"].apply(lambda x: x.replace(hour=0, minute=0, second=0))
-                    df_scalars["end_time"] = pd.to_datetime(df_scalars["end_time"])
-                    df_scalars = df_scalars.reset_index()
+                    all_scalars.append(df_scalars)
+
+        if not all_scalars:
+            return
 
-                    self.urbanopt.scale_results(df_scalars, self.year_of_data, 2021)
+        df_scalars = pd.concat(all_scalars, ignore_index=True)
+        # set start_time and end time to be datetime objects, and start at midnight
+        df_scalars["start_time"] = pd.to_datetime(df_scalars["start_time"]).dt.normalize()
+        df_scalars["end_time"] = pd.to_datetime(df_scalars["end_time"])
+
+        self.urbanopt.scale_results(df_scalars, self.year_of_data, 2021)
 
     def add_modelica_results(self, analysis_name: str, path_to_mat_file: Path) -> None:
         """Read in the results from the modelica analysis into a dict of dicts. There can be more than
@@ -235,7 +334,7 @@ class URBANoptAnalysis:
             analysis_name (str): Name of the analysis, ideally lower snake case for ease of access.
             path_to_mat_file (Path): Path of the .mat file that was generated from the Modelica analysis.
         """
-        self.modelica[analysis_name] = ModelicaResults(path_to_mat_file)
+        self.modelica[analysis_name] = self._use_frame_store(ModelicaResults(path_to_mat_file))
 
         print(f"Modelica analysis name {self.modelica[analysis_name].display_name}")
 
@@ -256,11 +355,16 @@ class URBANoptAnalysis:
 
     def combine_modelica_and_openstudio_results(self) -> None:
         """Combine the modelica and openstudio results into a single data frame for each analysis_name"""
+        # the OpenStudio columns and the alignment of the indexes are shared by all of the analyses
+        building_ids = self.geojson.get_building_ids()
+        data_15min = self.urbanopt.data_15min
+        alignment_cache = {}
         for analysis_name in self.modelica:
             self.modelica[analysis_name].combine_with_openstudio_results(
-                self.geojson.get_building_ids(),
+                building_ids,
                 self.urbanopt.data,
-                self.urbanopt.data_15min,
+                data_15min,
+                alignment_cache,
             )
 
     def resample_actual_data(self) -> None:
@@ -272,24 +376,15 @@ class URBANoptAnalysis:
         self.actual_data_monthly = None
         self.actual_data_yearly = None
 
-        for building_id in self.geojson.get_building_ids():
-            meters = self.geojson.get_meters_for_building(building_id)
-            for meter in meters:
-                meter_readings = self.geojson.get_meter_readings_for_building(building_id, meter)
-                # add the meter_type to all the json objects
-                [meter_reading.update({"meter_type": meter, "building_id": building_id}) for meter_reading in meter_readings]
-                # print(f"Found {len(meter_readings)} meter readings")
-
-                # save the readings into a dataframe with end_time as the index
-                self.actual_data = pd.concat([self.actual_data, pd.DataFrame(meter_readings)])
+        # all of the readings of all of the buildings, with the times in the local time of the readings
+        self.actual_data = self.geojson.get_meter_readings()
 
         if self.actual_data is not None:
-            self.actual_data["start_time"] = pd.to_datetime(self.actual_data["start_time"])
-            self.actual_data["start_time"] = self.actual_data["start_time"].apply(lambda x: x.replace(tzinfo=None))
-            self.actual_data["end_time"] = pd.to_datetime(self.actual_data["end_time"])
-            self.actual_data["end_time"] = self.actual_data["end_time"].apply(lambda x: x.replace(tzinfo=None))
-            # check if there is a time on the end_time and if not make it 23:59:59
-            self.actual_data["end_time"] = self.actual_data["end_time"].apply(lambda x: x.replace(hour=23, minute=59, second=59))
+            # check if there is a time on the end_time and if not make it 23:59:59 (keeping the fraction of the second)
+            end_time = self.actual_data["end_time"]
+            self.actual_data["end_time"] = (
+                end_time.dt.normalize() + pd.Timedelta(hours=23, minutes=59, seconds=59) + (end_time - end_time.dt.floor("s"))
+            )
             self.actual_data = self.actual_data.set_index(["start_time"])
 
             # monthly agg across each building_id, meter_type (and other non-important fields)
@@ -303,12 +398,12 @@ class URBANoptAnalysis:
             ]
             drop_cols = ["end_time", "id"]
             # drop the columns first, then run the groupby
-            self.actual_data_monthly = self.actual_data.drop(columns=drop_cols).groupby([pd.Grouper(freq="ME"), *groupby_cols]).sum()
-            self.actual_data_monthly.reset_index()
-            self.actual_data_monthly.set_index(["start_time"])
-            self.actual_data_yearly = self.actual_data.drop(columns=drop_cols).groupby([pd.Grouper(freq="Y"), *groupby_cols]).sum()
-            self.actual_data_yearly.reset_index()
-            self.actual_data_yearly.set_index(["start_time"])
+            self.actual_data_monthly = (
+                self.actual_data.drop(columns=drop_cols).groupby([pd.Grouper(freq="ME"), *groupby_cols], observed=True).sum()
+            )
+            self.actual_data_yearly = (
+                self.actual_data.drop(columns=drop_cols).groupby([pd.Grouper(freq="YE"), *groupby_cols], observed=True).sum()
+            )
 
             # for each building, create a new row with the building_id and new meter called 'total' which has the
             # converted_value for all the meters for that building summed together
@@ -320,18 +415,14 @@ class URBANoptAnalysis:
                 "units",
                 "converted_units",
             ]
-            new_data = self.actual_data_monthly.groupby(groupby_cols).sum()
-            new_data.reset_index()
-            new_data.set_index(["start_time"])
+            new_data = self.actual_data_monthly.groupby(groupby_cols, observed=True).sum()
             new_data["meter_type"] = "Total"
             self.new_data = new_data
             # add the new_data rows to the existing self.actual_monthly dataframe, mapping the common columns
             self.actual_data_monthly = pd.concat([self.actual_data_monthly, new_data])
 
             # now do the same for the yearly data for the totals
-            new_data = self.actual_data_yearly.groupby(groupby_cols).sum()
-            new_data.reset_index()
-            new_data.set_index(["start_time"])
+            new_data = self.actual_data_yearly.groupby(groupby_cols, observed=True).sum()
             new_data["meter_type"] = "Total"
             self.new_data = new_data
             # add the new_data rows to the existing self.actual_monthly dataframe, mapping the common columns
@@ -384,6 +475,8 @@ class URBANoptAnalysis:
             "grid_metrics_annual",
             "grid_summary",
             "end_use_summary",
+            "diversity_factors",
+            "carbon_emissions",
         ],
     ) -> None:
         """For all of the analyses, save the dataframes. Does NOT save the URBANopt results in the modelica paths."""
@@ -401,6 +494,12 @@ class URBANoptAnalysis:
         if self.end_use_summary is not None and "end_use_summary" in dfs_to_save:
             self.end_use_summary.to_csv(self.analysis_output_dir / "annual_end_use_summary.csv")
 
+        if self.diversity_factors is not None and "diversity_factors" in dfs_to_save:
+            self.diversity_factors.to_csv(self.analysis_output_dir / "diversity_factors.csv")
+
+        if self.carbon_emissions is not None and "carbon_emissions" in dfs_to_save:
+            self.carbon_emissions.to_csv(self.analysis_output_dir / "carbon_emissions.csv")
+
     def calculate_carbon_emissions(
         self,
         egrid_subregion: str,
@@ -421,9 +520,12 @@ class URBANoptAnalysis:
             kwargs:
                 emissions_type (str, optional): Type of emissions to load. Options are 'marginal' and 'average'. Defaults to 'marginal'.
                 with_td_losses (bool, optional): Include transmission and distribution losses. Defaults to True.
+                emission_factor_store_path (Path, optional): Directory of the emission factor store. Defaults to the
+                    user's cache directory, see EmissionFactorStore.
         """
         emissions_type = kwargs.get("emissions_type", "marginal")
         with_td_losses = kwargs.get("with_td_losses", True)
+        emission_factor_store_path = kwargs.get("emission_factor_store_path")
 
         # load in the hourly emissions data
         hourly_emissions_data = HourlyEmissionsData(
@@ -432,14 +534,64 @@ class URBANoptAnalysis:
             analysis_year=analysis_year,
             emissions_type=emissions_type,
             with_td_losses=with_td_losses,
+            store_path=emission_factor_store_path,
         )
 
-        # calculate the carbon emission on the URBANopt results
+        # calculate the carbon emission on the URBANopt results, for the district and each building
+        building_ids = self.geojson.get_building_ids()
         self.urbanopt.calculate_carbon_emissions(hourly_emissions_data, future_year=future_year)
+        self.urbanopt.calculate_building_carbon_emissions(hourly_emissions_data, building_ids, egrid_subregion)
 
         # Now for each of the modelica results
         for analysis_name in self.modelica:
             self.modelica[analysis_name].calculate_carbon_emissions(hourly_emissions_data, future_year=future_year)
+            self.modelica[analysis_name].calculate_building_carbon_emissions(hourly_emissions_data, building_ids, egrid_subregion)
+
+    def calculate_carbon_emissions_scenarios(
+        self,
+        egrid_subregions: list[str],
+        future_years: list[int],
+        emissions_types: list[str] = ["marginal"],
+        with_td_losses: list[bool] = [True],
+        historical_years: list[int] = [],
+        analysis_year: int = 2017,
+        emission_factor_store_path: Path | None = None,
+    ) -> pd.DataFrame:
+        """Calculate the carbon emissions of every combination of the eGRID subregions, future years,
+        emissions types, and T&D losses for the URBANopt results and each of the Modelica results in one
+        batch. Unlike calculate_carbon_emissions, no columns are added to the time series data, the
+        results are stored in carbon_emissions_cube (hourly) and carbon_emissions (annual).
+
+        Args:
+            egrid_subregions (list[str]): EPA's 4-letter identifiers of the emissions subregions.
+            future_years (list[int]): Years of the emission data.
+            emissions_types (list[str], optional): Types of emissions, 'marginal' and/or 'average'. Defaults to ["marginal"].
+            with_td_losses (list[bool], optional): Include transmission and distribution losses. Defaults to [True].
+            historical_years (list[int], optional): Historical years of the eGRID annual average rates, e.g., the metered
+                years for calibration. Defaults to [].
+            analysis_year (int, optional): Year that the simulation/analysis data is representing. Defaults to 2017.
+            emission_factor_store_path (Path | None, optional): Directory of the emission factor store. Defaults to None,
+                which is the user's cache directory, see EmissionFactorStore.
+
+        Returns:
+            pd.DataFrame: Annual carbon emissions in mtCO2e indexed by the scenario and the analysis
+        """
+        dataframes = {"Non-Connected": self.urbanopt.data}
+        for analysis_name, modelica in self.modelica.items():
+            dataframes[analysis_name] = modelica.min_60_with_buildings
+
+        self.carbon_emissions_cube = CarbonEmissionsCube.from_dataframes(
+            dataframes,
+            egrid_subregions,
+            future_years,
+            emissions_types=emissions_types,
+            with_td_losses=with_td_losses,
+            historical_years=historical_years,
+            analysis_year=analysis_year,
+            store=get_emission_factor_store(emission_factor_store_path),
+        )
+        self.carbon_emissions = self.carbon_emissions_cube.annual()
+        return self.carbon_emissions
 
     def calculate_all_grid_metrics(self) -> None:
         """Call each Modelica analysis to create the grid metric"""
@@ -451,6 +603,96 @@ class URBANoptAnalysis:
         for analysis_name in self.modelica:
             self.modelica[analysis_name].calculate_grid_metrics()
 
+        self.calculate_diversity_factors()
+
+    def calculate_load_duration(
+        self,
+        meters: list[str] = [
+            "Total Electricity",
+            "Total Natural Gas",
+            "Total Thermal Cooling Energy",
+            "Total Thermal Heating Energy",
+        ],
+        n_quantiles: int = 1001,
+    ) -> pd.DataFrame:
+        """Create the load duration curves and quantile sketches of the 15 minute meters for the
+        Non-Connected (URBANopt) results and each Modelica analysis. The sketches are stored in
+        load_duration_sketches by analysis name.
+
+        Args:
+            meters (list[str]): Names of the meters. Defaults to the total electricity, natural gas, and thermal energy.
+            n_quantiles (int, optional): Number of quantiles in the sketches. Defaults to 1001.
+
+        Returns:
+            pd.DataFrame: Load duration curves with columns of (analysis, meter) indexed by the hours
+        """
+        curves = {"Non-Connected": self.urbanopt.calculate_load_duration(self.urbanopt.data_15min, meters, n_quantiles)}
+        self.load_duration_sketches = {"Non-Connected": self.urbanopt.load_duration_sketch}
+        for analysis_name, modelica in self.modelica.items():
+            curves[analysis_name] = modelica.calculate_load_duration(modelica.min_15_with_buildings, meters, n_quantiles)
+            self.load_duration_sketches[analysis_name] = modelica.load_duration_sketch
+
+        self.load_duration_curves = pd.concat(curves, axis=1, names=["Analysis", "Meter"])
+        return self.load_duration_curves
+
+    def building_electricity_block(self, df: pd.DataFrame, meters: list[str]) -> pd.DataFrame:
+        """Return the electricity of each building as one column per building, which is the sum
+        of the building's meters that exist in the data frame.
+
+        Args:
+            df (pd.DataFrame): Time series data with the building meters
+            meters (list[str]): Names of the meters without the building, the column is "{meter} Building {id}"
+
+        Returns:
+            pd.DataFrame: One column per building id
+        """
+        building_ids = self.geojson.get_building_ids()
+        totals = {
+            building_id: [f"{meter} Building {building_id}" for meter in meters if f"{meter} Building {building_id}" in df.columns]
+            for building_id in building_ids
+        }
+        # only select the building columns, which avoids materializing all the columns of a 15 minute view
+        columns = list(dict.fromkeys(column for sources in totals.values() for column in sources))
+        return AggregationGraph(totals).compute(df[columns])
+
+    def calculate_diversity_factors(self) -> pd.DataFrame:
+        """Calculate the coincident peak, the sum of the non-coincident building peaks, and the
+        diversity factor of the building electricity for the Non-Connected (URBANopt) results and
+        each Modelica analysis. For the Modelica analyses, the building electricity is the non-HVAC
+        end uses plus the building's ETS pumps and heat pumps. The values are calculated at the 15 and
+        60 minute resolution for each year and month.
+
+        Returns:
+            pd.DataFrame: Diversity factors indexed by the analysis, resolution, and period
+        """
+        analyses = {"Non-Connected": (self.urbanopt.data_15min, self.urbanopt.data, ["Electricity:Facility"])}
+        for analysis_name, modelica in self.modelica.items():
+            analyses[analysis_name] = (
+                modelica.min_15_with_buildings,
+                modelica.min_60_with_buildings,
+                [
+                    "InteriorLights:Electricity",
+                    "ExteriorLights:Electricity",
+                    "InteriorEquipment:Electricity",
+                    "ExteriorEquipment:Electricity",
+                    "ETS Pump Electricity",
+                    "ETS Pump CHW Electricity",
+                    "ETS Pump HHW Electricity",
+                    "ETS Heat Pump Electricity",
+                ],
+            )
+
+        results = {}
+        for analysis_name, (df_15min, df_60min, meters) in analyses.items():
+            for resolution, df in [("15min", df_15min), ("60min", df_60min)]:
+                block = self.building_electricity_block(df, meters)
+                annual = peak_diversity(block.to_numpy(), block.index, freq="Y")
+                monthly = peak_diversity(block.to_numpy(), block.index, freq="M")
+                results[(analysis_name, resolution)] = pd.concat([annual, monthly])
+
+        self.diversity_factors = pd.concat(results, names=["Analysis", "Resolution"])
+        return self.diversity_factors
+
     def calculate_utility_cost(self, **kwargs) -> None:
         """Stub for calculating the utility cost at each building and
         aggregated for the entire system.
@@ -552,23 +794,28 @@ class URBANoptAnalysis:
         finally:
             pass
 
-        # Do this for each of the analyses' 15 and 60 min dataframes
+        # check to make sure that each of the agg_columns have been defined
+        for key, value in building_aggs.items():
+            if not value["agg_columns"]:
+                raise Exception(f"Agg columns for {key} have not been defined")
+
+        # The graph is compiled once per column layout, which is shared by the analyses'
+        # 15 and 60 min dataframes
+        aggregations = AggregationGraph({key: value["agg_columns"] for key, value in building_aggs.items()})
         for analysis_name in self.modelica:
             for resolution in ["min_15_with_buildings", "min_60_with_buildings"]:
-                temp_df = getattr(self.modelica[analysis_name], resolution)
+                aggregations.apply(getattr(self.modelica[analysis_name], resolution))
 
-                # Go through each building_aggs and create the aggregation
-                for key, value in building_aggs.items():
-                    # check to make sure that each of the agg_columns have been defined
-                    if not value["agg_columns"]:
-                        raise Exception(f"Agg columns for {key} have not been defined")
+    def create_rollups(self, daily: bool = False, tou_periods: dict[str, list[int]] | None = None) -> None:
+        """Rollups take the 60 minute data sets and roll up to monthly and annual, and optionally to daily and to
+        monthly time-of-use periods. Each data set is reduced once and the analyses with the same index share the
+        group labels, see RollupEngine.
 
-                    # sum up the columns in the agg_columns defined above for the dataframe of
-                    # the analysis
-                    temp_df[key] = temp_df[value["agg_columns"]].sum(axis=1)
-
-    def create_rollups(self) -> None:
-        """Rollups take the 60 minute data sets and roll up to monthly and annual"""
+        Args:
+            daily (bool, optional): Also roll up to daily. Defaults to False.
+            tou_periods (dict[str, list[int]], optional): Name of each time-of-use period and the hours of the day in the
+                period, e.g., {"On-Peak": range(12, 18)}, the other hours are in the 'Other' period. Defaults to None.
+        """
         # make sure that the data exist in the correct dataframes
         for analysis_name in self.modelica:
             if self.modelica[analysis_name].min_60_with_buildings is None:
@@ -578,17 +825,28 @@ class URBANoptAnalysis:
         if self.urbanopt.data is None:
             raise Exception("Data do not exist in URBANopt for min_60_with_buildings.")
 
+        engine = RollupEngine(daily, tou_periods)
+
         # roll up the urbanopt results (single analysis)
-        self.urbanopt.data_monthly = self.urbanopt.data.resample("ME").sum()
-        self.urbanopt.data_annual = self.urbanopt.data.resample("YE").sum()
+        rollups = engine.rollup(self.urbanopt.data)
+        self.urbanopt.data_monthly = rollups["monthly"]
+        self.urbanopt.data_annual = rollups["annual"]
+        self.urbanopt.data_daily = rollups.get("daily")
+        self.urbanopt.data_tou = rollups.get("tou")
         # loads
-        self.urbanopt.data_loads_monthly = self.urbanopt.data_loads.resample("ME").sum()
-        self.urbanopt.data_loads_annual = self.urbanopt.data_loads.resample("YE").sum()
+        rollups = engine.rollup(self.urbanopt.data_loads)
+        self.urbanopt.data_loads_monthly = rollups["monthly"]
+        self.urbanopt.data_loads_annual = rollups["annual"]
+        self.urbanopt.data_loads_daily = rollups.get("daily")
+        self.urbanopt.data_loads_tou = rollups.get("tou")
 
         # roll up the Modelica results (each analysis)
         for analysis_name in self.modelica:
-            self.modelica[analysis_name].monthly = self.modelica[analysis_name].min_60_with_buildings.resample("ME").sum()
-            self.modelica[analysis_name].data_annual = self.modelica[analysis_name].min_60_with_buildings.resample("YE").sum()
+            rollups = engine.rollup(self.modelica[analysis_name].min_60_with_buildings)
+            self.modelica[analysis_name].monthly = rollups["monthly"]
+            self.modelica[analysis_name].data_annual = rollups["annual"]
+            self.modelica[analysis_name].daily = rollups.get("daily")
+            self.modelica[analysis_name].tou = rollups.get("tou")
 
     def create_building_level_results(self) -> None:
         """Save off building level totals for mapping for each scenario. The results are
@@ -605,7 +863,10 @@ class URBANoptAnalysis:
         # Building EUI, kWh/m2, 100, 200, 300, 123
         # Building EUI, kBtu/ft2, 100, 200, 300, 123
         # Building Peak Demand, kW, 100, 200, 300, 123
-        # Building Peak Demand Time, hr, 12, 13, 14, 13.5
+        # Building Peak Demand Time, Datetime, 2017-07-01 15:00, ...
+        # Load Factor (Mean), Ratio, 0.5, 0.6, 0.7
+        # System Ramping (Max), MW/day, x, y, z
+        # System Ramping (Sum), MW/year, x, y, z
         """
         if self.urbanopt.data_annual is None:
             raise Exception("There are no annual results calculated, did you run create_rollups()")
@@ -648,7 +909,40 @@ class URBANoptAnalysis:
                 "Metric": "Building EUI",
                 "Unit": "kBtu/ft2",
             },
+            "peak_demand": {
+                "Metric": "Building Peak Demand",
+                "Unit": "kW",
+            },
+            "peak_demand_datetime": {
+                "Metric": "Building Peak Demand Time",
+                "Unit": "Datetime",
+            },
+            "load_factor_mean": {
+                "Metric": "Load Factor (Mean)",
+                "Unit": "Ratio",
+            },
+            "system_ramping_max": {
+                "Metric": "System Ramping (Max)",
+                "Unit": "MW/day",
+            },
+            "system_ramping_sum": {
+                "Metric": "System Ramping (Sum)",
+                "Unit": "MW/year",
+            },
         }
+
+        # carbon emissions of all of the buildings, if calculate_carbon_emissions has been run
+        building_carbon = None
+        if self.urbanopt.building_carbon_emissions is not None:
+            data["total_carbon"] = {
+                "Metric": "Total Carbon",
+                "Unit": "mtCO2e",
+            }
+            building_carbon = self.urbanopt.building_carbon_emissions.sum()
+
+        # the electricity grid metrics of all of the buildings are calculated in bulk
+        building_grid_metrics = self.urbanopt.calculate_building_grid_metrics(self.geojson.get_building_ids())
+
         for building_id in self.geojson.get_building_ids():
             geojson_data = self.geojson.get_building_properties_by_id(building_id)
 
@@ -672,6 +966,16 @@ class URBANoptAnalysis:
                 building_id
             ]
 
+            # electricity is in Wh per hour, which is the average W over the hour
+            data["peak_demand"][building_id] = building_grid_metrics.loc[building_id, "Peak"] / 1000
+            data["peak_demand_datetime"][building_id] = building_grid_metrics.loc[building_id, "Peak Datetime"]
+            data["load_factor_mean"][building_id] = building_grid_metrics.loc[building_id, "Load Factor Mean"]
+            data["system_ramping_max"][building_id] = building_grid_metrics.loc[building_id, "System Ramping Max"]
+            data["system_ramping_sum"][building_id] = building_grid_metrics.loc[building_id, "System Ramping Sum"]
+
+            if building_carbon is not None:
+                data["total_carbon"][building_id] = building_carbon[f"Total Carbon Emissions Building {building_id}"]
+
         # combine all the data together for the final dataframe. The list comprehension here
         # will create the table that is shown in the docstring above
         return_df = pd.DataFrame([data[key] for key in data])
@@ -680,6 +984,174 @@ class URBANoptAnalysis:
 
         return return_df
 
+    def run_pipeline(self, config: dict, max_workers: int | None = None) -> list[str]:
+        """Run the post processing stages as an incremental pipeline. Each stage only runs again if its inputs
+        (the config values and the contents of the input files) or the stages that it depends on changed since
+        the last run, e.g., a new emissions year only runs the carbon stage and the stages after it, and one new
+        .mat file only loads that Modelica analysis. The URBANopt and Modelica stages run concurrently, and their
+        results are assigned to the analysis once each stage is done.
+
+        The stages are:
+            geojson: reload the GeoJSON file
+            urbanopt: process_results, process_load_results, and create_aggregations of the URBANopt results
+            modelica:<analysis_name>: add_modelica_results and resample_and_convert_to_df for each analysis
+            combine: combine_modelica_and_openstudio_results and create_modelica_aggregations
+            carbon: calculate_carbon_emissions for each of the carbon_emissions configs
+            rollups: create_rollups
+            building_summaries: create_building_summaries
+            grid_metrics: calculate_all_grid_metrics
+            summary_results: create_summary_results
+
+        Args:
+            config (dict): Inputs of the stages, with the keys
+                urbanopt_path (Path): URBANopt project directory
+                scenario_name (str): Name of the URBANopt scenario
+                modelica_results (dict[str, Path]): Path of the .mat file of each analysis name
+                building_ids (list[str], optional): Buildings in the Modelica results, defaults to None
+                other_vars (list[str], optional): Other Modelica variables to gather, defaults to None
+                carbon_emissions (list[dict], optional): Keyword arguments of each calculate_carbon_emissions call
+                rollups (dict, optional): Keyword arguments of create_rollups (daily, tou_periods)
+            max_workers (int, optional): Maximum number of stages to run at the same time. Defaults to None.
+
+        Returns:
+            list[str]: Names of the stages that ran
+        """
+        self.pipeline_config = config
+        if self.pipeline is None:
+            self.pipeline = Pipeline(max_workers)
+        self.pipeline.max_workers = max_workers
+
+        def config_value(key: str, default=None):
+            return self.pipeline_config.get(key, default)
+
+        def reload_geojson() -> None:
+            self.geojson = DESGeoJSON(self.geojson_file, **self.geojson_kwargs)
+            self.number_of_buildings = len(self.geojson.get_building_ids())
+
+        # the URBANopt and Modelica stages run in threads, so they return the results and the results are
+        # assigned on the thread that runs the pipeline
+        def process_urbanopt() -> URBANoptResults:
+            building_ids = self.geojson.get_building_ids()
+            urbanopt = self._use_frame_store(URBANoptResults(config_value("urbanopt_path"), config_value("scenario_name")))
+            urbanopt.process_results(building_ids, year_of_data=self.year_of_data)
+            urbanopt.process_load_results(building_ids, year_of_data=self.year_of_data)
+            urbanopt.create_aggregations(building_ids)
+            return urbanopt
+
+        def set_urbanopt(urbanopt: URBANoptResults) -> None:
+            self.urbanopt = urbanopt
+
+        def process_modelica(analysis_name: str) -> ModelicaResults:
+            modelica = self._use_frame_store(ModelicaResults(config_value("modelica_results")[analysis_name]))
+            modelica.resample_and_convert_to_df(config_value("building_ids"), config_value("other_vars"), self.year_of_data)
+            return modelica
+
+        def set_modelica(analysis_name: str, modelica: ModelicaResults) -> None:
+            self.modelica[analysis_name] = modelica
+
+        def combine() -> None:
+            # keep the analyses in the order of the config, and drop the analyses that were removed
+            self.modelica = {analysis_name: self.modelica[analysis_name] for analysis_name in config_value("modelica_results", {})}
+            self.combine_modelica_and_openstudio_results()
+            self.create_modelica_aggregations()
+
+        def calculate_carbon() -> None:
+            for carbon_kwargs in config_value("carbon_emissions", []):
+                self.calculate_carbon_emissions(**carbon_kwargs)
+
+        self.pipeline.stages = {}
+        self.pipeline.add_stage("geojson", reload_geojson, inputs=lambda: [self.geojson_file, self.geojson_kwargs])
+        self.pipeline.add_stage(
+            "urbanopt",
+            process_urbanopt,
+            depends_on=["geojson"],
+            # only the report files that are read, which are hashed by their contents when they change
+            inputs=lambda: URBANoptResults.report_files(
+                config_value("urbanopt_path"), config_value("scenario_name"), self.geojson.get_building_ids()
+            ),
+            apply=set_urbanopt,
+        )
+        modelica_stages = []
+        for analysis_name in config_value("modelica_results", {}):
+            modelica_stages.append(f"modelica:{analysis_name}")
+            self.pipeline.add_stage(
+                f"modelica:{analysis_name}",
+                lambda analysis_name=analysis_name: process_modelica(analysis_name),
+                apply=lambda modelica, analysis_name=analysis_name: set_modelica(analysis_name, modelica),
+                inputs=lambda analysis_name=analysis_name: [
+                    config_value("modelica_results")[analysis_name],
+                    config_value("building_ids"),
+                    config_value("other_vars"),
+                ],
+            )
+        self.pipeline.add_stage("combine", combine, depends_on=["urbanopt", *modelica_stages])
+        self.pipeline.add_stage("carbon", calculate_carbon, depends_on=["combine"], inputs=lambda: config_value("carbon_emissions", []))
+        self.pipeline.add_stage(
+            "rollups",
+            lambda: self.create_rollups(**config_value("rollups", {})),
+            depends_on=["carbon"],
+            inputs=lambda: config_value("rollups", {}),
+        )
+        self.pipeline.add_stage("building_summaries", self.create_building_summaries, depends_on=["rollups"])
+        # the carbon stage adds columns to the data frames that the grid metrics read, so they do not run at the same time
+        self.pipeline.add_stage("grid_metrics", self.calculate_all_grid_metrics, depends_on=["carbon"])
+        self.pipeline.add_stage("summary_results", self.create_summary_results, depends_on=["building_summaries", "grid_metrics"])
+
+        return self.pipeline.run()
+
+    def save_snapshot(self, path: Path | None = None) -> Path:
+        """Save the state of the analysis, including the URBANopt results, every Modelica result, and the
+        summaries, so that it can be loaded with load_snapshot without processing the results again. The data
+        frames are saved as .npy files that are memory mapped on load.
+
+        Args:
+            path (Path, optional): Directory of the snapshot. Defaults to None, which is _results_summary/snapshot.
+
+        Returns:
+            Path: Directory of the snapshot
+        """
+        if path is None:
+            path = self.analysis_output_dir / "snapshot"
+
+        metadata = {
+            "geojson_file": str(self.geojson_file),
+            "year_of_data": self.year_of_data,
+            "number_of_buildings": self.number_of_buildings,
+            "urbanopt": self.urbanopt.display_name if self.urbanopt is not None else None,
+            "modelica": list(self.modelica),
+        }
+        manifest = write_snapshot(path, {"analysis": self}, metadata)
+        print(f"Saved snapshot of {len(manifest['frames'])} data frames to {path}")
+        return path
+
+    @classmethod
+    def load_snapshot(cls, path: Path, mmap_mode: str | None = "c") -> "URBANoptAnalysis":
+        """Load an analysis that was saved with save_snapshot. The data frames are memory mapped (copy-on-write),
+        so only the data that are used are read. The GeoJSON file is loaded again if it exists. The Modelica
+        results do not have the reader of the .mat file, so the .mat file variables cannot be processed again.
+
+        Args:
+            path (Path): Directory of the snapshot
+            mmap_mode (str, optional): Memory map mode of the data, see numpy.load. Defaults to "c" (copy-on-write).
+                Pass None to read all of the data into memory.
+
+        Raises:
+            Exception: Snapshot does not exist or is not of an URBANoptAnalysis
+
+        Returns:
+            URBANoptAnalysis: Analysis with all of the results
+        """
+        state, _ = read_snapshot(path, mmap_mode)
+        analysis = state["analysis"]
+        if not isinstance(analysis, cls):
+            raise Exception(f"Snapshot {path} is not of an {cls.__name__}")
+
+        if analysis.geojson_file.exists():
+            analysis.geojson = DESGeoJSON(analysis.geojson_file, **analysis.geojson_kwargs)
+        else:
+            print(f"WARNING: GeoJSON file does not exist: {analysis.geojson_file}, the snapshot is loaded without it")
+        return analysis
+
     def __getitem__(self, key: str) -> ModelicaResults:
         # Accessor to the self.modelica dictionary that takes the key value as in the input
         # and returns the ModelicaResults object
@@ -704,6 +1176,70 @@ class URBANoptAnalysis:
 
         return None
 
+    @classmethod
+    def seed_meter_peaks(cls, buildings: list[tuple[str, list[dict]]]) -> dict[str, dict]:
+        """Return the peak reading and the month of the peak of the electricity and natural gas meters of
+        each building. The readings of all of the buildings are flattened into one table and the peak of each
+        building and meter type is found with one grouped argmax. The first reading is used if the peak
+        is repeated.
+
+        Args:
+            buildings (list[tuple[str, list[dict]]]): ID and list of SEED meters of each building
+
+        Returns:
+            dict[str, dict]: Peaks keyed on the building ID, e.g., {"electricity_peak": 120.5,
+                "electricity_peak_month": 7, "natural_gas_peak": 0, "natural_gas_peak_month": None}. The
+                peak is 0 and the month is None if the building does not have positive readings of the meter type.
+        """
+        peaks = {}
+        for building_id, _ in buildings:
+            peaks[building_id] = {}
+            for name in cls.SEED_PEAK_METERS.values():
+                peaks[building_id][f"{name}_peak"] = 0
+                peaks[building_id][f"{name}_peak_month"] = None
+
+        readings = flatten_meter_readings(buildings)
+        if readings is None:
+            return peaks
+
+        readings = readings[readings["meter_type"].isin(list(cls.SEED_PEAK_METERS)) & (readings["converted_value"] > 0)]
+        positions = readings.groupby(["building_id", "meter_type"], observed=True)["converted_value"].idxmax()
+        values = readings.loc[positions, "converted_value"].tolist()
+        months = readings.loc[positions, "start_time"].dt.month.tolist()
+        for (building_id, meter_type), value, month in zip(positions.index, values, months):
+            name = cls.SEED_PEAK_METERS[meter_type]
+            peaks[building_id][f"{name}_peak"] = value
+            peaks[building_id][f"{name}_peak_month"] = month
+        return peaks
+
+    @classmethod
+    def infer_system_types(cls, floor_areas: list[float], has_natural_gas: list[bool]) -> list[str]:
+        """Return the system type of each building from the floor area and whether natural gas is available,
+        see SYSTEM_TYPES.
+
+        Args:
+            floor_areas (list[float]): Floor area of each building, ft2
+            has_natural_gas (list[bool]): Whether each building has natural gas
+
+        Returns:
+            list[str]: System type of each building
+        """
+        sizes = np.searchsorted(cls.SYSTEM_TYPE_FLOOR_AREAS, np.asarray(floor_areas, dtype=float), side="left")
+        return np.asarray(cls.SYSTEM_TYPES)[np.asarray(has_natural_gas, dtype=int), sizes].tolist()
+
+    @classmethod
+    def infer_templates(cls, years_built: list[int]) -> list[str]:
+        """Return the construction template of each building from the year built, see TEMPLATES.
+
+        Args:
+            years_built (list[int]): Year that each building was built
+
+        Returns:
+            list[str]: Template of each building
+        """
+        positions = np.searchsorted(cls.TEMPLATE_YEARS, np.asarray(years_built, dtype=float), side="right")
+        return np.asarray(cls.TEMPLATES)[positions].tolist()
+
     def update_geojson_from_seed_data(self, **kwargs) -> dict:
         """Update the GeoJSON contents to be compatible with URBANopt. This step should eventually be
         handled entirely in the SEED interface, but for now, we are manually adding in this information.
@@ -792,7 +1328,8 @@ class URBANoptAnalysis:
                 feature_count += 1
 
                 # if we are this far, then we will want new_feature
-                new_feature = copy.deepcopy(feature)
+                # only the properties are changed, so the meters and readings are not copied
+                new_feature = {**feature, "properties": dict(feature["properties"])}
 
                 # remove the ID if it exists, we will create a new one
                 if "ID" in new_feature["properties"]:
@@ -949,101 +1486,35 @@ class URBANoptAnalysis:
                     # if "geometries" not in new_feature["geometry"]:
                     #     new_feature["geometry"]["geometries"] = []
 
-                meter_info = {
-                    "number_of_electricity_meters": 0,
-                    "number_of_gas_meters": 0,
-                    "number_of_district_heating_meters": 0,
-                    "number_of_district_cooling_meters": 0,
-                    "number_of_district_steam_meters": 0,
-                    "number_of_other_meters": 0,
-                }
-
-                no_meters = True
                 if new_feature["properties"].get("meters"):
-                    # determine the peak load and month for each meter and store into the
-                    # properties section
-                    peaks = {
-                        "electricity": 0,
-                        "electricity_month": None,
-                        "natural_gas": 0,
-                        "natural_gas_month": None,
-                    }
                     for meter in new_feature["properties"]["meters"]:
-                        if meter["type"] == "Electric - Grid":
-                            meter_info["number_of_electricity_meters"] += 1
-                            for reading in meter["readings"]:
-                                # print(reading)
-                                if reading["converted_value"] > peaks["electricity"]:
-                                    # kwh
-                                    peaks["electricity"] = reading["converted_value"]
-                                    peaks["electricity_month"] = datetime.datetime.fromisoformat(reading["start_time"]).month
-                        elif meter["type"] == "Natural Gas":
-                            meter_info["number_of_gas_meters"] += 1
-                            for reading in meter["readings"]:
-                                if reading["converted_value"] > peaks["natural_gas"]:
-                                    peaks["natural_gas"] = reading["converted_value"]
-                                    peaks["natural_gas_month"] = datetime.datetime.fromisoformat(reading["start_time"]).month
-                        else:
-                            meter_info["number_of_other_meters"] += 1
+                        if meter["type"] not in self.SEED_PEAK_METERS:
                             print(f"WARNING: Not calculating peak for meter type: {meter['type']}")
-
-                    new_feature["properties"]["electricity_peak"] = peaks["electricity"]
-                    new_feature["properties"]["electricity_peak_month"] = peaks["electricity_month"]
-                    new_feature["properties"]["natural_gas_peak"] = peaks["natural_gas"]
-                    new_feature["properties"]["natural_gas_peak_month"] = peaks["natural_gas_month"]
-                    no_meters = False
                 else:
                     print(f"WARNING: No meters found for building {index}, assuming NG heating.")
 
-                if no_meters:
-                    # determine the system type by floor_area only, assume Gas is
-                    # available
-                    if new_feature["properties"].get("floor_area", 0) > 125000:
-                        new_feature["properties"]["system_type"] = "VAV chiller with gas boiler reheat"
-                    elif new_feature["properties"].get("floor_area", 0) > 75000:
-                        new_feature["properties"]["system_type"] = "PVAV with gas heat with electric reheat"
-                    else:
-                        new_feature["properties"]["system_type"] = "PSZ-AC with gas coil"
-                elif new_feature["properties"].get("floor_area", 0) > 125000:
-                    if meter_info["number_of_gas_meters"] > 0:
-                        new_feature["properties"]["system_type"] = "VAV chiller with gas boiler reheat"
-                    else:
-                        # no gas
-                        new_feature["properties"]["system_type"] = "VAV chiller with PFP boxes"
-                elif new_feature["properties"].get("floor_area", 0) > 75000:
-                    if meter_info["number_of_gas_meters"] > 0:
-                        new_feature["properties"]["system_type"] = "PVAV with gas heat with electric reheat"
-                    else:
-                        # no gas
-                        new_feature["properties"]["system_type"] = "PVAV with PFP boxes"
-                elif meter_info["number_of_gas_meters"] > 0:
-                    new_feature["properties"]["system_type"] = "PSZ-AC with gas coil"
-                else:
-                    # no gas
-                    new_feature["properties"]["system_type"] = "PSZ-HP"
-
-                # # set the construction template based on the year built
-                if new_feature["properties"].get("year_built"):
-                    year_built = new_feature["properties"]["year_built"]
-                    if year_built < 1980:
-                        new_feature["properties"]["template"] = "DOE Ref Pre-1980"
-                    elif year_built < 2004:
-                        new_feature["properties"]["template"] = "DOE Ref 1980-2004"
-                    elif year_built < 2007:
-                        new_feature["properties"]["template"] = "90.1-2004"
-                    elif year_built < 2010:
-                        new_feature["properties"]["template"] = "90.1-2007"
-                    elif year_built < 2013:
-                        new_feature["properties"]["template"] = "90.1-2010"
-                    elif year_built < 2016:
-                        new_feature["properties"]["template"] = "90.1-2013"
-                    elif year_built < 2019:
-                        new_feature["properties"]["template"] = "90.1-2016"
-                    else:
-                        # pick the worst case
-                        new_feature["properties"]["template"] = "DOE Ref Pre-1980"
-
                 new_dict["features"].append(new_feature)
+
+            # 7. Find the peak of the meters and the system type and template of all of the buildings at once,
+            # then write them to the features. The system type is only based on the floor area if there are
+            # no meters, assuming gas is available
+            buildings = [feature["properties"] for feature in new_dict["features"]]
+            peaks = self.seed_meter_peaks([(building["id"], building["meters"]) for building in buildings if building.get("meters")])
+            system_types = self.infer_system_types(
+                [building.get("floor_area", 0) for building in buildings],
+                [
+                    any(meter["type"] == "Natural Gas" for meter in building["meters"]) if building.get("meters") else True
+                    for building in buildings
+                ],
+            )
+            templates = iter(self.infer_templates([building["year_built"] for building in buildings if building.get("year_built")]))
+            for building, system_type in zip(buildings, system_types):
+                if building["id"] in peaks:
+                    building.update(peaks[building["id"]])
+                building["system_type"] = system_type
+                if building.get("year_built"):
+                    building["template"] = next(templates)
+
             # insert the site data into the features within the new_dict
             new_dict["features"].insert(0, site_info)
 
@@ -1077,6 +1548,10 @@ class URBANoptAnalysis:
                 "System Ramping Heating (Max)": ["MW/day"],
                 "System Ramping Heating (Sum)": ["MW/year"],
             }
+            if self.diversity_factors is not None:
+                summary_data["Building Coincident Peak Demand"] = ["MW (15-min peak)"]
+                summary_data["Building Non-Coincident Peak Demand"] = ["MW (sum of 15-min peaks)"]
+                summary_data["Building Diversity Factor"] = ["Ratio"]
 
             # only save off the useful columns for the summary table
             year_end = f"{self.year_of_data}-12-31"
@@ -1115,6 +1590,12 @@ class URBANoptAnalysis:
                 summary_data["System Ramping Heating (Max)"].append(df_annual[year_end]["Total Thermal Heating Energy System Ramping max"])
                 summary_data["System Ramping Heating (Sum)"].append(df_annual[year_end]["Total Thermal Heating Energy System Ramping sum"])
 
+                if self.diversity_factors is not None:
+                    diversity = self.diversity_factors.loc[(analysis_name, "15min", str(self.year_of_data))]
+                    summary_data["Building Coincident Peak Demand"].append(diversity["Coincident Peak"] / 1e6)
+                    summary_data["Building Non-Coincident Peak Demand"].append(diversity["Sum of Non-Coincident Peaks"] / 1e6)
+                    summary_data["Building Diversity Factor"].append(diversity["Diversity Factor"])
+
             # need to convert the summary_data into format: [['tom', 10, 15], ['nicholas', 15, 17], ['julian', 14, 30]]
             new_summary_data = []
             for key, value in summary_data.items():
@@ -1165,175 +1646,23 @@ class URBANoptAnalysis:
         return True
 
     @classmethod
-    def _check_dymola_results(cls, sim_folder: Path) -> dict:
-        """Check if the simulation has valid dymola results.
-
-        Args:
-            sim_folder (Path): Path to the simulation folder.
-
-        Returns:
-            dict: Dictionary of bad or empty results.
-        """
-        bad_or_empty_results = {}
-        error = False
-        mat_file = None
-
-        dslog_file = sim_folder.parent / "dslog.txt"
-        with open(dslog_file) as f:
-            lines = f.readlines()
-            for line in lines:
-                if "Error" in line:
-                    error = True
-                    bad_or_empty_results[sim_folder.parent] = {}
-                    bad_or_empty_results[sim_folder.parent]["path_to_analysis"] = sim_folder.parent
-                    bad_or_empty_results[sim_folder.parent]["name"] = sim_folder.parent.name
-                    bad_or_empty_results[sim_folder.parent]["error"] = "Error in dslog.txt"
-                    break
-                if 'Integration terminated before reaching "StopTime"' in line:
-                    error = True
-                    bad_or_empty_results[sim_folder.parent] = {}
-                    bad_or_empty_results[sim_folder.parent]["path_to_analysis"] = sim_folder.parent
-                    bad_or_empty_results[sim_folder.parent]["name"] = sim_folder.parent.name
-                    bad_or_empty_results[sim_folder.parent]["error"] = "Error did not reach the stop time"
-                    break
-
-        if not error:
-            # Find the first .mat file in the sim_folder.parent
-            mat_file = list(sim_folder.parent.glob("*.mat"))
-            if not mat_file:
-                error = True
-                bad_or_empty_results[sim_folder.parent] = {}
-                bad_or_empty_results[sim_folder.parent]["path_to_analysis"] = sim_folder.parent
-                bad_or_empty_results[sim_folder.parent]["name"] = sim_folder.parent.name
-                bad_or_empty_results[sim_folder.parent]["error"] = "No result .mat file in root directory"
-                mat_file = None
-            elif len(mat_file) > 1:
-                print(f"Warning: multiple .mat files found in {sim_folder.parent}. Using the first one.")
-                mat_file = mat_file[0]
-            else:
-                # grab the first mat_file
-                mat_file = mat_file[0]
-
-        return error, bad_or_empty_results, mat_file
-
-    @classmethod
-    def _check_openmodelica_results(cls, sim_folder: Path) -> dict:
-        """Check if the OpenModelica simulation results are valid.
-
-        Args:
-            sim_folder (Path): Path to the simulation folder.
-
-        Returns:
-            dict: Dictionary of the bad or empty results.
-        """
-        bad_or_empty_results = {}
-        error = False
-        mat_file = None
-
-        # find if there is a directory with *_results
-        om_results_folder = list(sim_folder.parent.glob("*_results"))
-        if not om_results_folder:
-            # no results folder
-            error = True
-            bad_or_empty_results[sim_folder.parent] = {}
-            bad_or_empty_results[sim_folder.parent]["path_to_analysis"] = sim_folder.parent
-            bad_or_empty_results[sim_folder.parent]["name"] = sim_folder.parent.name
-            bad_or_empty_results[sim_folder.parent]["error"] = "No _results folder"
-        elif len(om_results_folder) > 1:
-            print(f"Warning: multiple _results folders found in {sim_folder.parent}. Please delete others.")
-        else:
-            # see if there is a .mat file in the results folder
-            mat_file = list(om_results_folder[0].glob("*.mat"))
-            if not mat_file:
-                # no .mat file, then this is an empty folder
-                error = True
-                bad_or_empty_results[sim_folder.parent] = {}
-                bad_or_empty_results[sim_folder.parent]["path_to_analysis"] = sim_folder.parent
-                bad_or_empty_results[sim_folder.parent]["name"] = sim_folder.parent.name
-                bad_or_empty_results[sim_folder.parent]["error"] = "No result .mat file in _results directory"
-            elif len(mat_file) > 1:
-                print(f"Warning: multiple .mat files found in {om_results_folder[0]}. Using the first one.")
-                # grab the first mat_file
-                mat_file = mat_file[0]
-            else:
-                # grab the first mat_file
-                mat_file = mat_file[0]
-                # check if the .mat file is empty
-                if mat_file.stat().st_size == 0:
-                    error = True
-                    bad_or_empty_results[sim_folder.parent] = {}
-                    bad_or_empty_results[sim_folder.parent]["path_to_analysis"] = sim_folder.parent
-                    bad_or_empty_results[sim_folder.parent]["name"] = sim_folder.parent.name
-                    bad_or_empty_results[sim_folder.parent]["error"] = "Empty .mat file in _results directory"
-                else:
-                    # check if the .mat file is a valid result file
-                    # this is a placeholder for now, but we can add more checks later
-                    pass
-
-        return error, bad_or_empty_results, mat_file
-
-    @classmethod
-    def get_list_of_valid_result_folders(cls, root_analysis_path: Path) -> (dict, dict):
+    def get_list_of_valid_result_folders(
+        cls, root_analysis_path: Path, index_path: Path | None = None, max_workers: int | None = None
+    ) -> tuple[dict, dict]:
         """Parse through the root_analysis_path and return a dict of valid
         result folders that can be loaded and processed. Also return dict of
-        folders that have simulation errors or empty results
+        folders that have simulation errors or empty results. The folders are checked
+        concurrently and, with an index_path, the folders that did not change since the
+        last call are not checked again, see ResultFolderScanner.
 
         Args:
             root_analysis_path (Path): Analysis folder to analyze.
+            index_path (Path, optional): File to keep the result of each folder between calls, e.g., in the
+                _results_summary folder of the analysis output. Defaults to None, which checks all of the folders.
+            max_workers (int, optional): Maximum number of folders to check at the same time. Defaults to None.
 
         Returns:
             (dict, dict): Tuple of dicts, first is a dict of valid results, second is bad or empty results
         """
-        results = {}
-        bad_or_empty_results = {}
-
-        # Find the completed simulations by looking for directories that have a district.mat file result
-        sim_folders = list(root_analysis_path.glob("*/package.mo"))
-        for sim_folder in sim_folders:
-            mat_file = None
-            # now go and check the dslog.txt file (assuming dymola was used) to
-            # find if there were errors
-            dslog_file = sim_folder.parent / "dslog.txt"
-
-            # search for any folder in the sim_folder with a prepended _results to the name
-            om_results_folder = list(sim_folder.parent.glob("*_results"))
-
-            error = False
-            if dslog_file.exists():
-                error, result, mat_file = cls._check_dymola_results(sim_folder)
-                # merge the bad_or_empty_results from the dymola check
-                bad_or_empty_results.update(result)
-            elif len(om_results_folder) > 0:
-                error, result, mat_file = cls._check_openmodelica_results(sim_folder)
-                # merge the bad_or_empty_results from the openmodelica check
-                bad_or_empty_results.update(result)
-            else:
-                # if here, then we don't know how to process the folder
-                error = True
-                bad_or_empty_results[sim_folder.parent] = {}
-                bad_or_empty_results[sim_folder.parent]["path_to_analysis"] = sim_folder.parent
-                bad_or_empty_results[sim_folder.parent]["name"] = sim_folder.parent.name
-                bad_or_empty_results[sim_folder.parent]["error"] = "No valid results found"
-
-            if error:
-                continue
-
-            # If we are here then there is likely a successful simulation. Now store it in a
-            # dictionary for later loading/processing
-
-            # Get the simulation name from the analysis_name.txt file
-            analysis_name_file = sim_folder.parent / "analysis_name.txt"
-            if analysis_name_file.exists():
-                with open(analysis_name_file) as f:
-                    analysis_name = f.read().strip()
-            else:
-                print(f"Warning: could not load analysis_name.txt file for {mat_file.parent}. Setting to directory name.")
-                analysis_name = mat_file.parent.name
-
-            results[analysis_name] = {
-                "path_to_analysis": sim_folder.parent,
-                "name": analysis_name,
-                "mat_path": mat_file,
-            }
-
-        return results, bad_or_empty_results
+        scanner = ResultFolderScanner(root_analysis_path, index_path=index_path, max_workers=max_workers)
+        return scanner.scan()
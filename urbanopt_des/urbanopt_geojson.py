@@ -2,15 +2,102 @@ import json
 import tempfile
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
 from geojson_modelica_translator.geojson.urbanopt_geojson import UrbanOptGeoJson
 from geopandas import GeoDataFrame
 from shapely.geometry import box
 
+# UTC offset (or Z) at the end of an ISO 8601 timestamp with a time
+TIMESTAMP_OFFSET_PATTERN = r"([T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)(?:Z|[+-]\d{2}:?\d{2})$"
+
+
+def to_local_datetime(values: pd.Series) -> pd.Series:
+    """Convert the timestamps to naive datetimes in the local time of each timestamp, i.e., the
+    UTC offset is dropped, not applied. This is the same as replacing the tzinfo of each timestamp
+    with None, but the offsets of the timestamps do not need to be the same (e.g., across DST).
+
+    Args:
+        values (pd.Series): ISO 8601 strings or datetimes
+
+    Returns:
+        pd.Series: Naive datetimes
+    """
+    codes = None
+    if values.dtype == object:
+        # the readings of the meters are on the same dates, so only parse each unique timestamp once
+        codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        timestamps = pd.Series(uniques).str.replace(TIMESTAMP_OFFSET_PATTERN, r"\1", regex=True)
+    else:
+        timestamps = values
+
+    timestamps = pd.to_datetime(timestamps, format="ISO8601")
+    if timestamps.dt.tz is not None:
+        timestamps = timestamps.dt.tz_localize(None)
+    if codes is None:
+        return timestamps
+    return pd.Series(timestamps.to_numpy()[codes], index=values.index, name=values.name)
+
+
+def flatten_meter_readings(buildings: list[tuple[str, list[dict]]]) -> pd.DataFrame | None:
+    """Return the readings of all of the meters of the buildings in one data frame. The readings are
+    flattened in one pass over the meters, and the meter_type and building_id of each reading are
+    categorical columns. The start_time and end_time are naive datetimes in the local time of the reading.
+
+    Args:
+        buildings (list[tuple[str, list[dict]]]): ID and list of meters (with the type and readings) of each building
+
+    Returns:
+        pd.DataFrame | None: One row per reading, in the order of the buildings, meters, and readings, with the
+            fields of the reading, meter_type, and building_id, or None if there are no readings
+    """
+    readings, counts, meter_codes, building_codes = [], [], [], []
+    meter_types, building_ids = {}, {}
+    for building_id, meters in buildings:
+        building_code = building_ids.setdefault(building_id, len(building_ids))
+        for meter in meters:
+            readings += meter["readings"]
+            counts.append(len(meter["readings"]))
+            meter_codes.append(meter_types.setdefault(meter["type"], len(meter_types)))
+            building_codes.append(building_code)
+
+    if not readings:
+        return None
+
+    meter_readings = pd.DataFrame.from_records(readings)
+    # the categories are sorted, so that grouping by the categories is in the same order as by the names
+    meter_readings["meter_type"] = pd.Categorical.from_codes(np.repeat(meter_codes, counts), list(meter_types)).reorder_categories(
+        sorted(meter_types)
+    )
+    meter_readings["building_id"] = pd.Categorical.from_codes(np.repeat(building_codes, counts), list(building_ids)).reorder_categories(
+        sorted(building_ids)
+    )
+    for column in ["start_time", "end_time"]:
+        if column in meter_readings.columns:
+            meter_readings[column] = to_local_datetime(meter_readings[column])
+    return meter_readings
+
 
 class DESGeoJSON(UrbanOptGeoJson):
     def __init__(self, filename: Path, building_ids=None, skip_validation=False):
         super().__init__(filename, building_ids, skip_validation)
 
+    def get_meter_readings(self) -> pd.DataFrame | None:
+        """Return the meter readings of all of the meters of all of the buildings in one data frame, see
+        flatten_meter_readings.
+
+        Returns:
+            pd.DataFrame | None: One row per reading with the fields of the reading, meter_type, and building_id,
+                or None if there are no readings
+        """
+        return flatten_meter_readings(
+            [
+                (feature["properties"]["id"], feature["properties"].get("meters", []))
+                for feature in self.data["features"]
+                if feature["properties"].get("type") == "Building"
+            ]
+        )
+
     def create_aggregated_representation(self, building_names: list[str]) -> None:
         """Go through the GeoJSON file and if it is of type Building, then aggregate the characteristics.
 
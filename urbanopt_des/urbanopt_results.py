@@ -1,12 +1,19 @@
 import json
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Union
 
+import numpy as np
 import pandas as pd
-from modelica_builder.modelica_mos_file import ModelicaMOS
 
-from .emissions import HourlyEmissionsData
+from .aggregations import AggregationGraph
+from .emissions import HistoricalEmissionsData, HourlyEmissionsData
+from .feature_report_cache import FeatureReportCache
+from .mos_writer import write_mos_file
+from .resolution_view import UpsampledView
 from .results_base import ResultsBase
+from .scaling import interval_scaling_factors
 
 # Allow use of chained pandas operations (df[df['A'] > 1]['B'] instead of df.loc[df['A'] > 1, 'B'] = 10 )
 # This prevents multiple warnings from being displayed
@@ -21,6 +28,9 @@ class URBANoptResults(ResultsBase):
     the detailed building end uses are not part of the DES results, so they need to be
     concatenated with the Modelica results."""
 
+    # attributes that are not saved in a snapshot, the positions of the 15 minute views are calculated again
+    SNAPSHOT_EXCLUDE = [*ResultsBase.SNAPSHOT_EXCLUDE, "_data_15min_positions", "_data_loads_15min_positions"]
+
     def __init__(self, uo_path: Path, scenario_name: str) -> None:
         """Class for holding the results of an URBANopt SDK simulation. This class will handle the post processing
         necessary to create data frames that can be easily compared with other simulation.
@@ -52,21 +62,36 @@ class URBANoptResults(ResultsBase):
         for path in [self.output_path, self.scenario_output_path]:
             path.mkdir(parents=True, exist_ok=True)
 
+        # cache of the parsed feature reports and building loads, which rarely change once
+        # the OpenStudio simulations are complete
+        self.feature_report_cache = FeatureReportCache(self.output_path / "feature_report_cache")
+
         # initialize the analysis display name to the scenario name, but this can be changed
         self.display_name = scenario_name
         print(f"URBANopt analysis name {self.display_name}")
 
-        # This is the default data resolution, which has to be 60 minutes!
+        # This is the default data resolution, which has to be 60 minutes! The 15 minute data
+        # are a lazy view of the hourly data unless a data frame is assigned to data_15min.
         self.data = None
         self.data_15min = None
+        # positions of the lazy 15 minute views, which are reused while the hourly data are the same
+        self._data_15min_positions = None
+        self._data_loads_15min_positions = None
         self.data_monthly = None
         self.data_annual = None
+        # optional daily and time-of-use rollups, see URBANoptAnalysis.create_rollups
+        self.data_daily = None
+        self.data_tou = None
 
         # objects to store building loads
         self.data_loads = None
         self.data_loads_15min = None
         self.data_loads_monthly = None
         self.data_loads_annual = None
+        self.data_loads_daily = None
+        self.data_loads_tou = None
+        # columns of each load for every building, set when the building loads are processed
+        self.data_loads_columns = None
 
         # end use summaries
         self.end_use_summary = None
@@ -74,9 +99,52 @@ class URBANoptResults(ResultsBase):
         # grid metrics
         self.grid_metrics_daily = None
         self.grid_metrics_annual = None
+        self.load_duration_curves = None
+        self.load_duration_sketch = None
+        self.building_grid_metrics = None
+        self.building_carbon_emissions = None
 
         self.building_characteristics = {}
 
+    @property
+    def data_15min(self) -> Union[pd.DataFrame, UpsampledView, None]:
+        """Return the 15 minute data. Unless a data frame was assigned, this is a view of the hourly
+        data that only materializes the columns that are selected."""
+        if self._data_15min is not None:
+            return self._data_15min
+        if self.data is None:
+            return None
+        return self._upsampled_view(self.data, "_data_15min_positions")
+
+    @data_15min.setter
+    def data_15min(self, value: Union[pd.DataFrame, None]) -> None:
+        self._data_15min = value
+
+    @property
+    def data_loads_15min(self) -> Union[pd.DataFrame, UpsampledView, None]:
+        """Return the 15 minute building loads. Unless a data frame was assigned, this is a view of
+        the hourly building loads."""
+        if self._data_loads_15min is not None:
+            return self._data_loads_15min
+        if self.data_loads is None:
+            return None
+        return self._upsampled_view(self.data_loads, "_data_loads_15min_positions")
+
+    @data_loads_15min.setter
+    def data_loads_15min(self, value: Union[pd.DataFrame, None]) -> None:
+        self._data_loads_15min = value
+
+    def _upsampled_view(self, source: pd.DataFrame, cache_name: str) -> UpsampledView:
+        """Return the 15 minute view of the source. The positions of the view are calculated once per source
+        and index, and they are kept with a weak reference to the source so that the cache does not keep
+        a replaced (or spilled, see ResultsBase.use_frame_store) source in memory."""
+        cached = getattr(self, cache_name, None)
+        if cached is not None and cached[0]() is source and cached[1] is source.index:
+            return UpsampledView(source, "15min", cached[2], cached[3])
+        view = UpsampledView(source, "15min")
+        setattr(self, cache_name, (weakref.ref(source), source.index, view.positions, view.index))
+        return view
+
     def calculate_grid_metrics(
         self,
         meters: list[str] = [
@@ -88,128 +156,60 @@ class URBANoptResults(ResultsBase):
             "District Loop Energy",
         ],
     ):
-        # TODO: move this to a base class!!!
-
-        """Calculate the grid metrics for this building."""
-        # recreate the grid_metrics_daily data frame in case we are overwriting it.
-        self.grid_metrics_daily = None
-
+        """Calculate the grid metrics for this building. The first two days are skipped due to
+        warm up times that have yet to be resolved."""
         # skip n-days at the beginning of the grid metrics, due to
         # warm up times that have yet to be resolved.
-        self.data_15min_to_process = self.data_15min.copy()
         n_days = 2
         skip_time = n_days * 96
-        self.data_15min_to_process = self.data_15min_to_process.iloc[skip_time:]
-        # # END NEED TO FIX
-
-        for meter in meters:
-            df_tmp = self.data_15min_to_process.copy()
-            df_tmp = df_tmp.groupby([pd.Grouper(freq="1d")])[meter].agg(["max", "idxmax", "min", "idxmin", "mean", "sum"])
-
-            # update the column names and save back into the results data frame
-            df_tmp.columns = [
-                f"{meter} Max",
-                f"{meter} Max Datetime",
-                f"{meter} Min",
-                f"{meter} Min Datetime",
-                f"{meter} Mean",
-                f"{meter} Sum",
-            ]
+        self.data_15min_to_process = self.data_15min.iloc[skip_time:]
 
-            # calculate the peak to valley ratio
-            df_tmp[f"{meter} PVR"] = df_tmp[f"{meter} Max"] / df_tmp[f"{meter} Min"]
+        return self.calculate_annual_grid_metrics(self.data_15min_to_process, self.data, meters)
 
-            # calculate the load factor
-            df_tmp[f"{meter} Load Factor"] = df_tmp[f"{meter} Mean"] / df_tmp[f"{meter} Max"]
+    def calculate_building_grid_metrics(self, building_names: list[str], meter: str = "Electricity:Facility") -> pd.DataFrame:
+        """Calculate the grid metrics (peak, load factor, ramping, etc.) of a meter for every building in
+        bulk. The same warm up days as calculate_grid_metrics are skipped.
 
-            # add in the system ramping, which has to be calculated from the original data frame
-            df_tmp2 = self.data_15min_to_process.copy()
-            df_tmp2[f"{meter} System Ramping"] = df_tmp2[meter].diff().abs().fillna(0)
-            df_tmp2 = df_tmp2.groupby([pd.Grouper(freq="1d")])[f"{meter} System Ramping"].agg(["sum"]) / 1e6
-            df_tmp2.columns = [f"{meter} System Ramping"]
+        Args:
+            building_names (list[str]): IDs of the buildings
+            meter (str, optional): Name of the meter without the building, the column is "{meter} Building {id}".
+                Defaults to "Electricity:Facility".
 
-            df_tmp = pd.concat([df_tmp, df_tmp2], axis=1, join="inner")
-            if self.grid_metrics_daily is None:
-                self.grid_metrics_daily = df_tmp
-            else:
-                self.grid_metrics_daily = pd.concat([self.grid_metrics_daily, df_tmp], axis=1, join="inner")
-
-        # aggregate the df_daily daily data to annual metrics. For the maxes/mins, we only want the max of the max
-        # and the min of the min.
-        df_tmp = self.grid_metrics_daily.copy()
-        aggs = {}
-        for meter in meters:
-            aggs[f"{meter} Max"] = ["max", "idxmax", "sum"]
-            aggs[f"{meter} Min"] = ["min", "idxmin"]
-            aggs[f"{meter} PVR"] = ["max", "min", "sum", "mean"]
-            aggs[f"{meter} Load Factor"] = ["max", "min", "sum", "mean"]
-            aggs[f"{meter} System Ramping"] = ["max", "min", "sum", "mean"]
-
-        df_tmp = df_tmp.groupby([pd.Grouper(freq="YE")]).agg(aggs)
-        # rename the columns
-        df_tmp.columns = [f"{c[0]} {c[1]}" for c in df_tmp.columns]
-        # this is a strange section, the idxmax/idxmin are the indexes where the max/min values
-        # were found, but we want the timestamps from the original dataframe, so go get them!
-        for meter in meters:
-            # there is only one year of data, so grab the idmax/idmin of the first element. If
-            # we expand to multiple years, then this will need to be updated
-            id_lookup = df_tmp[f"{meter} Max idxmax"][0]
-            df_tmp[f"{meter} Max idxmax"] = self.grid_metrics_daily.loc[id_lookup][f"{meter} Max Datetime"]
-            id_lookup = df_tmp[f"{meter} Min idxmin"][0]
-            df_tmp[f"{meter} Min idxmin"] = self.grid_metrics_daily.loc[id_lookup][f"{meter} Min Datetime"]
-            # rename these two columns to remove the idxmax/idxmin nomenclature
-            df_tmp = df_tmp.rename(
-                columns={
-                    f"{meter} Max idxmax": f"{meter} Max Datetime",
-                    f"{meter} Min idxmin": f"{meter} Min Datetime",
-                }
-            )
+        Returns:
+            pd.DataFrame: One row per building and one column per metric, see ResultsBase.calculate_bulk_grid_metrics
+        """
+        n_days = 2
+        skip_time = n_days * 96
+        columns = {building_id: f"{meter} Building {building_id}" for building_id in building_names}
+        self.building_grid_metrics = self.calculate_bulk_grid_metrics(self.data_15min.iloc[skip_time:], columns)
 
-        # Add the MWh related metrics, can't sum up the 15 minute data, so we have to sum up the hourly
-        df_tmp["Total Electricity"] = self.data["Total Electricity"].resample("YE").sum() / 1e6  # MWh
-        df_tmp["Total Natural Gas"] = self.data["Total Natural Gas"].resample("YE").sum() / 1e6  # MWh
-        df_tmp["Total Thermal Cooling Energy"] = self.data["Total Thermal Cooling Energy"].resample("YE").sum() / 1e6  # MWh
-        df_tmp["Total Thermal Heating Energy"] = self.data["Total Thermal Heating Energy"].resample("YE").sum() / 1e6  # MWh
+        return self.building_grid_metrics
 
-        # graph the top 5 peak values for each of the meters
-        meters = [
-            "Total Natural Gas",
-            "Total Electricity",
-            "Total Thermal Cooling Energy",
-            "Total Thermal Heating Energy",
-        ]
-        for meter in meters:
-            peaks = []
-            df_to_proc = self.data_15min_to_process.copy()
-            if "Cooling" in meter:
-                # values are negative, so ascending is actually descending
-                df_to_proc = df_to_proc.sort_values(by=meter, ascending=True)
-            else:
-                df_to_proc = df_to_proc.sort_values(by=meter, ascending=False)
-            df_to_proc = df_to_proc.head(50)
-
-            # save the top 5 values to the df_tmp
-            i = 0
-            for dt, row in df_to_proc.iterrows():
-                peak_value = row[meter] / 1e6  # MWh
-                if peak_value not in peaks or peak_value == 0:
-                    peaks.append(peak_value)
-                    df_tmp[f"{meter} Peak {i + 1}"] = peak_value
-                    if peak_value != 0:
-                        df_tmp[f"{meter} Peak Date Time {i + 1}"] = dt
-                    else:
-                        df_tmp[f"{meter} Peak Date Time {i + 1}"] = "N/A"
-                    i += 1
-
-                if i == 5:
-                    break
-
-        # transpose and save
-        df_tmp = df_tmp.T
-        df_tmp.index.name = "Grid Metric"
-        self.grid_metrics_annual = df_tmp
-
-        return self.grid_metrics_annual
+    def calculate_building_carbon_emissions(
+        self,
+        hourly_emissions_data: Union[HourlyEmissionsData, HistoricalEmissionsData],
+        building_names: list[str],
+        egrid_subregion: str = "RFCE",
+        resolution: str = "60min",
+    ) -> pd.DataFrame:
+        """Calculate the carbon emissions of every building from the building's electricity and natural gas
+        meters. See ResultsBase.carbon_emissions_by_building.
+
+        Args:
+            hourly_emissions_data (Union[HourlyEmissionsData, HistoricalEmissionsData]): Data object with the emissions.
+            building_names (list[str]): IDs of the buildings
+            egrid_subregion (str, optional): EPA's 4-letter identifier for the emissions subregion. Defaults to "RFCE".
+            resolution (str, optional): Resolution of the data, "60min" or "15min". Defaults to "60min".
+
+        Returns:
+            pd.DataFrame: Electricity, Natural Gas, and Total Carbon Emissions Building {id} in mtCO2e
+        """
+        timeseries = self.data_15min if resolution == "15min" else self.data
+        self.building_carbon_emissions = self.carbon_emissions_by_building(
+            timeseries, hourly_emissions_data, building_names, ["Electricity:Facility"], ["NaturalGas:Facility"], egrid_subregion
+        )
+
+        return self.building_carbon_emissions
 
     def save_dataframes(self) -> None:
         """Save the data and data_15min dataframes to the outputs directory."""
@@ -349,46 +349,127 @@ class URBANoptResults(ResultsBase):
                 "Total Building Water Systems Natural Gas",
             ]
 
-            # Go through each building_aggs and create the aggregation
+            # check to make sure that each of the agg_columns have been defined
             for key, value in building_aggs.items():
-                # check to make sure that each of the agg_columns have been defined
                 if not value["agg_columns"]:
                     raise Exception(f"Agg columns for {key} have not been defined")
 
-                # sum up the columns in the agg_columns defined above
-                self.data[key] = self.data[value["agg_columns"]].sum(axis=1)
-                self.data_15min[key] = self.data_15min[value["agg_columns"]].sum(axis=1)
+            totals = {key: value["agg_columns"] for key, value in building_aggs.items()}
 
             # Since the dataframe needs to be consistent with the Modelica and DES dataframes, add in the
-            # following columns, which have no totaling or aggregating
-            self.data["Total Electricity"] = self.data["Total Building Electricity"]
-            self.data_15min["Total Electricity"] = self.data_15min["Total Building Electricity"]
-            self.data["Total Natural Gas"] = self.data["Total Building Natural Gas"]
-            self.data_15min["Total Natural Gas"] = self.data_15min["Total Building Natural Gas"]
-            self.data["Total ETS Electricity"] = 0
-            self.data_15min["Total ETS Electricity"] = 0
-            self.data["Total Thermal Cooling Energy"] = 0
-            self.data_15min["Total Thermal Cooling Energy"] = 0
-            self.data["Total Thermal Heating Energy"] = 0
-            self.data_15min["Total Thermal Heating Energy"] = 0
-            self.data["District Loop Energy"] = 0
-            self.data_15min["District Loop Energy"] = 0
+            # following columns, which have no totaling or aggregating (empty lists are zeros)
+            totals["Total Electricity"] = ["Total Building Electricity"]
+            totals["Total Natural Gas"] = ["Total Building Natural Gas"]
+            totals["Total ETS Electricity"] = []
+            totals["Total Thermal Cooling Energy"] = []
+            totals["Total Thermal Heating Energy"] = []
+            totals["District Loop Energy"] = []
             # Now mix energy types for the totals
-            self.data["Total Energy"] = self.data["Total Electricity"] + self.data["Total Natural Gas"]
-            self.data_15min["Total Energy"] = self.data_15min["Total Electricity"] + self.data_15min["Total Natural Gas"]
-            self.data["Total Building and ETS Energy"] = (
-                self.data["Total Building Electricity"] + self.data["Total Building Natural Gas"] + self.data["Total ETS Electricity"]
-            )
-            self.data_15min["Total Building and ETS Energy"] = (
-                self.data_15min["Total Building Electricity"]
-                + self.data_15min["Total Building Natural Gas"]
-                + self.data_15min["Total ETS Electricity"]
-            )
+            totals["Total Energy"] = ["Total Electricity", "Total Natural Gas"]
+            totals["Total Building and ETS Energy"] = [
+                "Total Building Electricity",
+                "Total Building Natural Gas",
+                "Total ETS Electricity",
+            ]
+
+            # compute all of the totals for both resolutions, the graph is compiled
+            # once and reused since both data frames have the same columns. The 15 minute
+            # view of the hourly data already includes the new totals.
+            aggregations = AggregationGraph(totals)
+            for df in [self.data, self.data_15min]:
+                if isinstance(df, pd.DataFrame):
+                    aggregations.apply(df)
 
         finally:
             pass
 
-    def process_results(self, building_names: list[str], year_of_data: int = 2017) -> None:
+    def _read_feature_report(self, building_id: str, year_of_data: int, use_cache: bool = True) -> pd.DataFrame:
+        """Return the building's feature report with the columns renamed to include the building id,
+        converted units, and the datetime index remapped to the year_of_data. The parsed data frame
+        is loaded from the feature report cache if the source file has not changed.
+
+        Args:
+            building_id (str): ID of the building, which is the name of the run directory
+            year_of_data (int): Year of the data used for the datetime index
+            use_cache (bool, optional): Read and write the feature report cache. Defaults to True.
+
+        Returns:
+            pd.DataFrame: Processed feature report
+        """
+        search_dir = self.path / "run" / f"{self.scenario_name}" / f"{building_id}"
+        report_file = self._search_for_file_in_reports(search_dir, "default_feature_report.csv")
+        if not report_file.exists():
+            raise Exception(f"Could not find default_feature_report.csv in {search_dir}")
+
+        cache_name = f"feature_report_{building_id}"
+        if use_cache:
+            cache_key = self.feature_report_cache.cache_key(
+                report_file,
+                columns=self.get_urbanopt_feature_report_columns(),
+                building_id=building_id,
+                year_of_data=year_of_data,
+            )
+            feature_report = self.feature_report_cache.load(cache_name, cache_key)
+            if feature_report is not None:
+                print(f"Loaded building time series results for {building_id} from cache")
+                return feature_report
+
+        feature_report = self.get_urbanopt_default_feature_report(search_dir)
+
+        # rename and convert units in the feature_report before concatenating with the others
+        for (
+            column_name,
+            feature_column,
+        ) in self.get_urbanopt_feature_report_columns().items():
+            if feature_column.get("skip_renaming", False):
+                continue
+            if column_name not in feature_report.columns and feature_column.get("optional", False):
+                continue
+            # set the new column name to include the building number
+            new_column_name = f"{feature_column['name']} Building {building_id}"
+            feature_report[new_column_name] = feature_report[column_name] * feature_column["conversion"]
+            feature_report = feature_report.drop(columns=[column_name])
+
+        # convert Datetime column in data frame to be datetime from the string. The year
+        # should be set to a year that has the day of week starting correctly for the real data
+        # This defaults to year_of_data
+        feature_report["Datetime"] = self._replace_year(
+            pd.to_datetime(feature_report["Datetime"], format="%Y/%m/%d %H:%M:%S"), year_of_data
+        )
+
+        # set the datetime column and make it the index
+        feature_report = feature_report.set_index("Datetime")
+
+        if use_cache:
+            self.feature_report_cache.save(cache_name, cache_key, feature_report)
+
+        return feature_report
+
+    def _replace_year(self, datetimes: pd.Series, year: int) -> pd.Series:
+        """Return the datetimes with the year replaced, which is the vectorized version of
+        calling datetime.replace(year=year) on each value.
+
+        Args:
+            datetimes (pd.Series): Series of datetimes
+            year (int): New year of the datetimes
+
+        Returns:
+            pd.Series: Series of datetimes with the new year
+        """
+        return pd.to_datetime(
+            pd.DataFrame(
+                {
+                    "year": year,
+                    "month": datetimes.dt.month,
+                    "day": datetimes.dt.day,
+                    "hour": datetimes.dt.hour,
+                    "minute": datetimes.dt.minute,
+                    "second": datetimes.dt.second,
+                }
+            )
+        )
+
+    def process_results(self, building_names: list[str], year_of_data: int = 2017, use_cache: bool = True) -> None:
         """The building-by-building end uses are only available in each run directory's feature
         report. This method will create a dataframe with the end uses for each building.
 
@@ -398,6 +479,7 @@ class URBANoptResults(ResultsBase):
             scenario_name (str): Name of the scenario that was run with URBANopt
             building_name (list): Must be passed since the names come from the GeoJSON which we don't load
             year_of_data (int): Year of the data. This is used to set the year of the datetime index. Defaults to 2017
+            use_cache (bool): Load unchanged feature reports from the cache in the output directory. Defaults to True
         """
         # reset the data to None in case we are reprocessing
         self.data = None
@@ -415,28 +497,7 @@ class URBANoptResults(ResultsBase):
             self.building_characteristics[building_id] = json.loads(feature_json.read_text())
 
             print(f"Processing building time series results {building_id}")
-            feature_report = self.get_urbanopt_default_feature_report(self.path / "run" / f"{self.scenario_name}" / f"{building_id}")
-
-            # rename and convert units in the feature_report before concatenating with the others
-            for (
-                column_name,
-                feature_column,
-            ) in self.get_urbanopt_feature_report_columns().items():
-                if feature_column.get("skip_renaming", False):
-                    continue
-                # set the new column name to include the building number
-                new_column_name = f"{feature_column['name']} Building {building_id}"
-                feature_report[new_column_name] = feature_report[column_name] * feature_column["conversion"]
-                feature_report = feature_report.drop(columns=[column_name])
-
-            # convert Datetime column in data frame to be datetime from the string. The year
-            # should be set to a year that has the day of week starting correctly for the real data
-            # This defaults to year_of_data
-            feature_report["Datetime"] = pd.to_datetime(feature_report["Datetime"], format="%Y/%m/%d %H:%M:%S")
-            feature_report["Datetime"] = feature_report["Datetime"].apply(lambda x: x.replace(year=year_of_data))
-
-            # set the datetime column and make it the index
-            feature_report = feature_report.set_index("Datetime")
+            feature_report = self._read_feature_report(building_id, year_of_data, use_cache)
 
             if self.data is None:
                 self.data = feature_report
@@ -448,8 +509,9 @@ class URBANoptResults(ResultsBase):
 
         # Upsample to 15 minutes, provides a higher resolution date for
         # the end uses for comparison sake. This only works for specific
-        # variables such as energy (kWh, Btu, etc.)
-        self.data_15min = self.data.resample("15min").ffill()
+        # variables such as energy (kWh, Btu, etc.). The 15 minute data are a
+        # view of the hourly data, so reset any data frame that was assigned.
+        self.data_15min = None
 
         # create the aggregations for the data
         self.create_aggregations(building_names)
@@ -458,7 +520,56 @@ class URBANoptResults(ResultsBase):
 
         return True
 
-    def process_load_results(self, building_names: list[str], year_of_data: int = 2017) -> None:
+    def _read_building_loads(self, building_id: str, year_of_data: int, use_cache: bool = True) -> pd.DataFrame:
+        """Return the building's loads with the columns renamed to include the building id and
+        the datetime index remapped to the year_of_data. The parsed data frame is loaded from the
+        feature report cache if the source file has not changed.
+
+        Args:
+            building_id (str): ID of the building, which is the name of the run directory
+            year_of_data (int): Year of the data used for the datetime index
+            use_cache (bool, optional): Read and write the feature report cache. Defaults to True.
+
+        Returns:
+            pd.DataFrame: Processed building loads
+        """
+        search_dir = self.path / "run" / f"{self.scenario_name}" / f"{building_id}"
+        report_file = self._search_for_file_in_reports(search_dir, "building_loads.csv", measure_name="export_modelica_loads")
+        if not report_file.exists():
+            raise Exception(f"Could not find building_loads.csv in {search_dir}")
+
+        cache_name = f"building_loads_{building_id}"
+        if use_cache:
+            cache_key = self.feature_report_cache.cache_key(
+                report_file,
+                columns=self.get_urbanopt_building_loads_columns(),
+                building_id=building_id,
+                year_of_data=year_of_data,
+            )
+            load_report = self.feature_report_cache.load(cache_name, cache_key)
+            if load_report is not None:
+                print(f"Loaded building time series loads for {building_id} from cache")
+                return load_report
+
+        load_report = self.get_urbanopt_export_building_loads(search_dir)
+
+        # convert Datetime column in data frame to be datetime from the string. The year
+        # should be set to a year that has the day of week starting correctly for the real data
+        # This defaults to year_of_data
+        load_report["Datetime"] = self._replace_year(pd.to_datetime(load_report["Datetime"], format="%m/%d/%Y %H:%M"), year_of_data)
+
+        # set the datetime column as the index and relabel all of the columns to include the
+        # building id in one pass
+        load_report = load_report.set_index("Datetime").add_suffix(f" Building {building_id}")
+
+        if use_cache:
+            self.feature_report_cache.save(cache_name, cache_key, load_report)
+
+        return load_report
+
+    def process_load_results(
+        self, building_names: list[str], year_of_data: int = 2017, use_cache: bool = True, max_workers: Union[int, None] = None
+    ) -> None:
         """The building-by-building loads are results of an OpenStudio measure. The data are only
         available in each run directory's modelica_report. This method will create a dataframe with
         the end uses for each building.
@@ -467,54 +578,52 @@ class URBANoptResults(ResultsBase):
             scenario_name (str): Name of the scenario that was run with URBANopt
             building_name (list): Must be passed since the names come from the GeoJSON which we don't load
             year_of_data (int): Year of the data. This is used to set the year of the datetime index. Defaults to 2017
+            use_cache (bool): Load unchanged building loads from the cache in the output directory. Defaults to True
+            max_workers (int): Number of threads used to read the buildings' loads. Defaults to None, which uses
+                the ThreadPoolExecutor default. Set to 1 to read the buildings serially.
         """
         self.data_loads = None  # TODO: init this above and make a note what it is
 
-        for building_id in building_names:
-            print(f"Processing building time series loads for {building_id}")
-            load_report = self.get_urbanopt_export_building_loads(self.path / "run" / f"{self.scenario_name}" / f"{building_id}")
-
-            # update the column names to include the building id
-            for column in load_report.columns:
-                # skip if Datetime
-                if column == "Datetime":
-                    continue
-                load_report = load_report.rename(columns={column: f"{column} Building {building_id}"})
-
-            # convert Datetime column in data frame to be datetime from the string. The year
-            # should be set to a year that has the day of week starting correctly for the real data
-            # This defaults to year_of_data
-            load_report["Datetime"] = pd.to_datetime(load_report["Datetime"], format="%m/%d/%Y %H:%M")
-            load_report["Datetime"] = load_report["Datetime"].apply(lambda x: x.replace(year=year_of_data))
-
-            # set the datetime column and make it the index
-            load_report = load_report.set_index("Datetime")
-
-            if self.data_loads is None:
-                self.data_loads = load_report
-            else:
-                # remove the datetime from the second data frame
-                self.data_loads = pd.concat([self.data_loads, load_report], axis=1, join="inner")
+        # read all of the buildings, then join them once instead of growing the data frame per building
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            load_reports = list(
+                executor.map(lambda building_id: self._read_building_loads(building_id, year_of_data, use_cache), building_names)
+            )
+        self.data_loads = pd.concat(load_reports, axis=1, join="inner")
+
+        # index of each load's column for every building, which is used to create the totals
+        # without searching the column names
+        self.data_loads_columns = {
+            load_name: [f"{column_name} Building {building_id}" for building_id in building_names]
+            for load_name, column_name in self.get_urbanopt_building_loads_columns().items()
+            if column_name != "Datetime"
+        }
 
         # aggregate the data to create totals
-        self.data_loads["TotalCoolingSensibleLoad"] = self.data_loads.filter(like="TotalCoolingSensibleLoad").sum(axis=1)
-        self.data_loads["TotalHeatingSensibleLoad"] = self.data_loads.filter(like="TotalHeatingSensibleLoad").sum(axis=1)
-        self.data_loads["TotalWaterHeating"] = self.data_loads.filter(like="TotalWaterHeating").sum(axis=1)
-        self.data_loads["TotalSensibleLoad"] = self.data_loads["TotalCoolingSensibleLoad"] + self.data_loads["TotalHeatingSensibleLoad"]
-        self.data_loads["TotalSensibleLoadWithWaterHeating"] = self.data_loads["TotalSensibleLoad"] + self.data_loads["TotalWaterHeating"]
+        aggregations = AggregationGraph(
+            {
+                "TotalCoolingSensibleLoad": self.data_loads_columns["TotalCoolingSensibleLoad"],
+                "TotalHeatingSensibleLoad": self.data_loads_columns["TotalHeatingSensibleLoad"],
+                "TotalWaterHeating": self.data_loads_columns["TotalWaterHeating"],
+                "TotalSensibleLoad": ["TotalCoolingSensibleLoad", "TotalHeatingSensibleLoad"],
+                "TotalSensibleLoadWithWaterHeating": ["TotalSensibleLoad", "TotalWaterHeating"],
+            }
+        )
+        aggregations.apply(self.data_loads)
 
         # self.data_loads["Total Building Natural Gas"] = self.data_loads.filter(like="NaturalGas").sum(axis=1)
 
         # Upsample to 15 minutes, provides a higher resolution date for
         # the end uses for comparison sake. This only works for specific
-        # variables such as energy (kWh, Btu, etc.)
-        self.data_loads_15min = self.data_loads.resample("15min").ffill()
+        # variables such as energy (kWh, Btu, etc.). The 15 minute data are a
+        # view of the hourly data, so reset any data frame that was assigned.
+        self.data_loads_15min = None
 
         return True
 
     def calculate_carbon_emissions(
         self,
-        hourly_emissions_data: HourlyEmissionsData,
+        hourly_emissions_data: Union[HourlyEmissionsData, HistoricalEmissionsData],
         egrid_subregion: str = "RFCE",
         future_year: int = 2045,
     ):
@@ -523,38 +632,40 @@ class URBANoptResults(ResultsBase):
         for the correct year, but all the regions.
 
         Args:
-            hourly_emissions_data (HourlyEmissionsData): Data object with the emissions.
+            hourly_emissions_data (Union[HourlyEmissionsData, HistoricalEmissionsData]): Data object with the emissions.
             egrid_subregion (str): EPA's 4-letter identifier for the emissions subregion.
             future_year (int, optional): Year of the emission data, used to assign the correct column name, that is all. Defaults to 2045.
         """
-        # for some reason, the datafile has a `c` appended to the end of the subregion, probably for Cambium
-        lookup_egrid_subregion = egrid_subregion + "c"
-
         # multiply the hourly emissions hourly data by the min_60_with_buildings data, but first, verify that the lengths are the same.
-        if len(hourly_emissions_data.data) != len(self.data):
-            raise Exception(
-                f"Length of emissions data {len(hourly_emissions_data.data)} does not match the length of the min_60_with_buildings data {len(self.data)}."
-            )
-
-        # also verify the length of the other_fuels
-        if len(hourly_emissions_data.other_fuels) != len(self.data):
+        if len(hourly_emissions_data.index) != len(self.data):
             raise Exception(
-                f"Length of other fuel emission data {len(hourly_emissions_data.data)} does not match the length of the min_60_with_buildings data {len(self.min_60_with_buildings)}."
+                f"Length of emissions data {len(hourly_emissions_data.index)} does not match the length of the min_60_with_buildings data {len(self.data)}."
             )
 
-        # Calculate the natural gas emissions, emissions data is in kg/MWh so Wh->MWh, then divide by another 1000 to get mtCO2e
+        # Calculate the natural gas emissions, the other fuel emission factors are a scalar in kg/MWh so Wh->MWh, then
+        # divide by another 1000 to get mtCO2e
         self.data["Total Building Natural Gas Carbon Emissions"] = (
             self.data["Total Building Natural Gas"] * hourly_emissions_data.other_fuels["natural_gas"] / 1e6 / 1000
         )
         self.data["Total Natural Gas Carbon Emissions"] = self.data["Total Building Natural Gas Carbon Emissions"]
 
+        # Calculate the emissions of the other fuels of all of the buildings (e.g., propane and fuel oil), if the
+        # buildings have the meters
+        other_fuel_emissions = self.other_fuel_emissions(self.data, hourly_emissions_data.other_fuels)
+        if other_fuel_emissions is not None:
+            self.data["Total Other Fuels Carbon Emissions"] = other_fuel_emissions
+        else:
+            other_fuel_emissions = 0
+
         # Calculate the electricity carbon emissions, emissions data is in kg/MWh, so Wh->Mwh, then divide by another 1000 to get mtCO2e
         self.data[f"Total Electricity Carbon Emissions {future_year}"] = (
-            self.data["Total Electricity"] * hourly_emissions_data.data[lookup_egrid_subregion] / 1e6 / 1000
+            self.data["Total Electricity"] * hourly_emissions_data.factors_at(self.data.index, egrid_subregion) / 1e6 / 1000
         )
         # units are in kg, convert to metric tons
         self.data[f"Total Carbon Emissions {future_year}"] = (
-            self.data["Total Natural Gas Carbon Emissions"] + self.data[f"Total Electricity Carbon Emissions {future_year}"]
+            self.data["Total Natural Gas Carbon Emissions"]
+            + self.data[f"Total Electricity Carbon Emissions {future_year}"]
+            + other_fuel_emissions
         )
 
     def scale_results(
@@ -565,7 +676,21 @@ class URBANoptResults(ResultsBase):
     ) -> None:
         """Scale all of the OpenStudio results by a set of scalars. This should only be used
         if there are no calibrated models and we need to keep the magnitude of the results within
-        range for comparison."""
+        range for comparison.
+
+        The scalars are billing periods (start_time and end_time, inclusive) with an electricity
+        and natural gas scaling factor for a building_id. The periods are joined to the hourly and
+        15 minute data to create a factor for each timestamp, building, and fuel, which are then
+        applied to all of the buildings at once. If the billing periods of a building overlap, then
+        each period is applied, so the timestamps that they share are scaled by the product of the
+        factors. The aggregations are not updated, so call `create_aggregations` after scaling.
+
+        Args:
+            scalars (pd.DataFrame): Scalars with start_time, end_time, building_id, scaling_factor_electricity,
+                and scaling_factor_natural_gas columns. NaN scaling factors are skipped.
+            year_of_data (int, optional): Year of the simulation data. Defaults to 2017.
+            year_of_meters (int, optional): Year of the meter data to apply. Defaults to 2021.
+        """
         # create a list of meter names that will be scaled. These are hard coded and will
         # have the building ID appended to the name for each building
         meter_names = [
@@ -592,33 +717,40 @@ class URBANoptResults(ResultsBase):
             "DistrictHeating:Facility Building",  # not scaled, yet
         ]
 
-        meter_names_for_building = []
-        for building_id in scalars["building_id"].unique():
-            meter_names_for_building = [meter_name + f" {building_id}" for meter_name in meter_names]
-
-        for df in [self.data, self.data_15min]:
-            # for each building_id in the scalar dataframe. Be careful not
-            # to apply scaling factors to the same building twice from multiple
-            # files.
-            elec_meters = [meter_name for meter_name in meter_names_for_building if "Electricity" in meter_name]
-            ng_meters = [meter_name for meter_name in meter_names_for_building if "NaturalGas" in meter_name]
-            for meter_type in ["Electricity", "NaturalGas"]:
-                # for each row in the analysis results dataframe, grab the scalar and multiply it by the meter
-                # print(f"Applying scalars for meter year {year_of_meters}, sim year {year_of_data}, building {building_id}, and meter {meter_type}")
-                for _, scalar in scalars[scalars["start_time"].dt.year == year_of_meters].iterrows():
-                    # this is strange, but we compare the year of the meter with the year of the simulation, which
-                    # can be different. So convert the 'start_time' and 'end_time' of the meters to be the year of the
-                    # dataframe data
-                    scalar["start_time"] = scalar["start_time"].replace(year=year_of_data)
-                    scalar["end_time"] = scalar["end_time"].replace(year=year_of_data)
-                    row_filter = (df.index >= scalar["start_time"]) & (df.index <= scalar["end_time"])
-                    elec_scalar = scalar["scaling_factor_electricity"]
-                    ng_scalar = scalar["scaling_factor_natural_gas"]
-                    # print(f"data range: {scalar['start_time']} to {scalar['end_time']} with elec scalar {elec_scalar} and ng scalar {ng_scalar}")
-                    if meter_type == "Electricity" and elec_scalar is not None and not pd.isna(elec_scalar):
-                        df.loc[row_filter, elec_meters] = df.loc[row_filter, elec_meters] * elec_scalar
-                    elif meter_type == "NaturalGas" and ng_scalar is not None and not pd.isna(ng_scalar):
-                        df.loc[row_filter, ng_meters] = df.loc[row_filter, ng_meters] * ng_scalar
+        # only the scalars for the year of the meters are applied. This is strange, but we compare the year of the
+        # meter with the year of the simulation, which can be different. So shift the 'start_time' and 'end_time'
+        # of the meters to be in the year of the dataframe data.
+        scalars = scalars[scalars["start_time"].dt.year == year_of_meters]
+        if scalars.empty:
+            return
+
+        year_offset = pd.DateOffset(years=year_of_data - year_of_meters)
+        start_times = scalars["start_time"] + year_offset
+        end_times = scalars["end_time"] + year_offset
+
+        # map each scalar row to the position of its building in the list of buildings
+        building_ids, building_positions = np.unique(scalars["building_id"].astype(str).to_numpy(), return_inverse=True)
+
+        fuels = {
+            "Electricity": scalars["scaling_factor_electricity"].to_numpy(dtype=float),
+            "NaturalGas": scalars["scaling_factor_natural_gas"].to_numpy(dtype=float),
+        }
+        # the 15 minute view of the hourly data is scaled with the hourly data
+        for df in [df for df in [self.data, self.data_15min] if isinstance(df, pd.DataFrame)]:
+            for meter_type, factors in fuels.items():
+                fuel_meters = [meter_name for meter_name in meter_names if meter_type in meter_name]
+                columns = [f"{meter_name} {building_id}" for building_id in building_ids for meter_name in fuel_meters]
+                missing = [column for column in columns if column not in df.columns]
+                if missing:
+                    raise Exception(f"Could not find the meters to scale in the results: {missing}")
+
+                # (timestamps x buildings) array of factors, then expand to the columns of each
+                # building and apply in a single broadcast multiply
+                building_factors = interval_scaling_factors(
+                    df.index, start_times, end_times, building_positions, factors, len(building_ids)
+                )
+                column_buildings = np.repeat(np.arange(len(building_ids)), len(fuel_meters))
+                df[columns] = df[columns].to_numpy() * building_factors[:, column_buildings]
 
     def get_urbanopt_feature_report_columns(self) -> dict[str, dict[str, object]]:
         """Return the feature report columns with the metadata such as
@@ -654,8 +786,9 @@ class URBANoptResults(ResultsBase):
             "Heating:NaturalGas": {},
             "WaterSystems:NaturalGas": {},
             "InteriorEquipment:NaturalGas": {},
-            # 'Propane:Facility': {},
-            # 'FuelOilNo2:Facility': {},
+            # the other fuels are only in the data if the building uses them
+            "Propane:Facility": {"optional": True},
+            "FuelOilNo2:Facility": {"optional": True},
             # 'OtherFuels:Facility': {},
             # 'HeatRejection:Propane': {},
             # 'Heating:Propane': {},
@@ -708,7 +841,7 @@ class URBANoptResults(ResultsBase):
                 columns[key]["conversion"] = 1000.0
                 columns[key]["name"] = key
                 columns[key]["description"] = key
-            elif "NaturalGas" in key or ("DistrictCooling" in key or "DistrictHeating" in key):
+            elif any(fuel in key for fuel in ["NaturalGas", "Propane", "FuelOil", "DistrictCooling", "DistrictHeating"]):
                 columns[key]["unit_original"] = "kBtu"
                 columns[key]["units"] = "Wh"
                 columns[key]["conversion"] = 293.071  # 1 kBtu = 293.071 Wh
@@ -749,48 +882,81 @@ class URBANoptResults(ResultsBase):
         new_run_path_export.mkdir(parents=True, exist_ok=True)
         # save data frame as CSV, but only the columns that are needed
 
-        # duplicate the load_dataframe so that we can calculate the seconds in the year
-        tmp_dataframe = load_dataframe.copy()
+        # only the three load columns are copied, as one float block. The first value of the
+        # hot water must be zero, else there will be an error
+        columns = ["TotalCoolingSensibleLoad", "TotalHeatingSensibleLoad", "TotalWaterHeating"]
+        values = load_dataframe[columns].to_numpy(dtype=float, copy=True)
+        values[0, 2] = 0
+
         # time column is seconds from the start of the year, as integers
-        tmp_dataframe["time"] = (tmp_dataframe.index - tmp_dataframe.index[0]).total_seconds()
+        time = (load_dataframe.index - load_dataframe.index[0]).total_seconds().to_numpy()
         # the last timestamp is weird as it will be negative. Take the second to last value and add 3600
-        tmp_dataframe["time"].iloc[-1] = tmp_dataframe["time"].iloc[-2] + 3600
-        # the first value of the hot water must be zero, else there will be an error
-        tmp_dataframe["TotalWaterHeating"].iloc[0] = 0
+        time[-1] = time[-2] + 3600
+        time = time.astype(int)
 
-        # coerce time into int
-        tmp_dataframe["time"] = tmp_dataframe["time"].astype(int)
         header = "#1\n"
         header += "#Created from results of URBANopt\n\n"
         header += "#First column: Seconds in the year (loads are hourly)\n"
         header += "#Second column: cooling loads in Watts (as negative numbers).\n"
         header += "#Third column: space heating loads in Watts\n"
         header += "#Fourth column: water heating loads in Watts\n\n"
-        header += f"#Peak space cooling load = {tmp_dataframe['TotalCoolingSensibleLoad'].min()} Watts\n"
-        header += f"#Peak space heating load = {tmp_dataframe['TotalHeatingSensibleLoad'].max()} Watts\n"
-        header += f"#Peak water heating load = {tmp_dataframe['TotalWaterHeating'].max()} Watts\n"
-
-        columns = [
-            "time",
-            "TotalCoolingSensibleLoad",
-            "TotalHeatingSensibleLoad",
-            "TotalWaterHeating",
-        ]
-
-        list_data = tmp_dataframe[columns].values.tolist()  # noqa: PD011
-        # make the first column integers
-        list_data = [[int(x) if i == 0 else x for i, x in enumerate(row)] for row in list_data]
-        modelica_mos = ModelicaMOS.from_list(list_data, header_data=header)
+        header += f"#Peak space cooling load = {values[:, 0].min()} Watts\n"
+        header += f"#Peak space heating load = {values[:, 1].max()} Watts\n"
+        header += f"#Peak water heating load = {values[:, 2].max()} Watts\n"
 
         # save the mos file and CSV file
-        modelica_mos.save_as(new_run_path_export / "modelica.mos")
-        tmp_dataframe.to_csv(
+        write_mos_file(new_run_path_export / "modelica.mos", time, values, header)
+        pd.DataFrame(values, index=load_dataframe.index, columns=columns, copy=False).to_csv(
             new_run_path_export / "building_loads.csv",
-            columns=["TotalCoolingSensibleLoad", "TotalHeatingSensibleLoad", "TotalWaterHeating"],
             index_label="time",
         )
 
-    def _search_for_file_in_reports(self, search_dir: Path, filename: str, measure_name: Union[str, None] = None) -> Path:
+    def create_abstract_runs(self, load_dataframes: dict[str, pd.DataFrame], max_workers: Union[int, None] = None) -> None:
+        """Create many abstract runs (e.g., one per aggregation group) in parallel. See
+        create_abstract_run for the files that are written for each run.
+
+        Args:
+            load_dataframes (dict[str, pd.DataFrame]): Run id and the dataframe with the loads of the run
+            max_workers (int): Number of threads used to write the runs. Defaults to None, which uses
+                the ThreadPoolExecutor default.
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self.create_abstract_run, run_id, df) for run_id, df in load_dataframes.items()]
+            # raise the first exception, if any
+            for future in futures:
+                future.result()
+
+    @classmethod
+    def report_files(cls, uo_path: Path, scenario_name: str, building_names: list[str]) -> list[Path]:
+        """Return the report files of each building that process_results and process_load_results read, e.g.,
+        to check if the results changed without listing all of the files in the run directories.
+
+        Args:
+            uo_path (Path): Path to the URBANopt project directory
+            scenario_name (str): Name of the scenario
+            building_names (list[str]): IDs of the buildings
+
+        Returns:
+            list[Path]: default_feature_report.json, default_feature_report.csv, and building_loads.csv of each building.
+                A file that is not found is the path in the feature_reports directory, which does not exist.
+        """
+        files = []
+        for building_id in building_names:
+            search_dir = uo_path / "run" / scenario_name / f"{building_id}"
+            for filename, measure_name in [
+                ("default_feature_report.json", None),
+                ("default_feature_report.csv", None),
+                ("building_loads.csv", "export_modelica_loads"),
+            ]:
+                try:
+                    files.append(cls._search_for_file_in_reports(search_dir, filename, measure_name=measure_name))
+                except Exception:
+                    # the error is raised when the results are processed
+                    files.append(search_dir / "feature_reports" / filename)
+        return files
+
+    @classmethod
+    def _search_for_file_in_reports(cls, search_dir: Path, filename: str, measure_name: Union[str, None] = None) -> Path:
         """Search for a report file in a directory and return the path, if exists.
 
         If the filename has more than one period, e.g., .tar.gz, then this will not work
@@ -882,6 +1048,17 @@ class URBANoptResults(ResultsBase):
         else:
             raise Exception(f"Could not find default_feature_report.csv in {search_dir}")
 
+    def get_urbanopt_building_loads_columns(self) -> dict[str, str]:
+        """Return the columns to keep from the building_loads.csv file and the name
+        that they are mapped to."""
+        return {
+            "Date Time": "Datetime",
+            "TotalSensibleLoad": "TotalSensibleLoad (W)",
+            "TotalCoolingSensibleLoad": "TotalCoolingSensibleLoad (W)",
+            "TotalHeatingSensibleLoad": "TotalHeatingSensibleLoad (W)",
+            "TotalWaterHeating": "TotalWaterHeating (W)",
+        }
+
     def get_urbanopt_export_building_loads(self, search_dir: Path) -> pd.DataFrame:
         """Return the building_loads.csv file path.
 
@@ -896,21 +1073,19 @@ class URBANoptResults(ResultsBase):
             print(f"Processing building loads from {report_file}")
 
             # only grab the columns that we care about
-            columns_to_keep_and_map = {
-                "Date Time": "Datetime",
-                "TotalSensibleLoad": "TotalSensibleLoad (W)",
-                "TotalCoolingSensibleLoad": "TotalCoolingSensibleLoad (W)",
-                "TotalHeatingSensibleLoad": "TotalHeatingSensibleLoad (W)",
-                "TotalWaterHeating": "TotalWaterHeating (W)",
-            }
-
-            # re-read the file with the column names and rename the columns to not have the units
-            report = pd.read_csv(report_file, usecols=columns_to_keep_and_map.keys())
+            columns_to_keep_and_map = self.get_urbanopt_building_loads_columns()
+
+            # re-read the file with the column names and rename the columns to not have the units. All
+            # of the values are read as floats except the date time column.
+            dtypes = {column: "float64" for column in columns_to_keep_and_map if column != "Date Time"}
+            try:
+                report = pd.read_csv(report_file, usecols=columns_to_keep_and_map.keys(), dtype=dtypes)
+            except ValueError:
+                # the file has non-numeric values, so fall back to coercing them to NaN
+                report = pd.read_csv(report_file, usecols=columns_to_keep_and_map.keys())
+                report[list(dtypes)] = report[list(dtypes)].apply(pd.to_numeric, errors="coerce")
             report = report.rename(columns=columns_to_keep_and_map)
 
-            # convert all values to floats except the first column which is the date time
-            cols = report.columns
-            report[cols[1:]] = report[cols[1:]].apply(pd.to_numeric, errors="coerce")
             return report
         else:
             raise Exception(f"Could not find building_loads.csv in {search_dir}")